@@ -0,0 +1,154 @@
+#!usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+aggregator.py
+Define Some Aggregation Functions.
+1. get_group_bounds()
+2. aggregate_groups()
+3. aggregate_all_weathers_data()
+"""
+
+from time import monotonic
+
+import numpy as np
+
+from mysql import NATIONAL_SCOPE, query_summary_source, publish_summaries
+from tools import print_log
+
+
+
+# Define Global Variables.
+RAIN_KEYWORD = '雨'  # Weather Descriptions Containing This Count as Rain
+
+
+
+def get_group_bounds(sorted_groups):
+    """
+    获取已排序分组编号数组中每个分组的起止下标
+    
+    :parameter sorted_groups: 已排序的分组编号数组
+    :type sorted_groups: <class 'numpy.ndarray'>
+    
+    :returns
+    
+    :return: starts: 每个分组的起始下标数组
+    :rtype: <class 'numpy.ndarray'>
+    
+    :return: ends: 每个分组的结束下标（不含）数组
+    :rtype: <class 'numpy.ndarray'>
+    """
+    
+    starts = np.flatnonzero(np.r_[True, sorted_groups[1:] != sorted_groups[:-1]])
+    ends = np.r_[starts[1:], len(sorted_groups)]
+    
+    return starts, ends
+
+
+
+def aggregate_groups(groups, highest, lowest, rain):
+    """
+    按分组一次性向量化计算气温与降雨统计，缺失的气温（NaN）不参与统计
+    
+    :parameter groups: 每行的分组编号数组
+    :type groups: <class 'numpy.ndarray'>
+    
+    :parameter highest: 每行的最高温度数组
+    :type highest: <class 'numpy.ndarray'>
+    
+    :parameter lowest: 每行的最低温度数组
+    :type lowest: <class 'numpy.ndarray'>
+    
+    :parameter rain: 每行是否有雨的布尔数组
+    :type rain: <class 'numpy.ndarray'>
+    
+    :return: result: 统计名到数组的字典，按分组编号升序排列；
+                     hottest、coldest为最热、最冷城市的行下标，分组内全部缺失时为-1
+    :rtype: <class 'dict'>
+    """
+    
+    order = np.argsort(groups, kind='stable')
+    unique_groups = groups[order]
+    starts, ends = get_group_bounds(unique_groups)
+    count = np.bincount(groups)
+    highest_valid = ~np.isnan(highest)
+    lowest_valid = ~np.isnan(lowest)
+    highest_count = np.bincount(groups, weights=highest_valid)
+    lowest_count = np.bincount(groups, weights=lowest_valid)
+    
+    with np.errstate(invalid='ignore', divide='ignore'):  # 分组内全部缺失时结果为NaN
+        mean_highest = np.bincount(groups, weights=np.where(highest_valid, highest, 0.0)) / highest_count
+        mean_lowest = np.bincount(groups, weights=np.where(lowest_valid, lowest, 0.0)) / lowest_count
+    
+    # 按(分组, 温度)排序，每个分组的最后一行为最高温度最高的城市，第一行为最低温度最低的城市
+    hottest_order = np.lexsort((np.where(highest_valid, highest, -np.inf), groups))
+    coldest_order = np.lexsort((np.where(lowest_valid, lowest, np.inf), groups))
+    hottest = hottest_order[ends - 1]
+    coldest = coldest_order[starts]
+    present = count > 0
+    
+    return {
+        'group': unique_groups[starts],
+        'cities': count[present],
+        'max_highest': np.where(highest_valid[hottest], highest[hottest], np.nan),
+        'min_lowest': np.where(lowest_valid[coldest], lowest[coldest], np.nan),
+        'mean_highest': mean_highest[present],
+        'mean_lowest': mean_lowest[present],
+        'hottest': np.where(highest_valid[hottest], hottest, -1),
+        'coldest': np.where(lowest_valid[coldest], coldest, -1),
+        'rain_cities': np.bincount(groups, weights=rain)[present].astype(int),
+    }
+
+
+
+def aggregate_all_weathers_data():
+    """
+    爬取发布后的汇总阶段：把当前日期天气快照载入NumPy数组，一次向量化计算每个省份与全国每天的
+    最高、最低、平均气温，最热、最冷城市与有雨城市数，写入汇总表并原子发布
+    
+    :return: count: 写入的汇总行数，失败时为None
+    :rtype: <class 'int'>
+    """
+    
+    start_time = monotonic()
+    results = query_summary_source()
+    
+    if not results:
+        return None
+    
+    province_names = np.array([i['province'] for i in results], dtype=object)
+    provinces, province_codes = np.unique(province_names, return_inverse=True)
+    dates, date_codes = np.unique(np.array([i['date_time'] for i in results], dtype=object), return_inverse=True)
+    cities = np.array([i['city'] for i in results], dtype=object)
+    highest = np.array([i['highest_temperature_value'] for i in results], dtype=float)  # None转换为NaN
+    lowest = np.array([i['lowest_temperature_value'] for i in results], dtype=float)
+    rain = np.array([RAIN_KEYWORD in (i['weather_description1'] or '') + (i['weather_description2'] or '')
+                     for i in results], dtype=bool)
+    rows = []
+    
+    # 省份汇总按(省份, 日期)分组，全国汇总按日期分组
+    for scopes, groups, width in ((provinces, province_codes * len(dates) + date_codes, len(dates)),
+                                  (np.array([NATIONAL_SCOPE], dtype=object), date_codes, len(dates))):
+        result = aggregate_groups(groups, highest, lowest, rain)
+        scope_names = scopes[result['group'] // width]
+        day_names = dates[result['group'] % width]
+        
+        for i in range(len(result['group'])):
+            hottest, coldest = result['hottest'][i], result['coldest'][i]
+            rows.append((
+                scope_names[i], day_names[i], int(result['cities'][i]),
+                None if np.isnan(result['max_highest'][i]) else float(result['max_highest'][i]),
+                None if np.isnan(result['min_lowest'][i]) else float(result['min_lowest'][i]),
+                None if np.isnan(result['mean_highest'][i]) else round(float(result['mean_highest'][i]), 1),
+                None if np.isnan(result['mean_lowest'][i]) else round(float(result['mean_lowest'][i]), 1),
+                None if hottest < 0 else province_names[hottest], None if hottest < 0 else cities[hottest],
+                None if coldest < 0 else province_names[coldest], None if coldest < 0 else cities[coldest],
+                int(result['rain_cities'][i])))
+    
+    if not publish_summaries(rows):
+        return None
+    
+    print_log('Aggregate %d Date Weather Rows into %d Summaries in %.2fs Successfully! ' % (
+        len(results), len(rows), monotonic() - start_time))
+    
+    return len(rows)
@@ -5,8 +5,17 @@
 app.py
 """
 
-from flask import Flask, render_template, request, redirect, url_for
-from mysql import query_all_provinces, query_city, query_all_weathers_data
+from threading import Lock
+from json import dumps
+from math import floor, ceil
+from datetime import datetime, timedelta
+from time import monotonic
+
+from flask import Flask, render_template, request, redirect, url_for, make_response, g
+from mysql import HISTORY_RETENTION_DAYS, NATIONAL_SCOPE, query_generations, query_province_city_tree, \
+    query_all_weathers_data, add_page_views, query_weather_history, query_summaries
+from cache import GenerationWatcher, LRUCache, PageViewCounter
+from metrics import METRICS_CONTENT_TYPE, increase, observe, render_metrics
 
 
 
@@ -14,27 +23,253 @@ app = Flask(__name__)
 
 
 
-@app.route('/')
-@app.route('/index/')
-def select():
-    query_provinces = query_all_provinces()
-    provinces = []
-    cities = []
+# Define Global Variables.
+generation_watcher = GenerationWatcher(query_generations)  # 爬虫发布数据后递增的发布代数
+province_city_tree_lock = Lock()
+province_city_tree_cache = {'generation': None, 'tree': None}  # 省份城市树缓存，省份或城市数据发布后重建
+WEATHER_MAX_AGE = 300  # Browser Cache Max Age of Weather Pages and APIs(Seconds)
+HISTORY_DEFAULT_DAYS = 7  # Default Days of History Returned by /api/history
+summary_lock = Lock()
+summary_cache = {'generation': None, 'bodies': None}  # 范围名到汇总JSON字节的字典，汇总数据发布后重建
+# (类型, 发布代数, 省份名, 城市名)到渲染后页面或JSON字节的LRU缓存，旧发布代数的页面不再命中，按LRU淘汰
+weather_cache = LRUCache()
+page_view_counter = PageViewCounter(add_page_views)  # 城市页面浏览量，爬取计划据此决定重新爬取的优先级
+
+
+
+def get_province_city_tree():
+    """
+    获取省份城市树，只在爬虫发布新的省份或城市数据后重新查询MySQL
+    
+    :return: tree: 省份名到城市名列表的字典
+    :rtype: <class 'dict'>
+    """
     
-    for i in query_provinces:
-        provinces.append(i['province'])
+    generation = (generation_watcher.get('Province'), generation_watcher.get('City'))
     
-    for i in provinces:
-        query_cities = query_city(i)
-        city = []
+    with province_city_tree_lock:
+        if province_city_tree_cache['tree'] is None or province_city_tree_cache['generation'] != generation:
+            tree = query_province_city_tree()
+            
+            if tree is None:  # 查询失败时沿用旧的省份城市树
+                return province_city_tree_cache['tree'] or {}
+            
+            province_city_tree_cache['generation'] = generation
+            province_city_tree_cache['tree'] = tree
         
-        if query_cities:
-            for j in query_cities:
-                city.append(j['city'])
+        return province_city_tree_cache['tree']
+
+
+
+def get_summary_bodies():
+    """
+    获取所有范围的汇总JSON，只在爬虫发布新的汇总数据后重新查询MySQL并序列化，请求时只需一次字典查找
+    
+    :return: bodies: 范围名（省份名或全国）到汇总JSON字节的字典
+    :rtype: <class 'dict'>
+    """
+    
+    generation = generation_watcher.get('WeatherSummary')
+    
+    with summary_lock:
+        if summary_cache['bodies'] is None or summary_cache['generation'] != generation:
+            results = query_summaries()
+            
+            if results is None:  # 查询失败时沿用旧的汇总数据
+                return summary_cache['bodies'] or {}
+            
+            summaries = {}
+            
+            for i in results:
+                summaries.setdefault(i.pop('scope'), []).append(i)
+            
+            summary_cache['generation'] = generation
+            summary_cache['bodies'] = {
+                scope: dump_json({'scope': scope, 'summaries': rows}) for scope, rows in summaries.items()
+            }
         
-        cities.append({i: city})
+        return summary_cache['bodies']
+
+
+
+def get_weather_generation():
+    """
+    获取气象数据的发布代数，页面缓存键包含发布代数，在查询数据之前获取，缓存的页面不会旧于其发布代数
+    
+    :return: generation: (实时天气发布代数, 日期天气发布代数)元组
+    :rtype: <class 'tuple'>
+    """
+    
+    return generation_watcher.get('RealTimeWeather'), generation_watcher.get('DateWeather')
+
+
+
+def dump_json(data):
+    """
+    将数据序列化为紧凑的UTF-8 JSON，日期序列化为ISO格式字符串
+    
+    :parameter data: 待序列化数据
+    :type data: <class 'object'>
     
-    return render_template('index.html', provinces=provinces, cities=cities)
+    :return: body: JSON字节
+    :rtype: <class 'bytes'>
+    """
+    
+    return dumps(data, ensure_ascii=False, separators=(',', ':'), default=str).encode('utf-8')
+
+
+
+def get_chart_data(date_weathers):
+    """
+    在服务器端生成7天气温图表数据，页面直接绘制，不再在浏览器中解析温度字符串
+    
+    :parameter date_weathers: 日期天气MySQL查询结果字典列表
+    :type date_weathers: <class 'list'>
+    
+    :return: chart: 日期、最高温度、最低温度数组（缺失为None）与纵轴整数范围的字典
+    :rtype: <class 'dict'>
+    """
+    
+    date_weathers = date_weathers or []
+    highest = [i.get('highest_temperature_value') for i in date_weathers]
+    lowest = [i.get('lowest_temperature_value') for i in date_weathers]
+    values = [i for i in highest + lowest if i is not None]
+    
+    return {
+        'dates': [str(i['date_time']) for i in date_weathers], 'highest': highest, 'lowest': lowest,
+        'minimum': floor(min(values)) if values else 0, 'maximum': ceil(max(values)) if values else 0,
+    }
+
+
+
+def render_weather(province, city, real_time_weather, date_weathers):
+    """
+    渲染城市气象数据页面，须在Flask应用上下文中调用
+    
+    :parameter province: 省份名
+    :type province: <class 'str'>
+    
+    :parameter city: 城市名
+    :type city: <class 'str'>
+    
+    :parameter real_time_weather: 实时天气MySQL查询结果字典列表
+    :type real_time_weather: <class 'list'>
+    
+    :parameter date_weathers: 日期天气MySQL查询结果字典列表
+    :type date_weathers: <class 'list'>
+    
+    :return: body: 渲染后的页面字节
+    :rtype: <class 'bytes'>
+    """
+    
+    context = {
+        'province': province, 'city': city, 'real_time_weather': real_time_weather, 'date_weathers': date_weathers,
+        'chart': get_chart_data(date_weathers),
+    }
+    
+    return render_template('weather.html', **context).encode('utf-8')
+
+
+
+def dump_weather_json(province, city, real_time_weather, date_weathers):
+    """
+    将城市气象数据序列化为JSON，省略每行重复的省份名与城市名
+    
+    :parameter province: 省份名
+    :type province: <class 'str'>
+    
+    :parameter city: 城市名
+    :type city: <class 'str'>
+    
+    :parameter real_time_weather: 实时天气MySQL查询结果字典列表
+    :type real_time_weather: <class 'list'>
+    
+    :parameter date_weathers: 日期天气MySQL查询结果字典列表
+    :type date_weathers: <class 'list'>
+    
+    :return: body: JSON字节
+    :rtype: <class 'bytes'>
+    """
+    
+    omitted = ('province', 'city')
+    
+    return dump_json({
+        'province': province, 'city': city,
+        'real_time_weather': {k: v for k, v in real_time_weather[0].items() if k not in omitted},
+        'date_weathers': [{k: v for k, v in i.items() if k not in omitted} for i in date_weathers],
+    })
+
+
+
+def conditional_response(etag, key, build, mimetype='text/html'):
+    """
+    构造支持条件请求的响应：If-None-Match与ETag一致时返回304，否则优先使用LRU缓存中的响应体
+    
+    :parameter etag: 由发布代数生成的ETag
+    :type etag: <class 'str'>
+    
+    :parameter key: LRU缓存键，为None时不缓存
+    :type key: <class 'tuple'>
+    
+    :parameter build: 构造响应体的函数，返回(响应体字节, HTTP状态码, 是否可缓存)元组，
+                      不可缓存的响应（如查询失败）不保存到LRU缓存，也不带ETag
+    :type build: <class 'function'>
+    
+    :parameter mimetype: 响应MIME类型，默认为'text/html'
+    :type mimetype: <class 'str'>
+    
+    :return: response: Flask响应对象
+    :rtype: <class 'flask.Response'>
+    """
+    
+    if request.if_none_match.contains(etag):
+        response = make_response('', 304)
+    else:
+        body = weather_cache.get(key) if key is not None else None
+        status, cacheable = 200, True
+        
+        if body is None:
+            body, status, cacheable = build()
+            
+            if cacheable and key is not None:
+                weather_cache.put(key, body)
+        
+        response = make_response(body, status)
+        response.mimetype = mimetype
+        
+        if not cacheable:
+            return response
+    
+    response.set_etag(etag)
+    response.cache_control.public = True
+    response.cache_control.max_age = WEATHER_MAX_AGE
+    
+    return response
+
+
+
+@app.before_request
+def start_request_timer():
+    g.request_start_time = monotonic()
+
+
+
+@app.after_request
+def record_request_metrics(response):
+    route = request.url_rule.rule if request.url_rule else 'unmatched'  # 按路由而不是url统计，标签数量有限
+    observe('raingod_http_request_seconds', monotonic() - g.get('request_start_time', monotonic()), route=route)
+    increase('raingod_http_requests_total', route=route, status=str(response.status_code))
+    
+    return response
+
+
+
+@app.route('/')
+@app.route('/index/')
+def select():
+    provinces = list(get_province_city_tree().keys())  # 城市列表由页面按需从/api/cities获取
+    
+    return render_template('index.html', provinces=provinces)
 
 
 
@@ -51,13 +286,119 @@ def deal():
 def weather():
     province = request.args.get('province')
     city = request.args.get('city')
-    real_time_weather, date_weathers = query_all_weathers_data(province, city)
+    generation = get_weather_generation()
+    etag = 'weather-%s-%s' % generation  # 同一发布代数内页面不变
     
-    context = {
-        'province': province, 'city': city, 'real_time_weather': real_time_weather, 'date_weathers': date_weathers
-    }
+    def build():
+        real_time_weather, date_weathers = query_all_weathers_data(province, city)
+        body = render_weather(province, city, real_time_weather, date_weathers)
+        
+        return body, 200, bool(real_time_weather and date_weathers)  # 查询失败的页面不缓存，下次请求重新查询
+    
+    return conditional_response(etag, ('html', generation, province, city), build)
+
+
+
+@app.route('/api/weather')
+def api_weather():
+    province = request.args.get('province')
+    city = request.args.get('city')
+    generation = get_weather_generation()
+    etag = 'api-weather-%s-%s' % generation
+    
+    def build():
+        real_time_weather, date_weathers = query_all_weathers_data(province, city)
+        
+        if not real_time_weather or not date_weathers:
+            return dump_json({'error': 'Weather Data Not Found! '}), 404, False
+        
+        return dump_weather_json(province, city, real_time_weather, date_weathers), 200, True
+    
+    return conditional_response(etag, ('json', generation, province, city), build, 'application/json')
+
+
+
+@app.route('/api/history')
+def api_history():
+    province = request.args.get('province')
+    city = request.args.get('city')
+    days = request.args.get('days', HISTORY_DEFAULT_DAYS, type=int)
+    etag = 'api-history-%s-%s' % get_weather_generation()
+    
+    def build():
+        if not 1 <= days <= HISTORY_RETENTION_DAYS:
+            return dump_json({'error': 'Days Out of Range! '}), 400, False
+        
+        end = datetime.now()
+        real_time_weathers, date_weathers = query_weather_history(province, city, end - timedelta(days=days), end)
+        
+        if real_time_weathers is None:
+            return dump_json({'error': 'Query Weather History ERROR! '}), 503, False
+        
+        omitted = ('province', 'city')
+        
+        return dump_json({
+            'province': province, 'city': city,
+            'real_time_weathers': [{k: v for k, v in i.items() if k not in omitted} for i in real_time_weathers],
+            'date_weathers': [{k: v for k, v in i.items() if k not in omitted} for i in date_weathers],
+        }), 200, True
+    
+    return conditional_response(etag, None, build, 'application/json')
+
+
+
+@app.route('/api/summary')
+def api_summary():
+    scope = request.args.get('province', NATIONAL_SCOPE)  # 不指定省份时返回全国汇总
+    bodies = get_summary_bodies()
+    etag = 'api-summary-%s' % generation_watcher.get('WeatherSummary')
+    
+    def build():
+        if scope not in bodies:
+            return dump_json({'error': 'Summary Not Found! '}), 404, False
+        
+        return bodies[scope], 200, True
     
-    return render_template('weather.html', **context)
+    return conditional_response(etag, None, build, 'application/json')
+
+
+
+@app.route('/api/cities')
+def api_cities():
+    province = request.args.get('province')
+    tree = get_province_city_tree()
+    etag = 'api-cities-%s-%s' % (generation_watcher.get('Province'), generation_watcher.get('City'))
+    
+    def build():
+        if province is None:  # 不指定省份时返回整个省份城市树
+            return dump_json([{'province': k, 'cities': v} for k, v in tree.items()]), 200, True
+        
+        if province not in tree:
+            return dump_json({'error': 'Province Not Found! '}), 404, False
+        
+        return dump_json({'province': province, 'cities': tree[province]}), 200, True
+    
+    return conditional_response(etag, None, build, 'application/json')
+
+
+
+@app.route('/pageview')
+def pageview():
+    # nginx直接发送静态页面，每个/weather/请求由nginx在后台镜像到这里计数
+    province = request.args.get('province')
+    city = request.args.get('city')
+    
+    if city in get_province_city_tree().get(province, []):  # 只统计存在的城市
+        page_view_counter.hit(province, city)
+    
+    return '', 204
+
+
+
+@app.route('/metrics')
+def metrics():
+    # 汇总爬虫进程池与所有uWSGI worker写出的指标文件，nginx只允许本机访问
+    return make_response(render_metrics(), 200, {'Content-Type': METRICS_CONTENT_TYPE})
 
 
 
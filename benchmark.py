@@ -0,0 +1,814 @@
+#!usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+benchmark.py
+Define Some Benchmark Functions.
+1. soup_extract_weather_data()
+2. save_fixtures()
+3. measure()
+4. read_process_status()
+5. peak_rss_growth()
+6. measure_peak_rss()
+7. benchmark_parser()
+8. get_synthetic_cities()
+9. time_queries()
+10. benchmark_keys()
+11. manager_worker()
+12. tuple_worker()
+13. benchmark_ipc()
+14. LegacyRealTimeWeather
+15. LegacyDateWeather
+16. get_synthetic_weathers_arguments()
+17. build_weathers()
+18. benchmark_model()
+19. benchmark_writes()
+
+Usage:
+python benchmark.py fixtures [fixture_directory]  保存main.FIRST_CITY_URLS各省第一个城市的页面为HTML fixture
+python benchmark.py parser [fixture_directory]  对比BeautifulSoup与预编译XPath提取气象数据的耗时与峰值内存
+    （fixtures/中提交了3个结构与渲染后页面相同的合成页面，无需访问网络即可运行）
+python benchmark.py keys [cities]  在合成数据集上对比数据表添加主键前后的查询延迟（需要MySQL）
+python benchmark.py ipc [cities]  对比Manager共享列表加锁与经CrawlEngine、ProcessPoolExecutor直接返回结果元组的进程间通信开销
+python benchmark.py model [cities]  对比优化前后气象数据类的单个对象内存、pickle大小与构造耗时
+python benchmark.py writes [cities]  在合成数据集上对比逐城市删除后插入与BulkWriter按主键批量更新的写入延迟，
+    并测量影子表复制与原子替换的发布延迟（需要MySQL）
+"""
+
+from glob import glob
+from os import makedirs
+from os.path import join, basename
+from sys import argv
+from time import perf_counter
+from tracemalloc import start, stop, reset_peak, get_traced_memory
+from datetime import datetime, timedelta
+from multiprocessing import get_context, Pool, Manager
+from concurrent.futures import ProcessPoolExecutor
+from os import cpu_count
+from random import Random
+from functools import partial
+from pickle import dumps, loads, HIGHEST_PROTOCOL
+
+from bs4 import BeautifulSoup
+
+from crawler import extract_weather_data, fetch_with_web_driver, get_province_data
+from main import FORECAST_URL, FIRST_CITY_URLS
+from engine import CrawlEngine
+from fetcher import get_http_fetcher
+from weather import RealTimeWeather, DateWeather
+from mysql import REAL_TIME_WEATHER_INSERT, DATE_WEATHER_INSERT, STAGING_SUFFIX, OLD_SUFFIX, BulkWriter, \
+    get_real_time_weather_row, get_date_weather_rows, mysql_acquire, mysql_release
+from tools import print_log, print_traceback_error
+
+
+
+# Define Global Variables.
+FIXTURE_DIRECTORY = './fixtures/'  # HTML Fixture Directory
+REPEAT = 20  # Benchmark Repeat Times Per Fixture
+SYNTHETIC_PROVINCES = 34  # Synthetic Dataset Province Count
+SYNTHETIC_CITIES = 2400  # Synthetic Dataset City Count, About the Real City Count
+KEY_QUERIES = 500  # Queries Per Table in Key Benchmark
+BENCHMARK_SUFFIX = '_benchmark'  # Benchmark Table Name Suffix
+
+
+
+def soup_extract_weather_data(html):
+    """
+    使用完整BeautifulSoup解析树提取气象数据（优化前的实现，作为对比基准）
+    
+    :parameter html: 爬虫目标地址HTML源代码
+    :type html: <class 'str'>
+    
+    :returns
+    
+    :return: real_time_weather: 实时天气类对象
+    :rtype: <class 'weather.RealTimeWeather'>
+    
+    :return: date_weathers: 日期天气类对象列表
+    :rtype: <class 'list'>
+    """
+    
+    soup = BeautifulSoup(html, 'lxml')
+    real_time_weather = RealTimeWeather(
+        soup.find(id='realPublishTime').get_text(), soup.find(id='realTemperature').get_text(),
+        soup.find(id='realRain').get_text(), soup.find(id='realWindDirect').get_text(),
+        soup.find(id='realWindPower').get_text(), soup.find(id='realHumidity').get_text(),
+        soup.find(id='realFeelst').get_text(), soup.find(id='aqi').get_text().strip(),
+        soup.find(id='realIcomfort').get_text())
+    temperatures = soup.find_all('div', attrs={'class': 'tmp'})
+    weather_descriptions = soup.find_all('div', attrs={'class': 'desc'})
+    wind_directions = soup.find_all('div', attrs={'class': 'windd'})
+    wind_levels = soup.find_all('div', attrs={'class': 'winds'})
+    date_weathers = []
+    date = datetime.today()
+    
+    for i in range(7):
+        date_weathers.append(DateWeather(
+            date, temperatures[2 * i].get_text().strip(), temperatures[2 * i + 1].get_text().strip(),
+            weather_descriptions[2 * i].get_text().strip(), weather_descriptions[2 * i + 1].get_text().strip(),
+            wind_directions[2 * i].get_text().strip(), wind_directions[2 * i + 1].get_text().strip(),
+            wind_levels[2 * i].get_text().strip(), wind_levels[2 * i + 1].get_text().strip()))
+        date += timedelta(days=1)
+    
+    return real_time_weather, date_weathers
+
+
+
+def save_fixtures(urls, directory=FIXTURE_DIRECTORY):
+    """
+    保存页面HTML源代码为fixture，原始HTML中没有实时天气时使用Web Driver获取渲染后的页面
+    
+    :parameter urls: 爬虫目标地址列表
+    :type urls: <class 'list'>
+    
+    :parameter directory: fixture目录，默认为FIXTURE_DIRECTORY
+    :type directory: <class 'str'>
+    
+    :exception: exception: 保存fixture错误
+    :type: <class 'Exception'>
+    """
+    
+    makedirs(directory, exist_ok=True)
+    
+    for url in urls:
+        try:
+            html = get_http_fetcher().fetch(url)
+            
+            try:
+                extract_weather_data(html, strict=True)
+            except Exception:
+                html = fetch_with_web_driver(url)
+            
+            with open(join(directory, basename(url)), 'w', encoding='utf-8') as file:
+                file.write(html)
+            
+            print_log('Save Fixture ' + url + ' Successfully! ')
+        except Exception as exception:
+            print_traceback_error(exception, 'Save Fixture ' + url)
+
+
+
+def measure(function, argument, repeat=REPEAT):
+    """
+    测量函数的平均耗时与峰值内存
+    
+    :parameter function: 被测函数
+    :type function: <class 'function'>
+    
+    :parameter argument: 被测函数参数
+    :type argument: <class 'object'>
+    
+    :parameter repeat: 重复次数，默认为REPEAT
+    :type repeat: <class 'int'>
+    
+    :returns
+    
+    :return: seconds: 平均耗时（秒）
+    :rtype: <class 'float'>
+    
+    :return: peak: 单次调用的Python堆峰值内存（字节），不含lxml/libxml2等C扩展的内存
+    :rtype: <class 'int'>
+    """
+    
+    start_time = perf_counter()
+    
+    for _ in range(repeat):
+        function(argument)
+    
+    seconds = (perf_counter() - start_time) / repeat
+    start()
+    reset_peak()
+    function(argument)
+    peak = get_traced_memory()[1]
+    stop()
+    
+    return seconds, peak
+
+
+
+def read_process_status(key):
+    """
+    读取当前进程/proc/self/status中的内存项（仅Linux）
+    
+    :parameter key: 内存项名称，如VmRSS、VmHWM
+    :type key: <class 'str'>
+    
+    :return: memory: 内存字节数
+    :rtype: <class 'int'>
+    """
+    
+    with open('/proc/self/status') as file:
+        for line in file:
+            if line.startswith(key + ':'):
+                return int(line.split()[1]) * 1024
+    
+    return 0
+
+
+
+def peak_rss_growth(function, argument):
+    """
+    调用一次函数，返回常驻内存峰值相对调用前的增长，在measure_peak_rss()启动的子进程中运行
+    
+    :parameter function: 被测函数
+    :type function: <class 'function'>
+    
+    :parameter argument: 被测函数参数
+    :type argument: <class 'object'>
+    
+    :return: peak: 常驻内存峰值增长（字节），平台不支持时为None
+    :rtype: <class 'int'>
+    """
+    
+    try:
+        with open('/proc/self/clear_refs', 'w') as file:
+            file.write('5')  # 将VmHWM重置为当前常驻内存
+        
+        before = read_process_status('VmRSS')
+        function(argument)
+        
+        return read_process_status('VmHWM') - before
+    except OSError:
+        return None
+
+
+
+def measure_peak_rss(function, argument):
+    """
+    在新启动的子进程中调用一次函数，测量常驻内存峰值的增长（含lxml/libxml2等C扩展的内存，仅Linux）
+    使用新进程是为了避免复用本进程中已释放的内存导致测量结果偏小
+    
+    :parameter function: 被测函数（须可被pickle）
+    :type function: <class 'function'>
+    
+    :parameter argument: 被测函数参数
+    :type argument: <class 'object'>
+    
+    :return: peak: 常驻内存峰值增长（字节），平台不支持时为None
+    :rtype: <class 'int'>
+    """
+    
+    with get_context('spawn').Pool(1) as pool:
+        return pool.apply(peak_rss_growth, (function, argument))
+
+
+
+def benchmark_parser(directory=FIXTURE_DIRECTORY, repeat=REPEAT):
+    """
+    对比BeautifulSoup与预编译XPath提取气象数据的耗时与峰值内存，并校验两者结果一致
+    
+    :parameter directory: fixture目录，默认为FIXTURE_DIRECTORY
+    :type directory: <class 'str'>
+    
+    :parameter repeat: 每个fixture重复次数，默认为REPEAT
+    :type repeat: <class 'int'>
+    
+    :raise: exception: 没有fixture或提取结果不一致
+    :type: <class 'Exception'>
+    """
+    
+    paths = sorted(glob(join(directory, '*.html')))
+    
+    if not paths:
+        raise Exception('No Fixture in ' + directory + '! Run "python benchmark.py fixtures" First. ')
+    
+    soup_seconds, xpath_seconds, soup_peaks, xpath_peaks, soup_rss, xpath_rss = [], [], [], [], [], []
+    
+    for path in paths:
+        with open(path, encoding='utf-8') as file:
+            html = file.read()
+        
+        soup_result = soup_extract_weather_data(html)
+        xpath_result = extract_weather_data(html)
+        
+        if str(soup_result[0]) != str(xpath_result[0]) or \
+                [str(i) for i in soup_result[1]] != [str(i) for i in xpath_result[1]]:
+            raise Exception('Extraction Mismatch in ' + path + '! ')
+        
+        seconds, peak = measure(soup_extract_weather_data, html, repeat)
+        soup_seconds.append(seconds)
+        soup_peaks.append(peak)
+        seconds, peak = measure(extract_weather_data, html, repeat)
+        xpath_seconds.append(seconds)
+        xpath_peaks.append(peak)
+        soup_rss.append(measure_peak_rss(soup_extract_weather_data, html))
+        xpath_rss.append(measure_peak_rss(extract_weather_data, html))
+    
+    count = len(paths)
+    print_log('Fixtures: %d, Repeat: %d' % (count, repeat))
+    print_log('BeautifulSoup: %.2f ms/page, Python Heap Peak: %.0f KB/page (Max %.0f KB)' % (
+        1000 * sum(soup_seconds) / count, sum(soup_peaks) / count / 1024, max(soup_peaks) / 1024))
+    print_log('XPath:         %.2f ms/page, Python Heap Peak: %.0f KB/page (Max %.0f KB)' % (
+        1000 * sum(xpath_seconds) / count, sum(xpath_peaks) / count / 1024, max(xpath_peaks) / 1024))
+    
+    if None not in soup_rss:
+        print_log('Peak RSS Growth: BeautifulSoup %.0f KB/page, XPath %.0f KB/page (Max %.0f KB / %.0f KB)' % (
+            sum(soup_rss) / count / 1024, sum(xpath_rss) / count / 1024, max(soup_rss) / 1024,
+            max(xpath_rss) / 1024))
+    
+    print_log('Speedup: %.1fx' % (sum(soup_seconds) / sum(xpath_seconds)))
+
+
+
+def get_synthetic_cities(cities=SYNTHETIC_CITIES):
+    """
+    获取合成的(省份名, 城市名)元组列表，城市平均分配到SYNTHETIC_PROVINCES个省份
+    
+    :parameter cities: 合成城市数，默认为SYNTHETIC_CITIES
+    :type cities: <class 'int'>
+    
+    :return: city_rows: (省份名, 城市名)元组列表
+    :rtype: <class 'list'>
+    """
+    
+    return [('Province%02d' % (i % SYNTHETIC_PROVINCES), 'City%04d' % i) for i in range(cities)]
+
+
+
+def time_queries(cursor, query, values):
+    """
+    测量参数化查询的平均延迟
+    
+    :parameter cursor: MySQL游标对象
+    :type cursor: <class 'pymysql.cursors.DictCursor'>
+    
+    :parameter query: SQL查询语句
+    :type query: <class 'str'>
+    
+    :parameter values: 查询参数元组列表
+    :type values: <class 'list'>
+    
+    :return: milliseconds: 平均延迟（毫秒）
+    :rtype: <class 'float'>
+    """
+    
+    start_time = perf_counter()
+    
+    for value in values:
+        cursor.execute(query, value)
+        cursor.fetchall()
+    
+    return 1000 * (perf_counter() - start_time) / len(values)
+
+
+
+def benchmark_keys(cities=SYNTHETIC_CITIES, queries=KEY_QUERIES):
+    """
+    在与真实城市数规模相当的合成数据集上，对比City、RealTimeWeather、DateWeather添加主键前后的查询延迟，
+    City按省份查询，RealTimeWeather、DateWeather使用与mysql.py中query_real_time_weather()、query_date_weather()相同的查询条件
+    
+    :parameter cities: 合成城市数，默认为SYNTHETIC_CITIES
+    :type cities: <class 'int'>
+    
+    :parameter queries: 每个数据表的查询次数，默认为KEY_QUERIES
+    :type queries: <class 'int'>
+    
+    :raise: exception: MySQL连接错误
+    :type: <class 'Exception'>
+    """
+    
+    connection, cursor = mysql_acquire()
+    
+    if connection is None:
+        raise Exception('MySQL Connection ERROR! ')
+    
+    keys = {'City': 'province, city', 'RealTimeWeather': 'province, city',
+            'DateWeather': 'province, city, date_time'}  # 数据表名到主键的字典
+    city_rows = get_synthetic_cities(cities)
+    today = datetime.today()
+    real_time_weather_rows = [row + ('2021-05-01 08:00', '20.0℃', '0mm', '东北风', '3级', '50%', '21.0℃', '45',
+                                     '舒适', 20.0, 0.0, 50.0, 21.0, 45.0) for row in city_rows]
+    date_weather_rows = [row + ((today + timedelta(days=i)).strftime('%Y-%m-%d'), '25℃', '15℃', '晴', '多云',
+                                '东北风', '东风', '3~4级', '微风', 25.0, 15.0) for row in city_rows for i in range(7)]
+    samples = Random(0).sample(city_rows, min(queries, cities))
+    lookups = [
+        ('City', 'SELECT * FROM City' + BENCHMARK_SUFFIX + ' WHERE province=%s;', [(i[0],) for i in samples]),
+        ('RealTimeWeather', 'SELECT * FROM RealTimeWeather' + BENCHMARK_SUFFIX + ' WHERE province=%s AND city=%s;',
+         samples),
+        ('DateWeather', 'SELECT * FROM DateWeather' + BENCHMARK_SUFFIX + ' WHERE province=%s AND city=%s '
+                        'ORDER BY date_time;', samples),
+    ]
+    
+    try:
+        for table in keys:
+            cursor.execute('DROP TABLE IF EXISTS ' + table + BENCHMARK_SUFFIX + ';')
+            cursor.execute('CREATE TABLE ' + table + BENCHMARK_SUFFIX + ' LIKE ' + table + ';')
+            
+            if cursor.execute('SHOW KEYS FROM ' + table + BENCHMARK_SUFFIX + ' WHERE Key_name="PRIMARY";'):
+                cursor.execute('ALTER TABLE ' + table + BENCHMARK_SUFFIX + ' DROP PRIMARY KEY;')
+        
+        cursor.executemany('INSERT INTO City' + BENCHMARK_SUFFIX + '(province,city) VALUES (%s,%s);', city_rows)
+        cursor.executemany(REAL_TIME_WEATHER_INSERT.format(BENCHMARK_SUFFIX), real_time_weather_rows)
+        cursor.executemany(DATE_WEATHER_INSERT.format(BENCHMARK_SUFFIX), date_weather_rows)
+        connection.commit()
+        print_log('Synthetic Dataset: %d Cities, %d Real Time Weather Rows, %d Date Weather Rows, %d Queries/Table' % (
+            cities, len(real_time_weather_rows), len(date_weather_rows), len(samples)))
+        before = {table: time_queries(cursor, query, values) for table, query, values in lookups}
+        
+        for table, key in keys.items():
+            cursor.execute('ALTER TABLE ' + table + BENCHMARK_SUFFIX + ' ADD PRIMARY KEY (' + key + ');')
+        
+        after = {table: time_queries(cursor, query, values) for table, query, values in lookups}
+        
+        for table, _, _ in lookups:
+            print_log('%-16s No Key: %.3f ms/query, Primary Key: %.3f ms/query, Speedup: %.1fx' % (
+                table, before[table], after[table], before[table] / after[table]))
+    finally:
+        for table in keys:
+            cursor.execute('DROP TABLE IF EXISTS ' + table + BENCHMARK_SUFFIX + ';')
+        
+        mysql_release(connection, cursor)
+
+
+
+def manager_worker(province_id, province, city_urls, cities, all_city_urls, all_cities, lock):
+    """
+    优化前的城市数据回传方式：子进程在Manager锁保护下向Manager共享列表追加结果
+    
+    :parameter province_id: 省份代号
+    :type province_id: <class 'str'>
+    
+    :parameter province: 省份名
+    :type province: <class 'str'>
+    
+    :parameter city_urls: 城市url列表
+    :type city_urls: <class 'list'>
+    
+    :parameter cities: 城市名列表
+    :type cities: <class 'list'>
+    
+    :parameter all_city_urls: 所有城市url的字典列表
+    :type all_city_urls: <class 'multiprocessing.managers.ListProxy'>
+    
+    :parameter all_cities: 所有城市的字典列表
+    :type all_cities: <class 'multiprocessing.managers.ListProxy'>
+    
+    :parameter lock: 多进程管理锁
+    :type lock: <class 'multiprocessing.managers.AcquirerProxy'>
+    """
+    
+    lock.acquire()
+    all_city_urls.append({province_id: city_urls})
+    all_cities.append({province: cities})
+    lock.release()
+
+
+
+def tuple_worker(province_id, province, city_urls, cities):
+    """
+    优化后的城市数据回传方式：与main.py中经CrawlEngine调用的get_all_cities_data()相同，子进程直接返回结果元组
+    
+    :parameter province_id: 省份代号
+    :type province_id: <class 'str'>
+    
+    :parameter province: 省份名
+    :type province: <class 'str'>
+    
+    :parameter city_urls: 城市url列表
+    :type city_urls: <class 'list'>
+    
+    :parameter cities: 城市名列表
+    :type cities: <class 'list'>
+    
+    :return: result: (省份代号, 省份名, 城市url列表, 城市名列表)元组
+    :rtype: <class 'tuple'>
+    """
+    
+    return province_id, province, city_urls, cities
+
+
+
+def benchmark_ipc(cities=SYNTHETIC_CITIES, repeat=REPEAT):
+    """
+    在与真实城市数规模相当的合成数据上，对比两种城市数据回传方式的进程间通信开销：
+    回传耗时（不含进程池启动）与主进程遍历所有城市构造爬取任务的耗时；
+    优化前为Pool子进程写Manager共享列表，优化后与main.py相同，由CrawlEngine在ProcessPoolExecutor中运行并直接返回结果元组
+    
+    :parameter cities: 合成城市数，默认为SYNTHETIC_CITIES
+    :type cities: <class 'int'>
+    
+    :parameter repeat: 重复次数，默认为REPEAT
+    :type repeat: <class 'int'>
+    """
+    
+    provinces = {}
+    
+    for province, city in get_synthetic_cities(cities):
+        provinces.setdefault(province, []).append(city)
+    
+    arguments = [(province[-2:], province, [city.lower() for city in province_cities], province_cities)
+                 for province, province_cities in provinces.items()]
+    manager_seconds, manager_read_seconds, tuple_seconds, tuple_read_seconds = 0.0, 0.0, 0.0, 0.0
+    start_time = perf_counter()
+    manager = Manager()
+    manager_start_seconds = perf_counter() - start_time
+    
+    # 与main.py相同的执行器与爬虫引擎，不按主机限速，只测量回传开销
+    engine_tasks = [(FORECAST_URL + i[0] + '/', i) for i in arguments]
+    
+    with Pool(cpu_count()) as pool, ProcessPoolExecutor(cpu_count()) as executor:
+        pool.starmap(tuple_worker, arguments)  # 预先启动所有子进程
+        list(executor.map(tuple_worker, *zip(*arguments)))
+        engine = CrawlEngine(executor, host_interval=0, progress_step=len(arguments))
+        
+        for _ in range(repeat):
+            lock = manager.Lock()
+            all_city_urls = manager.list()
+            all_cities = manager.list()
+            start_time = perf_counter()
+            results = [pool.apply_async(manager_worker, i + (all_city_urls, all_cities, lock)) for i in arguments]
+            
+            for result in results:
+                result.get()
+            
+            manager_seconds += perf_counter() - start_time
+            start_time = perf_counter()
+            tasks = []
+            
+            for i in range(len(all_city_urls)):  # 与优化前main.py主循环相同的读取方式
+                province_id = list(all_city_urls[i].keys())[0]
+                province = list(all_cities[i].keys())[0]
+                city_urls = list(all_city_urls[i].values())[0]
+                province_cities = list(all_cities[i].values())[0]
+                
+                for j in range(len(city_urls)):
+                    tasks.append((province_id, province, city_urls[j], province_cities[j]))
+            
+            manager_read_seconds += perf_counter() - start_time
+            start_time = perf_counter()
+            results = engine.run(tuple_worker, engine_tasks)
+            tuple_seconds += perf_counter() - start_time
+            start_time = perf_counter()
+            all_tasks = [(province_id, province, city_urls[j], province_cities[j])
+                         for province_id, province, city_urls, province_cities in results
+                         for j in range(len(city_urls))]
+            tuple_read_seconds += perf_counter() - start_time
+            
+            if sorted(tasks) != sorted(all_tasks):
+                raise Exception('IPC Result Mismatch! ')
+    
+    manager.shutdown()
+    print_log('Synthetic Dataset: %d Provinces, %d Cities, Repeat: %d, Manager Startup: %.1f ms' % (
+        len(arguments), cities, repeat, 1000 * manager_start_seconds))
+    print_log('Manager ListProxy + Lock: Return %.2f ms, Read %.2f ms' % (
+        1000 * manager_seconds / repeat, 1000 * manager_read_seconds / repeat))
+    print_log('CrawlEngine Tuples:       Return %.2f ms, Read %.2f ms' % (
+        1000 * tuple_seconds / repeat, 1000 * tuple_read_seconds / repeat))
+    print_log('Speedup: %.1fx' % ((manager_seconds + manager_read_seconds) / (tuple_seconds + tuple_read_seconds)))
+
+
+
+class LegacyRealTimeWeather:
+    """
+    优化前的实时天气类（每个对象一个属性字典，所有字段为字符串），作为对比基准，省略了获取方法
+    """
+    
+    
+    
+    def __init__(self, publish_time, temperature, precipitation, wind_direction, wind_power, relative_humidity,
+                 sensible_temperature, aqi, comfort):
+        """
+        优化前的实时天气类初始化，参数与weather.RealTimeWeather相同
+        """
+        
+        self.__publish_time = '-' if publish_time == '' else publish_time
+        self.__temperature = '-' if temperature == '' else temperature
+        self.__precipitation = '-' if precipitation == '' else precipitation
+        self.__wind_direction = '-' if wind_direction == '' else wind_direction
+        self.__wind_power = '-' if wind_power == '' else wind_power
+        self.__relative_humidity = '-' if relative_humidity == '' else relative_humidity
+        self.__sensible_temperature = '-' if sensible_temperature == '' else sensible_temperature
+        self.__aqi = '-' if aqi == '' else aqi
+        self.__comfort = '-' if comfort == '' else comfort
+
+
+
+class LegacyDateWeather:
+    """
+    优化前的日期天气类（每个对象一个属性字典，所有字段为字符串），作为对比基准，省略了获取方法
+    """
+    
+    
+    
+    def __init__(self, date, highest_temperature, lowest_temperature, weather_description1, weather_description2,
+                 wind_direction1, wind_direction2, wind_level1, wind_level2):
+        """
+        优化前的日期天气类初始化，参数与weather.DateWeather相同
+        """
+        
+        self.__date = date
+        self.__highest_temperature = '-' if highest_temperature == '' else highest_temperature
+        self.__lowest_temperature = '-' if lowest_temperature == '' else lowest_temperature
+        self.__weather_description1 = '-' if weather_description1 == '' else weather_description1
+        self.__weather_description2 = '-' if weather_description2 == '' else weather_description2
+        self.__wind_direction1 = '-' if wind_direction1 == '' else wind_direction1
+        self.__wind_direction2 = '-' if wind_direction2 == '' else wind_direction2
+        self.__wind_level1 = '-' if wind_level1 == '' else wind_level1
+        self.__wind_level2 = '-' if wind_level2 == '' else wind_level2
+
+
+
+def get_synthetic_weathers_arguments(cities=SYNTHETIC_CITIES):
+    """
+    生成合成的气象数据类构造参数，字段格式与nmc.cn页面一致，每个字段为独立的字符串对象（与解析结果相同）
+    
+    :parameter cities: 合成城市数，默认为SYNTHETIC_CITIES
+    :type cities: <class 'int'>
+    
+    :return: arguments: (实时天气参数元组, 7个日期天气参数元组的列表)元组列表
+    :rtype: <class 'list'>
+    """
+    
+    random = Random(0)
+    directions = ['东风', '南风', '西风', '北风', '东北风', '西南风']
+    descriptions = ['晴', '多云', '阴', '小雨', '中雨', '雷阵雨']
+    date = datetime(2021, 6, 1)
+    arguments = []
+    
+    for _ in range(cities):
+        temperature = random.randint(-20, 40)
+        real_time_weather = ('%02d:00' % random.randint(0, 23), '%d℃' % temperature,
+                             '%.1fmm' % random.choice([0, 0, 0.5, 2.3]), random.choice(directions),
+                             '%d级' % random.randint(1, 6), '%d%%' % random.randint(10, 100),
+                             '%.1f℃' % (temperature + random.uniform(-3, 3)),
+                             random.choice(['', '空气质量：%d' % random.randint(10, 300)]), random.choice(['舒适', '较冷']))
+        date_weathers = [(date + timedelta(days=i), '%d℃' % (temperature + random.randint(0, 8)),
+                          '%d℃' % (temperature - random.randint(0, 8)), random.choice(descriptions),
+                          random.choice(descriptions), random.choice(directions), random.choice(directions),
+                          '%d级' % random.randint(1, 6), '%d级' % random.randint(1, 6)) for i in range(7)]
+        arguments.append((real_time_weather, date_weathers))
+    
+    return arguments
+
+
+
+def build_weathers(classes, arguments):
+    """
+    构造所有城市的气象数据类对象
+    
+    :parameter classes: (实时天气类, 日期天气类)元组
+    :type classes: <class 'tuple'>
+    
+    :parameter arguments: get_synthetic_weathers_arguments()返回的列表
+    :type arguments: <class 'list'>
+    
+    :return: weathers: (实时天气类对象, 日期天气类对象列表)元组列表
+    :rtype: <class 'list'>
+    """
+    
+    real_time_weather_class, date_weather_class = classes
+    
+    return [(real_time_weather_class(*real_time_weather), [date_weather_class(*i) for i in date_weathers])
+            for real_time_weather, date_weathers in arguments]
+
+
+
+def benchmark_model(cities=SYNTHETIC_CITIES, repeat=REPEAT):
+    """
+    在合成数据上对比优化前后气象数据类：单个对象的内存（不含共享的字段字符串）、
+    每个城市结果单独pickle的大小（与进程间回传方式相同）、构造耗时与pickle往返耗时
+    
+    :parameter cities: 合成城市数，默认为SYNTHETIC_CITIES
+    :type cities: <class 'int'>
+    
+    :parameter repeat: 重复次数，默认为REPEAT
+    :type repeat: <class 'int'>
+    """
+    
+    arguments = get_synthetic_weathers_arguments(cities)
+    objects = cities * 8  # 每个城市1个实时天气对象与7个日期天气对象
+    print_log('Synthetic Dataset: %d Cities, %d Objects, Repeat: %d' % (cities, objects, repeat))
+    results = {}
+    
+    for name, classes in (('Legacy', (LegacyRealTimeWeather, LegacyDateWeather)),
+                          ('Slotted', (RealTimeWeather, DateWeather))):
+        construction_seconds, _ = measure(partial(build_weathers, classes), arguments, repeat)
+        start()
+        weathers = build_weathers(classes, arguments)
+        memory = get_traced_memory()[0]
+        stop()
+        pickles = [dumps(weather, HIGHEST_PROTOCOL) for weather in weathers]
+        start_time = perf_counter()
+        
+        for _ in range(repeat):
+            for weather in weathers:
+                loads(dumps(weather, HIGHEST_PROTOCOL))
+        
+        pickle_seconds = (perf_counter() - start_time) / repeat
+        results[name] = (memory / objects, sum(map(len, pickles)) / cities, construction_seconds, pickle_seconds)
+        print_log('%-8s Memory: %.1f B/Object, Pickle: %.1f B/City, Construction: %.2f ms, Pickle Round Trip: '
+                  '%.2f ms' % (name, memory / objects, sum(map(len, pickles)) / cities, 1000 * construction_seconds,
+                               1000 * pickle_seconds))
+    
+    legacy, slotted = results['Legacy'], results['Slotted']
+    print_log('Slotted / Legacy: Memory %.2fx, Pickle %.2fx, Construction %.2fx, Pickle Round Trip %.2fx' % tuple(
+        slotted[i] / legacy[i] for i in range(4)))
+
+
+
+def benchmark_writes(cities=SYNTHETIC_CITIES):
+    """
+    在与真实城市数规模相当的合成数据集上测量一轮预报任务的写入与发布延迟：
+    优化前逐城市删除后插入、每个城市提交一次，优化后经BulkWriter调用write_weathers_chunk()按主键批量更新、
+    每个微批次提交一次；发布延迟为begin_snapshot()复制影子表与publish_snapshot()原子替换的耗时，
+    所有操作都在带BENCHMARK_SUFFIX后缀的数据表上进行，不影响在线数据
+    
+    :parameter cities: 合成城市数，默认为SYNTHETIC_CITIES
+    :type cities: <class 'int'>
+    
+    :raise: exception: MySQL连接错误或写入错误
+    :type: <class 'Exception'>
+    """
+    
+    connection, cursor = mysql_acquire()
+    
+    if connection is None:
+        raise Exception('MySQL Connection ERROR! ')
+    
+    tables = ['RealTimeWeather' + BENCHMARK_SUFFIX, 'DateWeather' + BENCHMARK_SUFFIX]
+    weathers = [city_row + weather for city_row, weather in zip(get_synthetic_cities(cities), build_weathers(
+        (RealTimeWeather, DateWeather), get_synthetic_weathers_arguments(cities)))]
+    
+    def write():
+        writer = BulkWriter(suffix=BENCHMARK_SUFFIX)
+        
+        for weather in weathers:
+            writer.put(weather)
+        
+        rows, failed = writer.close()
+        
+        if failed:
+            raise Exception('Stream Write ERROR! %d Cities Failed. ' % failed)
+        
+        return rows
+    
+    try:
+        for table in tables:
+            for suffix in ('', STAGING_SUFFIX, OLD_SUFFIX):
+                cursor.execute('DROP TABLE IF EXISTS ' + table + suffix + ';')
+            
+            cursor.execute('CREATE TABLE ' + table + ' LIKE ' + table[:-len(BENCHMARK_SUFFIX)] + ';')
+        
+        rows = write()  # 预先写入一轮，与每晚更新已有数据的情况相同
+        print_log('Synthetic Dataset: %d Cities, %d Rows' % (cities, rows))
+        start_time = perf_counter()
+        
+        for province, city, real_time_weather, date_weathers in weathers:
+            for table in tables:
+                cursor.execute('DELETE FROM ' + table + ' WHERE province=%s AND city=%s;', (province, city))
+            
+            cursor.execute(REAL_TIME_WEATHER_INSERT.format(BENCHMARK_SUFFIX),
+                           get_real_time_weather_row(province, city, real_time_weather))
+            cursor.executemany(DATE_WEATHER_INSERT.format(BENCHMARK_SUFFIX),
+                               get_date_weather_rows(province, city, date_weathers))
+            connection.commit()
+        
+        before = perf_counter() - start_time
+        start_time = perf_counter()
+        write()
+        after = perf_counter() - start_time
+        print_log('Per City Delete and Insert: %.2fs (%.0f Rows/s), BulkWriter: %.2fs (%.0f Rows/s), Speedup: %.1fx' % (
+            before, rows / before, after, rows / after, before / after))
+        start_time = perf_counter()
+        
+        for table in tables:
+            cursor.execute('CREATE TABLE ' + table + STAGING_SUFFIX + ' LIKE ' + table + ';')
+            cursor.execute('INSERT INTO ' + table + STAGING_SUFFIX + ' SELECT * FROM ' + table + ';')
+        
+        connection.commit()
+        copy_seconds = perf_counter() - start_time
+        start_time = perf_counter()
+        cursor.execute('RENAME TABLE ' + ', '.join(table + ' TO ' + table + OLD_SUFFIX + ', ' + table + STAGING_SUFFIX +
+                                                   ' TO ' + table for table in tables) + ';')
+        rename_seconds = perf_counter() - start_time
+        print_log('Publish: Snapshot Copy %.2fs, Atomic Rename %.2f ms' % (copy_seconds, 1000 * rename_seconds))
+    finally:
+        for table in tables:
+            for suffix in ('', STAGING_SUFFIX, OLD_SUFFIX):
+                cursor.execute('DROP TABLE IF EXISTS ' + table + suffix + ';')
+        
+        mysql_release(connection, cursor)
+
+
+
+if __name__ == '__main__':
+    command = argv[1] if len(argv) > 1 else 'parser'
+    fixture_directory = argv[2] if len(argv) > 2 else FIXTURE_DIRECTORY
+    
+    if command == 'fixtures':
+        # FIRST_CITY_URLS与省份代号一一对应，先获取省份代号
+        province_ids, _ = get_province_data(FORECAST_URL + 'ASH/xujiahui.html')
+        save_fixtures([FORECAST_URL + province_ids[i] + '/' + FIRST_CITY_URLS[i] + '.html'
+                       for i in range(len(FIRST_CITY_URLS))], fixture_directory)
+    elif command == 'parser':
+        benchmark_parser(fixture_directory)
+    elif command == 'keys':
+        benchmark_keys(int(argv[2]) if len(argv) > 2 else SYNTHETIC_CITIES)
+    elif command == 'ipc':
+        benchmark_ipc(int(argv[2]) if len(argv) > 2 else SYNTHETIC_CITIES)
+    elif command == 'model':
+        benchmark_model(int(argv[2]) if len(argv) > 2 else SYNTHETIC_CITIES)
+    elif command == 'writes':
+        benchmark_writes(int(argv[2]) if len(argv) > 2 else SYNTHETIC_CITIES)
+    else:
+        print(__doc__)
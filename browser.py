@@ -0,0 +1,258 @@
+#!usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+browser.py
+Define Some Browser Classes and Browser Functions.
+1. get_process_memory()
+2. WebDriverPool
+"""
+
+from threading import Lock, BoundedSemaphore
+from contextlib import contextmanager
+from os import listdir
+
+from metrics import increase, measure
+from tools import DEBUG, print_log, print_traceback_error
+
+
+
+# Define Global Variables.
+WEB_DRIVER_POOL_SIZE = 1  # Web Driver Pool Size Per Process
+WEB_DRIVER_MAX_PAGES = 200  # Recycle Web Driver After Crawling So Many Pages
+WEB_DRIVER_MAX_MEMORY = 1024 * 1024 * 1024  # Recycle Web Driver When Its Processes Grow Past So Many Bytes
+
+
+
+def get_process_memory(pid):
+    """
+    获取进程及其所有子进程的常驻内存（仅Linux，其他平台返回0）
+    
+    :parameter pid: 进程号
+    :type pid: <class 'int'>
+    
+    :return: memory: 常驻内存字节数
+    :rtype: <class 'int'>
+    """
+    
+    memory = 0
+    
+    try:
+        with open('/proc/' + str(pid) + '/status') as file:
+            for line in file:
+                if line.startswith('VmRSS:'):
+                    memory += int(line.split()[1]) * 1024
+                    
+                    break
+        
+        for task in listdir('/proc/' + str(pid) + '/task'):
+            with open('/proc/' + str(pid) + '/task/' + task + '/children') as file:
+                for child in file.read().split():
+                    memory += get_process_memory(int(child))
+    except (OSError, ValueError):
+        pass
+    
+    return memory
+
+
+
+class WebDriverPool:
+    """
+    Selenium Web Driver池类，每个进程持有一个，在多个url之间复用浏览器
+    """
+    
+    
+    
+    def __init__(self, factory, size=WEB_DRIVER_POOL_SIZE, max_pages=WEB_DRIVER_MAX_PAGES,
+                 max_memory=WEB_DRIVER_MAX_MEMORY):
+        """
+        Selenium Web Driver池类初始化
+        
+        :parameter factory: 创建Selenium Web Driver的函数
+        :type factory: <class 'function'>
+        
+        :parameter size: 池容量，默认为WEB_DRIVER_POOL_SIZE
+        :type size: <class 'int'>
+        
+        :parameter max_pages: 单个Web Driver最多爬取的页面数，默认为WEB_DRIVER_MAX_PAGES
+        :type max_pages: <class 'int'>
+        
+        :parameter max_memory: 单个Web Driver（含浏览器子进程）最大常驻内存字节数，默认为WEB_DRIVER_MAX_MEMORY
+        :type max_memory: <class 'int'>
+        """
+        
+        self.__factory = factory
+        self.__max_pages = max_pages
+        self.__max_memory = max_memory
+        self.__semaphore = BoundedSemaphore(size)
+        self.__lock = Lock()
+        self.__idle_web_drivers = []  # 空闲Web Driver列表
+        self.__pages = {}  # Web Driver id到已爬取页面数的字典
+        self.__closed = False
+    
+    
+    
+    def __is_healthy(self, web_driver):
+        """
+        检查Web Driver是否仍然可用
+        
+        :parameter web_driver: Selenium Web Driver
+        :type web_driver: <class 'selenium.webdriver'>
+        
+        :return: healthy: 是否可用
+        :rtype: <class 'bool'>
+        """
+        
+        try:
+            web_driver.current_url  # 浏览器已退出或无响应时抛出异常
+            
+            return True
+        except Exception:
+            return False
+    
+    
+    
+    def __should_recycle(self, web_driver):
+        """
+        判断Web Driver是否需要回收
+        
+        :parameter web_driver: Selenium Web Driver
+        :type web_driver: <class 'selenium.webdriver'>
+        
+        :return: recycle: 是否需要回收
+        :rtype: <class 'bool'>
+        """
+        
+        if self.__pages.get(id(web_driver), 0) >= self.__max_pages:
+            return True
+        
+        try:
+            pid = web_driver.service.process.pid
+        except AttributeError:
+            return False
+        
+        return get_process_memory(pid) >= self.__max_memory
+    
+    
+    
+    def __quit(self, web_driver):
+        """
+        退出Web Driver
+        
+        :parameter web_driver: Selenium Web Driver
+        :type web_driver: <class 'selenium.webdriver'>
+        """
+        
+        self.__pages.pop(id(web_driver), None)
+        
+        try:
+            web_driver.quit()
+            print_log('Selenium Web Driver Quit Successfully! ', DEBUG)
+        except Exception as exception:
+            print_traceback_error(exception, 'Selenium Web Driver Quit')
+    
+    
+    
+    def acquire(self):
+        """
+        从池中获取一个可用的Web Driver，池中没有时创建
+        
+        :return: web_driver: Selenium Web Driver
+        :rtype: <class 'selenium.webdriver'>
+        
+        :raise: exception: Selenium Web Driver初始化错误
+        :type: <class 'Exception'>
+        """
+        
+        self.__semaphore.acquire()
+        
+        try:
+            while True:
+                with self.__lock:
+                    web_driver = self.__idle_web_drivers.pop() if self.__idle_web_drivers else None
+                
+                if web_driver is None:
+                    break
+                
+                if self.__is_healthy(web_driver):
+                    return web_driver
+                
+                self.__quit(web_driver)
+            
+            with measure('raingod_selenium_initialization_seconds'):
+                web_driver = self.__factory()
+            
+            if web_driver is None:  # 工厂函数初始化失败时返回None而不抛出异常
+                increase('raingod_selenium_initialization_failures_total')
+                
+                raise Exception('Selenium Web Driver Initialization ERROR! ')
+            
+            self.__pages[id(web_driver)] = 0
+            
+            return web_driver
+        except BaseException:
+            self.__semaphore.release()
+            
+            raise
+    
+    
+    
+    def release(self, web_driver, broken=False):
+        """
+        将Web Driver归还到池中，页面数或内存超限、已损坏时回收
+        
+        :parameter web_driver: Selenium Web Driver
+        :type web_driver: <class 'selenium.webdriver'>
+        
+        :parameter broken: Web Driver是否已损坏，默认为False
+        :type broken: <class 'bool'>
+        """
+        
+        try:
+            self.__pages[id(web_driver)] = self.__pages.get(id(web_driver), 0) + 1
+            
+            if broken or self.__closed or self.__should_recycle(web_driver):
+                self.__quit(web_driver)
+            else:
+                with self.__lock:
+                    self.__idle_web_drivers.append(web_driver)
+        finally:
+            self.__semaphore.release()
+    
+    
+    
+    @contextmanager
+    def web_driver(self):
+        """
+        以上下文管理器方式借用Web Driver，异常时视为已损坏
+        
+        :return: web_driver: Selenium Web Driver
+        :rtype: <class 'selenium.webdriver'>
+        """
+        
+        web_driver = self.acquire()
+        
+        try:
+            yield web_driver
+        except BaseException:
+            self.release(web_driver, broken=True)
+            
+            raise
+        else:
+            self.release(web_driver)
+    
+    
+    
+    def close(self):
+        """
+        退出池中所有空闲Web Driver
+        """
+        
+        self.__closed = True
+        
+        with self.__lock:
+            web_drivers = self.__idle_web_drivers[:]
+            self.__idle_web_drivers.clear()
+        
+        for web_driver in web_drivers:
+            self.__quit(web_driver)
@@ -0,0 +1,372 @@
+#!usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+cache.py
+Define Some Cache Classes.
+1. FingerprintCache
+2. GenerationWatcher
+3. LRUCache
+4. PageViewCounter
+"""
+
+from collections import OrderedDict
+from sqlite3 import connect
+from threading import Lock
+from time import time, monotonic
+from os import getpid, makedirs
+from os.path import dirname
+from multiprocessing.util import Finalize
+
+from tools import print_log
+
+
+
+# Define Global Variables.
+# 状态文件放在子目录中：uWSGI以touch-reload监视项目目录，在项目目录中创建、删除文件会使网站重新加载
+FINGERPRINT_CACHE_PATH = './state/fingerprint.db'  # Fingerprint Cache SQLite Database Path
+GENERATION_CHECK_INTERVAL = 10  # Min Interval Between Two Generation Checks(Seconds)
+LRU_CACHE_SIZE = 1024  # LRU Cache Max Entries
+PAGE_VIEW_FLUSH_INTERVAL = 30  # Min Interval Between Two Page View Flushes(Seconds)
+
+
+
+class FingerprintCache:
+    """
+    持久化的url内容指纹缓存类，保存ETag、Last-Modified与提取数据的哈希值，并统计每个url的访问间隔与变化次数，
+    供爬取计划估计变化频率，只在主进程中使用，put()线程安全
+    """
+    
+    
+    
+    def __init__(self, path=FINGERPRINT_CACHE_PATH):
+        """
+        url内容指纹缓存类初始化
+        
+        :parameter path: SQLite数据库路径，默认为FINGERPRINT_CACHE_PATH
+        :type path: <class 'str'>
+        """
+        
+        makedirs(dirname(path) or '.', exist_ok=True)
+        self.__connection = connect(path, check_same_thread=False)  # put()在爬虫引擎的消费线程中调用
+        self.__connection.execute('PRAGMA journal_mode=WAL')  # 提交时不再创建、删除-journal文件
+        self.__lock = Lock()
+        self.__connection.execute(
+            'CREATE TABLE IF NOT EXISTS Fingerprint (url TEXT PRIMARY KEY, etag TEXT, last_modified TEXT, '
+            'digest TEXT, updated_at REAL)')
+        self.__connection.execute(
+            'CREATE TABLE IF NOT EXISTS Visit (url TEXT PRIMARY KEY, intervals INTEGER, changes INTEGER, '
+            'elapsed REAL, visited_at REAL)')
+        self.__connection.commit()
+        self.__hits = 0
+        self.__misses = 0
+    
+    
+    
+    def get(self, url):
+        """
+        获取url的内容指纹
+        
+        :parameter url: 爬虫目标地址
+        :type url: <class 'str'>
+        
+        :return: fingerprint: (ETag, Last-Modified, 数据哈希值)元组，未缓存时为None
+        :rtype: <class 'tuple'>
+        """
+        
+        row = self.__connection.execute(
+            'SELECT etag, last_modified, digest FROM Fingerprint WHERE url=?', (url,)).fetchone()
+        
+        return tuple(row) if row else None
+    
+    
+    
+    def put(self, url, fingerprint, changed):
+        """
+        保存url的内容指纹，记录命中情况与本次访问（第一次访问只记录时间）
+        
+        :parameter url: 爬虫目标地址
+        :type url: <class 'str'>
+        
+        :parameter fingerprint: (ETag, Last-Modified, 数据哈希值)元组
+        :type fingerprint: <class 'tuple'>
+        
+        :parameter changed: 内容是否发生变化
+        :type changed: <class 'bool'>
+        """
+        
+        with self.__lock:
+            if changed:
+                self.__misses += 1
+            else:
+                self.__hits += 1
+            
+            now = time()
+            self.__connection.execute(
+                'INSERT OR REPLACE INTO Fingerprint (url, etag, last_modified, digest, updated_at) VALUES (?,?,?,?,?)',
+                (url,) + tuple(fingerprint) + (now,))
+            self.__connection.execute(
+                'INSERT INTO Visit (url, intervals, changes, elapsed, visited_at) VALUES (?,0,0,0.0,?) '
+                'ON CONFLICT(url) DO UPDATE SET intervals=intervals+1, changes=changes+?, '
+                'elapsed=elapsed+excluded.visited_at-visited_at, visited_at=excluded.visited_at',
+                (url, now, int(changed)))
+    
+    
+    
+    def get_visits(self):
+        """
+        获取所有url的访问统计
+        
+        :return: visits: url到(访问间隔数, 其中内容发生变化的次数, 间隔总秒数, 上一次访问时间戳)元组的字典
+        :rtype: <class 'dict'>
+        """
+        
+        with self.__lock:
+            return {row[0]: tuple(row[1:]) for row in self.__connection.execute(
+                'SELECT url, intervals, changes, elapsed, visited_at FROM Visit')}
+    
+    
+    
+    def commit(self):
+        """
+        提交所有已保存的内容指纹
+        """
+        
+        self.__connection.commit()
+    
+    
+    
+    def rollback(self):
+        """
+        丢弃所有未提交的内容指纹
+        """
+        
+        self.__connection.rollback()
+    
+    
+    
+    def report(self):
+        """
+        报告本轮命中率并清零计数
+        
+        :return: hit_ratio: 命中率
+        :rtype: <class 'float'>
+        """
+        
+        total = self.__hits + self.__misses
+        hit_ratio = self.__hits / total if total else 0.0
+        print_log('Fingerprint Cache Hits: %d, Misses: %d, Hit Ratio: %.1f%%' % (
+            self.__hits, self.__misses, 100.0 * hit_ratio))
+        self.__hits = 0
+        self.__misses = 0
+        
+        return hit_ratio
+    
+    
+    
+    def close(self):
+        """
+        提交并关闭缓存
+        """
+        
+        self.__connection.commit()
+        self.__connection.close()
+
+
+
+class GenerationWatcher:
+    """
+    数据发布代数观察类，在网站进程中使用，每interval秒最多查询一次MySQL，线程安全；
+    查询在锁外进行，查询期间其他线程沿用上次结果，不因MySQL响应慢而排队等待
+    """
+    
+    
+    
+    def __init__(self, loader, interval=GENERATION_CHECK_INTERVAL):
+        """
+        数据发布代数观察类初始化
+        
+        :parameter loader: 查询发布代数的函数，返回数据表名到发布代数的字典，失败时返回None
+        :type loader: <class 'function'>
+        
+        :parameter interval: 两次查询的最小间隔（秒），默认为GENERATION_CHECK_INTERVAL
+        :type interval: <class 'float'>
+        """
+        
+        self.__loader = loader
+        self.__interval = interval
+        self.__lock = Lock()
+        self.__generations = {}  # 数据表名到发布代数的字典
+        self.__checked_at = None  # 最近一次开始查询的时间
+        self.__loaded_at = None  # 当前结果开始查询的时间
+    
+    
+    
+    def get(self, name):
+        """
+        获取数据表的发布代数，距上次查询超过interval秒时重新查询，查询失败时沿用上次结果
+        
+        :parameter name: 数据表名
+        :type name: <class 'str'>
+        
+        :return: generation: 发布代数，从未发布时为None
+        :rtype: <class 'int'>
+        """
+        
+        with self.__lock:
+            now = monotonic()
+            stale = self.__checked_at is None or now - self.__checked_at >= self.__interval
+            
+            if stale:
+                self.__checked_at = now  # 只有一个线程查询
+        
+        generations = self.__loader() if stale else None
+        
+        with self.__lock:
+            # 查询比interval慢时多次查询可能重叠，不用较早开始的查询结果覆盖较新的结果
+            if generations is not None and (self.__loaded_at is None or now > self.__loaded_at):
+                self.__generations = generations
+                self.__loaded_at = now
+            
+            return self.__generations.get(name)
+
+
+
+class LRUCache:
+    """
+    最近最少使用（LRU）淘汰的内存缓存类，线程安全
+    """
+    
+    
+    
+    def __init__(self, max_size=LRU_CACHE_SIZE):
+        """
+        LRU缓存类初始化
+        
+        :parameter max_size: 最大缓存项数，默认为LRU_CACHE_SIZE
+        :type max_size: <class 'int'>
+        """
+        
+        self.__max_size = max_size
+        self.__lock = Lock()
+        self.__entries = OrderedDict()  # 键到缓存值的有序字典，最近使用的在末尾
+    
+    
+    
+    def get(self, key):
+        """
+        获取缓存值并标记为最近使用
+        
+        :parameter key: 缓存键
+        :type key: <class 'tuple'>
+        
+        :return: value: 缓存值，未缓存时为None
+        :rtype: <class 'object'>
+        """
+        
+        with self.__lock:
+            value = self.__entries.get(key)
+            
+            if value is not None:
+                self.__entries.move_to_end(key)
+            
+            return value
+    
+    
+    
+    def put(self, key, value):
+        """
+        保存缓存值，超过最大缓存项数时淘汰最近最少使用的项
+        
+        :parameter key: 缓存键
+        :type key: <class 'tuple'>
+        
+        :parameter value: 缓存值
+        :type value: <class 'object'>
+        """
+        
+        with self.__lock:
+            self.__entries[key] = value
+            self.__entries.move_to_end(key)
+            
+            while len(self.__entries) > self.__max_size:
+                self.__entries.popitem(last=False)
+
+
+
+class PageViewCounter:
+    """
+    页面浏览量计数类，在网站进程中使用：浏览量先累加在内存中，每interval秒最多批量写入MySQL一次，
+    写入失败时保留到下一次，进程退出时写入剩余的浏览量，线程安全
+    """
+    
+    
+    
+    def __init__(self, flusher, interval=PAGE_VIEW_FLUSH_INTERVAL):
+        """
+        页面浏览量计数类初始化
+        
+        :parameter flusher: 批量写入浏览量的函数，参数为(省份名, 城市名)到新增浏览量的字典，返回是否成功
+        :type flusher: <class 'function'>
+        
+        :parameter interval: 两次写入的最小间隔（秒），默认为PAGE_VIEW_FLUSH_INTERVAL
+        :type interval: <class 'float'>
+        """
+        
+        self.__flusher = flusher
+        self.__interval = interval
+        self.__lock = Lock()
+        self.__counts = {}  # (省份名, 城市名)到未写入浏览量的字典
+        self.__flushed_at = monotonic()
+        self.__pid = None  # 注册退出写入的进程号，uWSGI在fork worker之前导入网站时由各worker重新注册
+    
+    
+    
+    def hit(self, province, city):
+        """
+        记录一次城市页面浏览，距上次写入超过interval秒时批量写入
+        
+        :parameter province: 省份名
+        :type province: <class 'str'>
+        
+        :parameter city: 城市名
+        :type city: <class 'str'>
+        """
+        
+        if self.__pid != getpid():
+            self.__lock = Lock()  # fork时锁可能正被父进程的其他线程持有
+            self.__counts = {}  # 父进程的浏览量由父进程写入
+            self.__pid = getpid()
+            Finalize(self, self.flush, args=(True,), exitpriority=6)  # 先于指标写出
+        
+        with self.__lock:
+            key = (province, city)
+            self.__counts[key] = self.__counts.get(key, 0) + 1
+        
+        self.flush()
+    
+    
+    
+    def flush(self, force=False):
+        """
+        批量写入未写入的浏览量，距上次写入不足interval秒时跳过
+        
+        :parameter force: 是否立即写入，默认为False
+        :type force: <class 'bool'>
+        """
+        
+        with self.__lock:
+            now = monotonic()
+            
+            if not self.__counts or not force and now - self.__flushed_at < self.__interval:
+                return
+            
+            self.__flushed_at = now
+            counts = self.__counts
+            self.__counts = {}
+        
+        # 在锁外写入MySQL，不阻塞其他请求
+        if not self.__flusher(counts):
+            with self.__lock:
+                for key, views in counts.items():
+                    self.__counts[key] = self.__counts.get(key, 0) + views
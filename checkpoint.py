@@ -0,0 +1,218 @@
+#!usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+checkpoint.py
+Define Some Checkpoint Classes.
+1. CrawlCheckpoint
+"""
+
+from sqlite3 import connect
+from threading import Lock
+from pickle import dumps, loads, HIGHEST_PROTOCOL
+from time import time
+from os import makedirs
+from os.path import dirname
+
+from tools import print_log, print_traceback_error
+
+
+
+# Define Global Variables.
+CHECKPOINT_PATH = './state/checkpoint.db'  # Crawl Checkpoint SQLite Database Path, Outside uWSGI's touch-reload Path
+CHECKPOINT_MAX_AGE = 6 * 3600  # Unfinished Runs Older Than So Many Seconds Are Discarded Instead of Resumed
+CHECKPOINT_COMMIT_STEP = 20  # Commit the Checkpoint Every So Many Completed Items
+
+
+
+class CrawlCheckpoint:
+    """
+    持久化的爬取检查点类，保存每轮爬取已完成的url及其解析结果，进程中断后下一次启动从断点继续，
+    只在主进程中使用，put()线程安全
+    """
+    
+    
+    
+    def __init__(self, path=CHECKPOINT_PATH, max_age=CHECKPOINT_MAX_AGE, commit_step=CHECKPOINT_COMMIT_STEP,
+                 max_ages=None):
+        """
+        爬取检查点类初始化
+        
+        :parameter path: SQLite数据库路径，默认为CHECKPOINT_PATH
+        :type path: <class 'str'>
+        
+        :parameter max_age: 未完成的爬取超过多少秒后不再继续，默认为CHECKPOINT_MAX_AGE
+        :type max_age: <class 'float'>
+        
+        :parameter commit_step: 每完成多少个url提交一次，默认为CHECKPOINT_COMMIT_STEP
+        :type commit_step: <class 'int'>
+        
+        :parameter max_ages: 爬取任务名到该任务未完成的爬取最多继续多少秒的字典，未列出的任务使用max_age，默认为None
+        :type max_ages: <class 'dict'>
+        """
+        
+        makedirs(dirname(path) or '.', exist_ok=True)
+        self.__connection = connect(path, check_same_thread=False)  # put()在爬虫引擎的消费线程中调用
+        self.__connection.execute('PRAGMA journal_mode=WAL')  # 提交时不再创建、删除-journal文件
+        self.__connection.execute(
+            'CREATE TABLE IF NOT EXISTS Run (run_id INTEGER PRIMARY KEY AUTOINCREMENT, job TEXT, started_at REAL, '
+            'finished_at REAL)')
+        self.__connection.execute(
+            'CREATE TABLE IF NOT EXISTS Item (run_id INTEGER, url TEXT, result BLOB, PRIMARY KEY (run_id, url))')
+        self.__connection.commit()
+        self.__max_age = max_age
+        self.__max_ages = max_ages or {}
+        self.__commit_step = commit_step
+        self.__lock = Lock()
+        self.__run_id = None
+        self.__started_at = None
+        self.__uncommitted = 0
+    
+    
+    
+    def __find_unfinished(self, job):
+        """
+        查找未完成且未过期的爬取
+        
+        :parameter job: 爬取任务名
+        :type job: <class 'str'>
+        
+        :return: run: (爬取编号, 开始时间戳)元组，没有时为None
+        :rtype: <class 'tuple'>
+        """
+        
+        return self.__connection.execute(
+            'SELECT run_id, started_at FROM Run WHERE job=? AND finished_at IS NULL AND started_at>=? '
+            'ORDER BY run_id DESC', (job, time() - self.__max_ages.get(job, self.__max_age))).fetchone()
+    
+    
+    
+    def get_last_run(self, job):
+        """
+        获取最近一次已完成的爬取的开始时间
+        
+        :parameter job: 爬取任务名
+        :type job: <class 'str'>
+        
+        :return: started_at: 开始时间戳，从未完成时为0.0
+        :rtype: <class 'float'>
+        """
+        
+        row = self.__connection.execute(
+            'SELECT MAX(started_at) FROM Run WHERE job=? AND finished_at IS NOT NULL', (job,)).fetchone()
+        
+        return row[0] or 0.0
+    
+    
+    
+    def begin(self, job):
+        """
+        开始一轮爬取：有未完成且未过期的爬取时从断点继续，否则丢弃过期的爬取并新建一轮
+        
+        :parameter job: 爬取任务名
+        :type job: <class 'str'>
+        
+        :return: completed: 已完成的url到解析结果的字典
+        :rtype: <class 'dict'>
+        """
+        
+        run = self.__find_unfinished(job)
+        self.__uncommitted = 0
+        
+        if run is not None:
+            self.__run_id, self.__started_at = run
+            
+            try:
+                completed = {url: loads(result) for url, result in self.__connection.execute(
+                    'SELECT url, result FROM Item WHERE run_id=?', (self.__run_id,))}
+                print_log('Resuming %s Run %d with %d Completed Items. ' % (job, self.__run_id, len(completed)))
+                
+                return completed
+            except Exception as exception:  # 如气象数据类的pickle格式已改变，放弃断点重新开始
+                print_traceback_error(exception, 'Resume %s Run %d' % (job, self.__run_id))
+        
+        self.__connection.execute(
+            'DELETE FROM Item WHERE run_id IN (SELECT run_id FROM Run WHERE job=? AND finished_at IS NULL)', (job,))
+        self.__connection.execute('DELETE FROM Run WHERE job=? AND finished_at IS NULL', (job,))
+        self.__connection.execute(
+            'DELETE FROM Run WHERE job=? AND run_id<(SELECT MAX(run_id) FROM Run WHERE job=? AND finished_at IS NOT '
+            'NULL)', (job, job))  # 只保留最近一次已完成的爬取
+        self.__started_at = time()
+        self.__run_id = self.__connection.execute(
+            'INSERT INTO Run (job, started_at) VALUES (?,?)', (job, self.__started_at)).lastrowid
+        self.__connection.commit()
+        print_log('Beginning %s Run %d. ' % (job, self.__run_id))
+        
+        return {}
+    
+    
+    
+    def get_started_at(self):
+        """
+        获取本轮爬取的开始时间，从断点继续时与中断前相同
+        
+        :return: started_at: 开始时间戳
+        :rtype: <class 'float'>
+        """
+        
+        return self.__started_at
+    
+    
+    
+    def put(self, url, result):
+        """
+        保存一个已完成的url及其解析结果，每commit_step个提交一次
+        
+        :parameter url: 爬虫目标地址
+        :type url: <class 'str'>
+        
+        :parameter result: 解析结果（须可被pickle）
+        :type result: <class 'object'>
+        """
+        
+        body = dumps(result, HIGHEST_PROTOCOL)
+        
+        with self.__lock:
+            self.__connection.execute(
+                'INSERT OR REPLACE INTO Item (run_id, url, result) VALUES (?,?,?)', (self.__run_id, url, body))
+            self.__uncommitted += 1
+            
+            if self.__uncommitted >= self.__commit_step:
+                self.__connection.commit()
+                self.__uncommitted = 0
+    
+    
+    
+    def commit(self):
+        """
+        提交所有已保存的url
+        """
+        
+        with self.__lock:
+            self.__connection.commit()
+            self.__uncommitted = 0
+    
+    
+    
+    def finish(self):
+        """
+        结束本轮爬取：标记为已完成并删除保存的解析结果，在数据发布后调用
+        """
+        
+        with self.__lock:
+            self.__connection.execute('UPDATE Run SET finished_at=? WHERE run_id=?', (time(), self.__run_id))
+            self.__connection.execute('DELETE FROM Item WHERE run_id=?', (self.__run_id,))
+            self.__connection.commit()
+            self.__uncommitted = 0
+        
+        print_log('Finish Run %d Successfully! ' % self.__run_id)
+    
+    
+    
+    def close(self):
+        """
+        提交并关闭检查点
+        """
+        
+        self.__connection.commit()
+        self.__connection.close()
@@ -6,10 +6,25 @@ crawler.py
 Define Some Crawler Functions and Some Parser Functions.
 1. selenium_initialization()
 2. crawler()
-3. parser()
-4. get_province_data()
-5. get_city_data()
-6. get_weather_data()
+3. web_driver_pool_initialization()
+4. get_web_driver_pool()
+5. parser()
+6. extract_province_data()
+7. extract_city_data()
+8. extract_weather_data()
+9. format_json_value()
+10. extract_real_time_weather_data()
+11. get_weather_digest()
+12. fetch_with_web_driver()
+13. fetch_json()
+14. fetch_city_data()
+15. fetch_real_time_weather_data()
+16. fetch_weather_data()
+17. fetch_and_extract()
+18. get_province_data()
+19. get_city_data()
+20. get_weather_data()
+21. get_weather_data_if_changed()
 """
 
 from selenium import webdriver
@@ -21,13 +36,23 @@ from selenium.webdriver.support import expected_conditions
 from selenium.webdriver.common.by import By
 from selenium.common.exceptions import TimeoutException
 from bs4 import BeautifulSoup
+from lxml.html import document_fromstring
+from lxml.etree import XPath
 from sys import platform
 from time import sleep
 from random import uniform
 from datetime import datetime, timedelta
+from multiprocessing.util import Finalize
+from os import getpid
+from hashlib import sha1
+from json import loads
+from urllib.parse import urlsplit
 
 from weather import RealTimeWeather, DateWeather
-from tools import print_log, print_traceback_error
+from fetcher import decode_body, get_http_fetcher
+from browser import WebDriverPool
+from metrics import measure
+from tools import DEBUG, WARNING, logging_initialization, print_log, print_traceback_error
 
 
 
@@ -39,6 +64,24 @@ else:
     CHROME_WEB_DRIVER_PATH = './resources/chromedriver'  # Linux Chrome Web Driver Path
     FIREFOX_WEB_DRIVER_PATH = './resources/geckodriver'  # Linux Firefox Web Driver Path
 
+FETCH_MODE = 'http'  # Fetch Mode: 'http'(Fall Back to Selenium When Extraction Fails) or 'selenium'
+# 城市列表与实时天气由页面脚本从以下JSON接口加载，原始HTML中只有7天预报；HTTP模式直接请求这些接口
+CITY_LIST_PATH = '/rest/province/'  # City List JSON Path, Followed by the Province ID
+REAL_TIME_WEATHER_PATH = '/rest/weather?stationid='  # Real Time Weather JSON Path, Followed by the Station ID
+MISSING_VALUE = 9999  # Missing Value of Numeric Fields in the JSON Data
+COMFORT_TEXTS = {4: '很热，极不适应', 3: '热，很不舒适', 2: '暖，不舒适', 1: '温暖，较舒适', 0: '舒适，最可接受',
+                 -1: '凉爽，较舒适', -2: '凉，不舒适', -3: '冷，很不舒适', -4: '很冷，极不适应'}  # Comfort Level Texts
+
+REAL_TIME_WEATHER_IDS = ('realPublishTime', 'realTemperature', 'realRain', 'realWindDirect', 'realWindPower',
+                         'realHumidity', 'realFeelst', 'aqi', 'realIcomfort')  # Real Time Weather Element IDs
+DATE_WEATHER_CLASSES = ('tmp', 'desc', 'windd', 'winds')  # Date Weather <div> Classes
+# 每个进程导入时编译一次，一次求值即按文档顺序取出实时天气元素与日期天气<div>
+WEATHER_XPATH = XPath(
+    '//*[' + ' or '.join('@id="' + i + '"' for i in REAL_TIME_WEATHER_IDS) + '] | //div[' + ' or '.join(
+        'contains(concat(" ", normalize-space(@class), " "), " ' + i + ' ")' for i in DATE_WEATHER_CLASSES) + ']')
+
+_station_ids = {}  # 城市页面路径到气象站编号的字典，每个进程在获取城市列表时填充
+
 
 
 def selenium_initialization(browser_webdriver_path, browser_type, hide=True):
@@ -120,7 +163,7 @@ def selenium_initialization(browser_webdriver_path, browser_type, hide=True):
 
 
 
-def crawler(web_driver, url):
+def crawler(web_driver, url, keep=False):
     """
     爬虫
     
@@ -130,6 +173,9 @@ def crawler(web_driver, url):
     :parameter url: 爬虫目标地址
     :type url: <class 'str'>
     
+    :parameter keep: 爬取后是否保留Web Driver（由Web Driver池复用），默认为False
+    :type keep: <class 'bool'>
+    
     :return: result: 爬虫目标地址HTML源代码
     :rtype: <class 'str'>
     
@@ -137,7 +183,7 @@ def crawler(web_driver, url):
     :type: <class 'Exception'>
     """
     
-    print_log('Crawling...... ')
+    print_log('Crawling...... ', DEBUG)
     
     while True:
         try:
@@ -159,17 +205,66 @@ def crawler(web_driver, url):
                     sleep(uniform(10, 300))
             
             result = web_driver.page_source
-            web_driver.close()
-            web_driver.quit()
-            print_log('Crawler Successfully! ')
+            
+            if not keep:
+                web_driver.close()
+                web_driver.quit()
+            
+            print_log('Crawler Successfully! ', DEBUG)
             
             return result
         except Exception as exception:
             print_traceback_error(exception, 'Crawler')
+            
+            # 池中的Web Driver交由池回收并重建
+            if keep:
+                raise
+            
             sleep(300)
 
 
 
+# 每个进程各自持有一个Web Driver池
+_web_driver_pool = None
+_web_driver_pool_pid = None
+
+
+
+def web_driver_pool_initialization(log_queue=None):
+    """
+    初始化当前进程的Web Driver池，作为多进程池的initializer使用，进程退出时退出池中所有浏览器
+    
+    :parameter log_queue: 主进程的日志队列，传入时子进程的日志经该队列由主进程统一写出，默认为None
+    :type log_queue: <class 'multiprocessing.queues.Queue'>
+    """
+    
+    global _web_driver_pool, _web_driver_pool_pid
+    
+    if log_queue is not None:
+        logging_initialization(queue=log_queue)
+    
+    _web_driver_pool = WebDriverPool(lambda: selenium_initialization(FIREFOX_WEB_DRIVER_PATH, 'Firefox'))
+    _web_driver_pool_pid = getpid()
+    Finalize(_web_driver_pool, _web_driver_pool.close, exitpriority=10)
+    print_log('Selenium Web Driver Pool Initialization Successfully! ')
+
+
+
+def get_web_driver_pool():
+    """
+    获取当前进程的Web Driver池，未初始化时先初始化
+    
+    :return: web_driver_pool: Selenium Web Driver池类对象
+    :rtype: <class 'browser.WebDriverPool'>
+    """
+    
+    if _web_driver_pool is None or _web_driver_pool_pid != getpid():
+        web_driver_pool_initialization()
+    
+    return _web_driver_pool
+
+
+
 def parser(html):
     """
     Beautiful Soup HTML源代码解析
@@ -185,6 +280,387 @@ def parser(html):
 
 
 
+def extract_province_data(html, strict=False):
+    """
+    从HTML源代码中提取省份数据
+    
+    :parameter html: 爬虫目标地址HTML源代码
+    :type html: <class 'str'>
+    
+    :parameter strict: 是否在未提取到数据时抛出异常，默认为False
+    :type strict: <class 'bool'>
+    
+    :returns
+    
+    :return: province_ids: 省份id字符串列表
+    :rtype: <class 'list'>
+    
+    :return: provinces: 省份字符串列表
+    :rtype: <class 'list'>
+    
+    :raise: exception: 未提取到省份数据
+    :type: <class 'Exception'>
+    """
+    
+    soup = parser(html)
+    # 使用BeautifulSoup进行解析
+    options = soup.find_all('option')
+    province_ids = []
+    provinces = []
+    
+    # 遍历列表提取HTML标签内的属性值和文本
+    for item in options:
+        if len(list(item.attrs.keys())) == 1:
+            if item.attrs['value']:
+                province_ids.append(item.attrs['value'])
+                provinces.append(item.get_text())
+    
+    if strict and not province_ids:
+        raise Exception('Province Data Not Found! ')
+    
+    return province_ids, provinces
+
+
+
+def extract_city_data(html):
+    """
+    从Web Driver渲染后的HTML源代码中提取城市数据（城市下拉列表由页面脚本加载，原始HTML中没有）
+    
+    :parameter html: 爬虫目标地址HTML源代码
+    :type html: <class 'str'>
+    
+    :returns
+    
+    :return: city_urls: 城市url字符串列表
+    :rtype: <class 'list'>
+    
+    :return: cities: 城市字符串列表
+    :rtype: <class 'list'>
+    """
+    
+    soup = parser(html)
+    # 使用BeautifulSoup进行解析
+    options = soup.find_all('option')
+    city_urls = []
+    cities = []
+    
+    # 遍历列表提取HTML标签内的属性值和文本
+    for item in options:
+        if len(list(item.attrs.keys())) == 2:
+            city_urls.append(item.attrs['url'][22:-5])
+            cities.append(item.get_text())
+    
+    return city_urls, cities
+
+
+
+def extract_weather_data(html, strict=False):
+    """
+    从HTML源代码中提取气象数据
+    
+    :parameter html: 爬虫目标地址HTML源代码
+    :type html: <class 'str'>
+    
+    :parameter strict: 是否在实时天气未加载时抛出异常（原始HTML中实时天气为空，由页面脚本加载），默认为False
+    :type strict: <class 'bool'>
+    
+    :returns
+    
+    :return: real_time_weather: 实时天气类对象
+    :rtype: <class 'weather.RealTimeWeather'>
+    
+    :return: date_weathers: 日期天气类对象列表
+    :rtype: <class 'list'>
+    
+    :raise: exception: 未提取到实时天气数据
+    :type: <class 'Exception'>
+    """
+    
+    # 使用预编译的XPath表达式一次取出所有目标节点，按id或class分组
+    texts = {}  # id到文本的字典
+    date_texts = {class_name: [] for class_name in DATE_WEATHER_CLASSES}  # class到文本列表的字典
+    
+    for node in WEATHER_XPATH(document_fromstring(html)):
+        node_id = node.get('id')
+        
+        if node_id in REAL_TIME_WEATHER_IDS:
+            texts.setdefault(node_id, node.text_content())
+        else:
+            for class_name in node.get('class', '').split():
+                if class_name in date_texts:
+                    date_texts[class_name].append(node.text_content().strip())
+    
+    real_time_publish_time = texts['realPublishTime']
+    
+    # 实时天气由页面脚本动态加载，原始HTML中可能为空
+    if strict and not real_time_publish_time.strip():
+        raise Exception('Real Time Weather Data Not Found! ')
+    
+    # 创建RealTimeWeather类对象real_time_weather
+    real_time_weather = RealTimeWeather(real_time_publish_time, texts['realTemperature'], texts['realRain'],
+                                        texts['realWindDirect'], texts['realWindPower'], texts['realHumidity'],
+                                        texts['realFeelst'], texts['aqi'].strip(), texts['realIcomfort'])
+    temperatures = date_texts['tmp']
+    weather_descriptions = date_texts['desc']
+    wind_directions = date_texts['windd']
+    wind_levels = date_texts['winds']
+    # 创建date_weathers列表
+    date_weathers = []
+    # 获取当前日期时间
+    date = datetime.today()
+    
+    # 遍历各列表提取HTML标签内文本
+    for i in range(7):
+        highest_temperature = temperatures[2 * i]
+        lowest_temperature = temperatures[2 * i + 1]
+        weather_description1 = weather_descriptions[2 * i]
+        weather_description2 = weather_descriptions[2 * i + 1]
+        wind_direction1 = wind_directions[2 * i]
+        wind_direction2 = wind_directions[2 * i + 1]
+        wind_level1 = wind_levels[2 * i]
+        wind_level2 = wind_levels[2 * i + 1]
+        # 创建DateWeather类对象并添加进DateWeather类对象列表date_weathers
+        date_weathers.append(
+            DateWeather(date, highest_temperature, lowest_temperature, weather_description1, weather_description2,
+                        wind_direction1, wind_direction2, wind_level1, wind_level2))
+        # 当前日期时间值＋1天
+        date += timedelta(days=1)
+    
+    return real_time_weather, date_weathers
+
+
+
+def format_json_value(value):
+    """
+    把JSON中的数值格式化为与页面相同的文本，缺测值（MISSING_VALUE）与空值为''
+    
+    :parameter value: JSON数值
+    :type value: <class 'float'>
+    
+    :return: text: 文本
+    :rtype: <class 'str'>
+    """
+    
+    if value is None or value == MISSING_VALUE:
+        return ''
+    
+    return str(value)
+
+
+
+def extract_real_time_weather_data(data):
+    """
+    从实时天气JSON数据中提取实时天气，文本与页面脚本写入实时天气元素的文本相同
+    
+    :parameter data: REAL_TIME_WEATHER_PATH接口返回的JSON对象
+    :type data: <class 'dict'>
+    
+    :return: real_time_weather: 实时天气类对象
+    :rtype: <class 'weather.RealTimeWeather'>
+    
+    :raise: exception: 未提取到实时天气数据
+    :type: <class 'Exception'>
+    """
+    
+    real = (data.get('data') or {}).get('real')
+    
+    if not real or not real.get('publish_time'):
+        raise Exception('Real Time Weather Data Not Found! ')
+    
+    weather = real['weather']
+    wind = real['wind']
+    air = data['data'].get('air') or {}
+    
+    return RealTimeWeather(real['publish_time'] + ' 发布', format_json_value(weather.get('temperature')),
+                           format_json_value(weather.get('rain')), wind.get('direct', ''), wind.get('power', ''),
+                           format_json_value(weather.get('humidity')), format_json_value(weather.get('feelst')),
+                           air.get('text', ''), COMFORT_TEXTS.get(weather.get('icomfort'), ''))
+
+
+
+def get_weather_digest(weathers):
+    """
+    计算提取的气象数据的哈希值
+    
+    :parameter weathers: 实时天气或日期天气类对象列表
+    :type weathers: <class 'list'>
+    
+    :return: digest: 气象数据SHA-1哈希值
+    :rtype: <class 'str'>
+    """
+    
+    digest = sha1()
+    
+    for weather in weathers:
+        digest.update(str(weather).encode('utf-8'))
+    
+    return digest.hexdigest()
+
+
+
+def fetch_with_web_driver(url):
+    """
+    使用Web Driver池中的Firefox浏览器获取爬虫目标地址HTML源代码
+    
+    :parameter url: 爬虫目标地址
+    :type url: <class 'str'>
+    
+    :return: html: 爬虫目标地址HTML源代码
+    :rtype: <class 'str'>
+    """
+    
+    with get_web_driver_pool().web_driver() as web_driver, measure('raingod_fetch_seconds', method='selenium'):
+        return crawler(web_driver, url, keep=True)
+
+
+
+def fetch_json(url):
+    """
+    使用HTTP长连接获取JSON数据
+    
+    :parameter url: JSON接口地址
+    :type url: <class 'str'>
+    
+    :return: data: JSON对象
+    :rtype: <class 'object'>
+    """
+    
+    return loads(get_http_fetcher().fetch(url))
+
+
+
+def fetch_city_data(url):
+    """
+    从页面脚本加载城市下拉列表的JSON接口获取城市数据，并记录各城市的气象站编号
+    
+    :parameter url: 城市页面地址，如http://www.nmc.cn/publish/forecast/ASH/xujiahui.html
+    :type url: <class 'str'>
+    
+    :returns
+    
+    :return: city_urls: 城市url字符串列表
+    :rtype: <class 'list'>
+    
+    :return: cities: 城市字符串列表
+    :rtype: <class 'list'>
+    
+    :raise: exception: 未获取到城市数据
+    :type: <class 'Exception'>
+    """
+    
+    parts = urlsplit(url)
+    items = fetch_json(parts.scheme + '://' + parts.netloc + CITY_LIST_PATH + parts.path.split('/')[-2])
+    
+    if not items:
+        raise Exception('City Data Not Found! ')
+    
+    for item in items:  # item['url']与城市下拉列表<option>的url属性相同
+        _station_ids[item['url']] = item['code']
+    
+    return [item['url'][22:-5] for item in items], [item['city'] for item in items]
+
+
+
+def fetch_real_time_weather_data(url):
+    """
+    从页面脚本加载实时天气的JSON接口获取实时天气，气象站编号未知时先获取该省份的城市列表
+    
+    :parameter url: 城市页面地址
+    :type url: <class 'str'>
+    
+    :return: real_time_weather: 实时天气类对象
+    :rtype: <class 'weather.RealTimeWeather'>
+    
+    :raise: exception: 气象站编号未知
+    :type: <class 'Exception'>
+    """
+    
+    parts = urlsplit(url)
+    
+    if parts.path not in _station_ids:
+        fetch_city_data(url)
+    
+    if parts.path not in _station_ids:
+        raise Exception('Station ID Not Found! ')
+    
+    data = fetch_json(parts.scheme + '://' + parts.netloc + REAL_TIME_WEATHER_PATH + _station_ids[parts.path])
+    
+    with measure('raingod_parse_seconds', extractor='extract_real_time_weather_data'):
+        return extract_real_time_weather_data(data)
+
+
+
+def fetch_weather_data(url, html=None):
+    """
+    不启动浏览器获取气象数据：7天预报从原始HTML中提取，实时天气从JSON接口获取
+    
+    :parameter url: 城市页面地址
+    :type url: <class 'str'>
+    
+    :parameter html: 已获取的原始HTML源代码，默认为None（重新获取）
+    :type html: <class 'str'>
+    
+    :returns
+    
+    :return: real_time_weather: 实时天气类对象
+    :rtype: <class 'weather.RealTimeWeather'>
+    
+    :return: date_weathers: 日期天气类对象列表
+    :rtype: <class 'list'>
+    """
+    
+    if html is None:
+        html = get_http_fetcher().fetch(url)
+    
+    with measure('raingod_parse_seconds', extractor='extract_weather_data'):
+        _, date_weathers = extract_weather_data(html)
+    
+    return fetch_real_time_weather_data(url), date_weathers
+
+
+
+def fetch_and_extract(url, extractor, fetcher=None):
+    """
+    获取爬虫目标地址的数据
+    FETCH_MODE为'http'时先不启动浏览器获取：给定fetcher时调用fetcher(url)（请求页面脚本使用的JSON接口），
+    否则使用HTTP长连接获取原始HTML源代码并严格提取；失败时再使用Selenium Web Driver获取渲染后的页面并提取
+    
+    :parameter url: 爬虫目标地址
+    :type url: <class 'str'>
+    
+    :parameter extractor: 渲染后页面的提取函数
+    :type extractor: <class 'function'>
+    
+    :parameter fetcher: HTTP模式的获取函数，默认为None
+    :type fetcher: <class 'function'>
+    
+    :return: results: 提取函数返回结果
+    :rtype: <class 'tuple'>
+    """
+    
+    if FETCH_MODE == 'http':
+        try:
+            print_log('Fetching...... ', DEBUG)
+            
+            if fetcher is not None:
+                return fetcher(url)
+            
+            html = get_http_fetcher().fetch(url)
+            print_log('Parsing...... ', DEBUG)
+            
+            with measure('raingod_parse_seconds', extractor=extractor.__name__):
+                return extractor(html, strict=True)
+        except Exception as exception:
+            print_log('HTTP Fetch ' + url + ' Failed: ' + str(exception) + ' Falling Back to Selenium...... ', WARNING)
+    
+    html = fetch_with_web_driver(url)
+    print_log('Parsing...... ', DEBUG)
+    
+    with measure('raingod_parse_seconds', extractor=extractor.__name__):
+        return extractor(html)
+
+
+
 def get_province_data(url):
     """
     获取省份数据
@@ -205,24 +681,8 @@ def get_province_data(url):
     """
     
     try:
-        # 使用Firefox浏览器进行爬虫
-        web_driver = selenium_initialization(FIREFOX_WEB_DRIVER_PATH, 'Firefox')
-        html = crawler(web_driver, url)
-        print_log('Parsing...... ')
-        soup = parser(html)
-        # 使用BeautifulSoup进行解析
-        options = soup.find_all('option')
-        province_ids = []
-        provinces = []
-        
-        # 遍历列表提取HTML标签内的属性值和文本
-        for item in options:
-            if len(list(item.attrs.keys())) == 1:
-                if item.attrs['value']:
-                    province_ids.append(item.attrs['value'])
-                    provinces.append(item.get_text())
-        
-        print_log('Parser Successfully! ')
+        province_ids, provinces = fetch_and_extract(url, extract_province_data)
+        print_log('Parser Successfully! ', DEBUG)
         
         return province_ids, provinces
     except Exception as exception:
@@ -252,23 +712,8 @@ def get_city_data(url):
     """
     
     try:
-        # 使用Firefox浏览器进行爬虫
-        web_driver = selenium_initialization(FIREFOX_WEB_DRIVER_PATH, 'Firefox')
-        html = crawler(web_driver, url)
-        print_log('Parsing...... ')
-        soup = parser(html)
-        # 使用BeautifulSoup进行解析
-        options = soup.find_all('option')
-        city_urls = []
-        cities = []
-        
-        # 遍历列表提取HTML标签内的属性值和文本
-        for item in options:
-            if len(list(item.attrs.keys())) == 2:
-                city_urls.append(item.attrs['url'][22:-5])
-                cities.append(item.get_text())
-        
-        print_log('Parser Successfully! ')
+        city_urls, cities = fetch_and_extract(url, extract_city_data, fetch_city_data)
+        print_log('Parser Successfully! ', DEBUG)
         
         return city_urls, cities
     except Exception as exception:
@@ -298,53 +743,8 @@ def get_weather_data(url):
     """
     
     try:
-        # 使用Firefox浏览器进行爬虫
-        web_driver = selenium_initialization(FIREFOX_WEB_DRIVER_PATH, 'Firefox')
-        html = crawler(web_driver, url)
-        print_log('Parsing...... ')
-        soup = parser(html)
-        # 使用BeautifulSoup进行解析
-        real_time_publish_time = soup.find(id='realPublishTime').get_text()
-        real_time_temperature = soup.find(id='realTemperature').get_text()
-        real_time_precipitation = soup.find(id='realRain').get_text()
-        real_time_wind_direction = soup.find(id='realWindDirect').get_text()
-        real_time_wind_power = soup.find(id='realWindPower').get_text()
-        real_time_relative_humidity = soup.find(id='realHumidity').get_text()
-        real_time_sensible_temperature = soup.find(id='realFeelst').get_text()
-        real_time_aqi = soup.find(id='aqi').get_text().strip()
-        real_time_comfort = soup.find(id='realIcomfort').get_text()
-        # 创建RealTimeWeather类对象real_time_weather
-        real_time_weather = RealTimeWeather(real_time_publish_time, real_time_temperature, real_time_precipitation,
-                                            real_time_wind_direction, real_time_wind_power, real_time_relative_humidity,
-                                            real_time_sensible_temperature, real_time_aqi, real_time_comfort)
-        # 使用BeautifulSoup进行解析
-        temperatures = soup.find_all('div', attrs={'class': 'tmp'})
-        weather_descriptions = soup.find_all('div', attrs={'class': 'desc'})
-        wind_directions = soup.find_all('div', attrs={'class': 'windd'})
-        wind_levels = soup.find_all('div', attrs={'class': 'winds'})
-        # 创建date_weathers列表
-        date_weathers = []
-        # 获取当前日期时间
-        date = datetime.today()
-        
-        # 遍历各列表提取HTML标签内文本
-        for i in range(7):
-            highest_temperature = temperatures[2 * i].get_text().strip()
-            lowest_temperature = temperatures[2 * i + 1].get_text().strip()
-            weather_description1 = weather_descriptions[2 * i].get_text().strip()
-            weather_description2 = weather_descriptions[2 * i + 1].get_text().strip()
-            wind_direction1 = wind_directions[2 * i].get_text().strip()
-            wind_direction2 = wind_directions[2 * i + 1].get_text().strip()
-            wind_level1 = wind_levels[2 * i].get_text().strip()
-            wind_level2 = wind_levels[2 * i + 1].get_text().strip()
-            # 创建DateWeather类对象并添加进DateWeather类对象列表date_weathers
-            date_weathers.append(
-                DateWeather(date, highest_temperature, lowest_temperature, weather_description1, weather_description2,
-                            wind_direction1, wind_direction2, wind_level1, wind_level2))
-            # 当前日期时间值＋1天
-            date += timedelta(days=1)
-        
-        print_log('Parser Successfully! ')
+        real_time_weather, date_weathers = fetch_and_extract(url, extract_weather_data, fetch_weather_data)
+        print_log('Parser Successfully! ', DEBUG)
         
         return real_time_weather, date_weathers
     except Exception as exception:
@@ -354,6 +754,94 @@ def get_weather_data(url):
 
 
 
+def get_weather_data_if_changed(url, fingerprint=None):
+    """
+    条件获取气象数据：7天预报所在的页面携带ETag/Last-Modified发送条件请求，实时天气每次从JSON接口获取；
+    数据哈希值由实时天气与7天预报的哈希值以':'连接，页面未修改时只返回发生变化的实时天气，都未变化时不返回气象数据
+    
+    :parameter url: 爬虫目标地址
+    :type url: <class 'str'>
+    
+    :parameter fingerprint: 上一次的(ETag, Last-Modified, 数据哈希值)元组，默认为None
+    :type fingerprint: <class 'tuple'>
+    
+    :returns
+    
+    :return: fingerprint: 新的(ETag, Last-Modified, 数据哈希值)元组，获取失败时为None
+    :rtype: <class 'tuple'>
+    
+    :return: real_time_weather: 实时天气类对象，未变化时为None
+    :rtype: <class 'weather.RealTimeWeather'>
+    
+    :return: date_weathers: 日期天气类对象列表，未变化或页面未修改时为None
+    :rtype: <class 'list'>
+    
+    :exception: exception: 爬虫目标地址HTML源代码解析错误
+    :type: <class 'Exception'>
+    """
+    
+    etag, last_modified, digest = fingerprint if fingerprint else (None, None, None)
+    real_time_digest, _, date_digest = (digest or '').partition(':')
+    
+    try:
+        real_time_weather, date_weathers = None, None
+        new_date_digest = None
+        
+        if FETCH_MODE == 'http':
+            headers = {}
+            
+            if date_digest:  # 只有记录了7天预报的哈希值时才能在页面未修改时沿用
+                if etag:
+                    headers['If-None-Match'] = etag
+                
+                if last_modified:
+                    headers['If-Modified-Since'] = last_modified
+            
+            try:
+                print_log('Fetching...... ', DEBUG)
+                status, response_headers, body = get_http_fetcher().request(url, headers)
+                
+                if status == 304:
+                    print_log('Not Modified! ', DEBUG)
+                    new_date_digest = date_digest
+                    real_time_weather = fetch_real_time_weather_data(url)
+                elif status == 200:
+                    real_time_weather, date_weathers = fetch_weather_data(url, decode_body(response_headers, body))
+                    etag, last_modified = response_headers.get('etag'), response_headers.get('last-modified')
+                else:
+                    raise Exception('HTTP Status ERROR! ' + str(status))
+            except Exception as exception:
+                print_log('HTTP Fetch ' + url + ' Failed: ' + str(exception) + ' Falling Back to Selenium...... ',
+                          WARNING)
+                real_time_weather, date_weathers, new_date_digest = None, None, None
+                etag, last_modified = None, None
+        
+        if real_time_weather is None:
+            html = fetch_with_web_driver(url)
+            print_log('Parsing...... ', DEBUG)
+            
+            with measure('raingod_parse_seconds', extractor='extract_weather_data'):
+                real_time_weather, date_weathers = extract_weather_data(html)
+        
+        print_log('Parser Successfully! ', DEBUG)
+        new_real_time_digest = get_weather_digest([real_time_weather])
+        
+        if date_weathers is not None:
+            new_date_digest = get_weather_digest(date_weathers)
+        
+        new_fingerprint = (etag, last_modified, new_real_time_digest + ':' + new_date_digest)
+        
+        if new_real_time_digest == real_time_digest and new_date_digest == date_digest:
+            return new_fingerprint, None, None
+        
+        return new_fingerprint, real_time_weather, date_weathers
+    except Exception as exception:
+        print_traceback_error(exception, 'Parser')
+        
+        return None, None, None
+
+
+
 if __name__ == '__main__':
     province_ids, provinces = get_province_data('http://www.nmc.cn/publish/forecast/ASH/xujiahui.html')
     city_urls, cities = get_city_data('http://www.nmc.cn/publish/forecast/ASH/xujiahui.html')
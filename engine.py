@@ -0,0 +1,250 @@
+#!usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+engine.py
+Define Some Crawl Engine Classes.
+1. CrawlEngine
+"""
+
+from asyncio import run, gather, sleep, Lock, get_running_loop
+from concurrent.futures import BrokenExecutor
+from urllib.parse import urlsplit
+from os import cpu_count
+from time import monotonic
+
+from tools import print_log, print_traceback_error
+
+
+
+# Define Global Variables.
+CRAWL_CONCURRENCY = cpu_count()  # Max Concurrent Crawl Tasks
+HOST_INTERVAL = 1.0  # Min Interval Between Two Requests to the Same Host(Seconds)
+PROGRESS_STEP = 50  # Report Progress Every So Many Finished Tasks
+
+
+
+class CrawlEngine:
+    """
+    asyncio爬虫引擎类，限制并发数并按主机限速，阻塞的爬取与解析函数在执行器中运行
+    """
+    
+    
+    
+    def __init__(self, executor, concurrency=CRAWL_CONCURRENCY, host_interval=HOST_INTERVAL,
+                 progress_step=PROGRESS_STEP):
+        """
+        asyncio爬虫引擎类初始化
+        
+        :parameter executor: 运行爬取与解析函数的执行器
+        :type executor: <class 'concurrent.futures.Executor'>
+        
+        :parameter concurrency: 最大并发任务数，默认为CRAWL_CONCURRENCY
+        :type concurrency: <class 'int'>
+        
+        :parameter host_interval: 同一主机两次请求的最小间隔（秒），默认为HOST_INTERVAL
+        :type host_interval: <class 'float'>
+        
+        :parameter progress_step: 每完成多少个任务报告一次进度，默认为PROGRESS_STEP
+        :type progress_step: <class 'int'>
+        """
+        
+        self.__executor = executor
+        self.__concurrency = concurrency
+        self.__host_interval = host_interval
+        self.__progress_step = progress_step
+        self.__host_locks = {}  # 主机到asyncio锁的字典
+        self.__host_next_times = {}  # 主机到下一次允许请求时间的字典
+        self.__total = 0
+        self.__finished = 0
+        self.__failed = 0
+        self.__consume_failed = 0
+        self.__start_time = 0.0
+    
+    
+    
+    def estimate_time(self, urls):
+        """
+        估算爬取总时间：按主机限速时，每个主机的任务只能每host_interval秒开始一个
+        
+        :parameter urls: 爬虫目标地址列表
+        :type urls: <class 'list'>
+        
+        :return: seconds: 估算的爬取总时间（秒）
+        :rtype: <class 'float'>
+        """
+        
+        counts = {}
+        
+        for url in urls:
+            host = urlsplit(url).netloc
+            counts[host] = counts.get(host, 0) + 1
+        
+        return max(counts.values(), default=0) * self.__host_interval
+    
+    
+    
+    async def __pace(self, url):
+        """
+        按主机限速，等待直到允许向该主机发送下一次请求
+        
+        :parameter url: 爬虫目标地址
+        :type url: <class 'str'>
+        """
+        
+        host = urlsplit(url).netloc
+        lock = self.__host_locks.setdefault(host, Lock())
+        
+        async with lock:
+            now = monotonic()
+            next_time = self.__host_next_times.get(host, now)
+            
+            if next_time > now:
+                await sleep(next_time - now)
+            
+            self.__host_next_times[host] = max(now, next_time) + self.__host_interval
+    
+    
+    
+    def __report_progress(self):
+        """
+        报告爬取进度与预计剩余时间
+        """
+        
+        elapsed = monotonic() - self.__start_time
+        remaining = elapsed / self.__finished * (self.__total - self.__finished) if self.__finished else 0.0
+        print_log('Crawl Progress: %d/%d (%.1f%%), Failed: %d, Consume Failed: %d, Elapsed: %.0fs, Remaining: %.0fs' % (
+            self.__finished, self.__total, 100.0 * self.__finished / self.__total, self.__failed, self.__consume_failed,
+            elapsed, remaining))
+    
+    
+    
+    async def __run_task(self, function, url, arguments, consumer):
+        """
+        运行单个爬取任务
+        
+        :parameter function: 爬取与解析函数
+        :type function: <class 'function'>
+        
+        :parameter url: 爬虫目标地址
+        :type url: <class 'str'>
+        
+        :parameter arguments: 爬取与解析函数参数元组
+        :type arguments: <class 'tuple'>
+        
+        :parameter consumer: 结果消费函数，为None时不调用
+        :type consumer: <class 'function'>
+        
+        :return: result: 爬取与解析函数返回结果，出错时为None
+        :rtype: <class 'object'>
+        
+        :raise: exception: 执行器已损坏（如子进程被系统终止），其余任务不可能成功
+        :type: <class 'concurrent.futures.BrokenExecutor'>
+        
+        :exception: exception: 爬取任务或结果消费错误
+        :type: <class 'Exception'>
+        """
+        
+        await self.__pace(url)
+        loop = get_running_loop()
+        
+        try:
+            result = await loop.run_in_executor(self.__executor, function, *arguments)
+        except BrokenExecutor as exception:
+            print_traceback_error(exception, 'Crawl Task ' + url)
+            self.__report_progress()
+            
+            raise
+        except Exception as exception:
+            print_traceback_error(exception, 'Crawl Task ' + url)
+            result = None
+        
+        if result is None:
+            self.__failed += 1
+        elif consumer is not None:
+            try:
+                # 在默认线程池中调用，消费函数阻塞时本工作协程不再领取新任务，形成背压
+                await loop.run_in_executor(None, consumer, url, result)
+            except Exception as exception:
+                print_traceback_error(exception, 'Consume Task ' + url)
+                self.__consume_failed += 1
+        
+        self.__finished += 1
+        
+        if not self.__finished % self.__progress_step or self.__finished == self.__total:
+            self.__report_progress()
+        
+        return result
+    
+    
+    
+    async def __run(self, function, tasks, consumer):
+        """
+        由concurrency个工作协程依次领取并运行所有爬取任务
+        
+        :parameter function: 爬取与解析函数
+        :type function: <class 'function'>
+        
+        :parameter tasks: (爬虫目标地址, 参数元组)列表
+        :type tasks: <class 'list'>
+        
+        :parameter consumer: 结果消费函数，为None时保存结果
+        :type consumer: <class 'function'>
+        
+        :return: results: 按任务顺序排列的返回结果列表，consumer不为None时为(爬取出错的任务数, 结果消费出错的任务数)元组
+        :rtype: <class 'list'>
+        """
+        
+        results = [None] * len(tasks) if consumer is None else None
+        pending = iter(enumerate(tasks))  # 所有工作协程共享的任务迭代器
+        
+        async def work():
+            for index, (url, arguments) in pending:
+                result = await self.__run_task(function, url, arguments, consumer)
+                
+                if results is not None:
+                    results[index] = result
+        
+        await gather(*[work() for _ in range(min(self.__concurrency, len(tasks)))])
+        
+        return (self.__failed, self.__consume_failed) if results is None else results
+    
+    
+    
+    def run(self, function, tasks, consumer=None):
+        """
+        运行爬取任务，阻塞直到全部完成
+        
+        :parameter function: 爬取与解析函数，在执行器中以function(*arguments)调用
+        :type function: <class 'function'>
+        
+        :parameter tasks: (爬虫目标地址, 参数元组)列表
+        :type tasks: <class 'list'>
+        
+        :parameter consumer: 结果消费函数，每个任务完成后立即在线程中以consumer(url, result)调用，结果不再保存；
+                             出错的任务不调用，默认为None
+        :type consumer: <class 'function'>
+        
+        :return: results: 按任务顺序排列的返回结果列表，出错的任务为None；
+                          consumer不为None时为(爬取出错的任务数, consumer抛出异常的任务数)元组，这些任务的结果已丢失
+        :rtype: <class 'list'>
+        
+        :raise: exception: 执行器已损坏（如子进程被系统终止），未完成的任务全部取消
+        :type: <class 'concurrent.futures.BrokenExecutor'>
+        """
+        
+        self.__total = len(tasks)
+        self.__finished = 0
+        self.__failed = 0
+        self.__consume_failed = 0
+        self.__host_locks = {}
+        self.__host_next_times = {}
+        self.__start_time = monotonic()
+        
+        if not tasks:
+            return [] if consumer is None else (0, 0)
+        
+        print_log('Crawling %d Pages, Concurrency: %d, Estimated Time: %.0fs' % (
+            self.__total, self.__concurrency, self.estimate_time([url for url, _ in tasks])))
+        
+        return run(self.__run(function, tasks, consumer))
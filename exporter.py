@@ -0,0 +1,200 @@
+#!usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+exporter.py
+Define Some Static Export Functions.
+1. get_export_path()
+2. write_atomically()
+3. write_with_gzip()
+4. remove_stale_exports()
+5. export_all_weathers_data()
+"""
+
+from os import makedirs, replace, remove, rmdir, fsync, chmod, walk
+from os.path import join, dirname
+from tempfile import mkstemp
+from gzip import compress
+from urllib.parse import quote
+from time import monotonic
+
+from mysql import query_every_city_weathers_data
+from tools import print_log, print_traceback_error
+
+
+
+# Define Global Variables.
+EXPORT_DIRECTORY = './export/'  # Static Export Directory, nginx Serves Files From Here Before Falling Back to uWSGI
+GZIP_LEVEL = 9  # Precompressed .gz Level, Files Are Compressed Once Per Crawl
+
+
+
+def get_export_path(directory, prefix, province, city, extension):
+    """
+    获取城市静态文件路径，省份名与城市名按URL编码，与nginx中$arg_province、$arg_city的值一致
+    
+    :parameter directory: 导出目录
+    :type directory: <class 'str'>
+    
+    :parameter prefix: URL路径前缀，如'weather'、'api/weather'
+    :type prefix: <class 'str'>
+    
+    :parameter province: 省份名
+    :type province: <class 'str'>
+    
+    :parameter city: 城市名
+    :type city: <class 'str'>
+    
+    :parameter extension: 文件扩展名
+    :type extension: <class 'str'>
+    
+    :return: path: 静态文件路径
+    :rtype: <class 'str'>
+    """
+    
+    return join(directory, prefix, quote(province, safe=''), quote(city, safe='') + extension)
+
+
+
+def write_atomically(path, body):
+    """
+    原子地写入文件：先写入同目录下的临时文件，再用rename替换，nginx不会读到写了一半的文件
+    
+    :parameter path: 文件路径
+    :type path: <class 'str'>
+    
+    :parameter body: 文件内容
+    :type body: <class 'bytes'>
+    
+    :raise: exception: 文件写入错误
+    :type: <class 'OSError'>
+    """
+    
+    makedirs(dirname(path), exist_ok=True)
+    descriptor, temporary_path = mkstemp(dir=dirname(path), prefix='.export-')
+    
+    try:
+        with open(descriptor, 'wb') as file:
+            file.write(body)
+            file.flush()
+            fsync(file.fileno())
+        
+        chmod(temporary_path, 0o644)  # mkstemp创建的文件只有所有者可读
+        replace(temporary_path, path)
+    except BaseException:
+        remove(temporary_path)
+        
+        raise
+
+
+
+def write_with_gzip(path, body):
+    """
+    原子地写入文件及其预压缩的.gz文件，供nginx gzip_static直接发送
+    
+    :parameter path: 文件路径
+    :type path: <class 'str'>
+    
+    :parameter body: 文件内容
+    :type body: <class 'bytes'>
+    """
+    
+    write_atomically(path + '.gz', compress(body, GZIP_LEVEL, mtime=0))
+    write_atomically(path, body)
+
+
+
+def remove_stale_exports(directory, paths):
+    """
+    删除不再属于当前城市集合的静态文件（城市改名或被撤销后不再由nginx发送旧页面），以及删除后为空的省份目录
+    
+    :parameter directory: 导出目录
+    :type directory: <class 'str'>
+    
+    :parameter paths: 当前所有城市的静态文件路径集合
+    :type paths: <class 'set'>
+    
+    :return: count: 删除的文件数
+    :rtype: <class 'int'>
+    """
+    
+    count = 0
+    
+    for prefix in ('weather', 'api/weather'):
+        for root, _, file_names in walk(join(directory, prefix), topdown=False):
+            for file_name in file_names:
+                path = join(root, file_name)
+                
+                if file_name.startswith('.export-') or path in paths:  # 正在写入的临时文件
+                    continue
+                
+                try:
+                    remove(path)
+                    count += 1
+                except OSError as exception:
+                    print_traceback_error(exception, 'Remove Stale Export ' + path)
+            
+            if root != join(directory, prefix):
+                try:
+                    rmdir(root)  # 只删除空目录
+                except OSError:
+                    pass
+    
+    return count
+
+
+
+def export_all_weathers_data(directory=EXPORT_DIRECTORY, cities=None):
+    """
+    将城市的气象数据页面与JSON预渲染为静态文件，并删除不再存在的城市的静态文件，在每轮发布后由main.py调用
+    
+    :parameter directory: 导出目录，默认为EXPORT_DIRECTORY
+    :type directory: <class 'str'>
+    
+    :parameter cities: 需要重新导出的(省份名, 城市名)元组集合，默认为None（全部城市）
+    :type cities: <class 'set'>
+    
+    :return: count: 导出的城市数
+    :rtype: <class 'int'>
+    
+    :exception: exception: 静态导出错误
+    :type: <class 'Exception'>
+    """
+    
+    from app import app, render_weather, dump_weather_json  # 只在导出时加载Flask应用
+    
+    weathers = query_every_city_weathers_data()
+    
+    if not weathers:  # 查询失败或数据表为空时不删除已导出的文件
+        return 0
+    
+    paths = set()
+    
+    for province, city in weathers:
+        for prefix, extension in (('weather', '.html'), ('api/weather', '.json')):
+            path = get_export_path(directory, prefix, province, city, extension)
+            paths.update((path, path + '.gz'))
+    
+    print_log('Exporting Weather Data of %d Cities...... ' % (len(weathers) if cities is None else len(cities)))
+    start_time = monotonic()
+    count = 0
+    
+    with app.app_context():
+        for (province, city), (real_time_weather, date_weathers) in weathers.items():
+            if cities is not None and (province, city) not in cities:
+                continue
+            
+            try:
+                write_with_gzip(get_export_path(directory, 'weather', province, city, '.html'),
+                                render_weather(province, city, real_time_weather, date_weathers))
+                write_with_gzip(get_export_path(directory, 'api/weather', province, city, '.json'),
+                                dump_weather_json(province, city, real_time_weather, date_weathers))
+                count += 1
+            except Exception as exception:
+                print_traceback_error(exception, 'Export ' + province + city)
+    
+    removed = remove_stale_exports(directory, paths)
+    print_log('Export %d Cities and Remove %d Stale Files in %.2fs Successfully! ' % (
+        count, removed, monotonic() - start_time))
+    
+    return count
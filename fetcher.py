@@ -0,0 +1,279 @@
+#!usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+fetcher.py
+Define Some Fetcher Classes and Fetcher Functions.
+1. decode_body()
+2. HttpFetcher
+3. get_http_fetcher()
+"""
+
+from http.client import HTTPConnection, HTTPSConnection, HTTPException
+from urllib.parse import urlsplit, urljoin
+from threading import local
+from gzip import decompress as gzip_decompress
+from zlib import decompress as zlib_decompress, MAX_WBITS
+from os import getpid
+
+from metrics import increase, measure
+from tools import print_log
+
+
+
+# Define Global Variables.
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:88.0) Gecko/20100101 Firefox/88.0'  # HTTP User Agent
+HTTP_TIMEOUT = 10  # HTTP Timeout(Seconds)
+MAX_REDIRECTS = 5  # HTTP Max Redirects
+
+
+
+def decode_body(headers, body):
+    """
+    按Content-Type中的字符集解码HTTP响应体
+    
+    :parameter headers: HTTP响应头（键为小写）
+    :type headers: <class 'dict'>
+    
+    :parameter body: HTTP响应体
+    :type body: <class 'bytes'>
+    
+    :return: html: HTML源代码
+    :rtype: <class 'str'>
+    """
+    
+    charset = 'utf-8'
+    
+    for item in headers.get('content-type', '').split(';'):
+        item = item.strip()
+        
+        if item.lower().startswith('charset='):
+            charset = item[8:].strip('"\'')
+    
+    return body.decode(charset, errors='replace')
+
+
+
+class HttpFetcher:
+    """
+    HTTP抓取类，使用长连接（keep-alive）与gzip压缩直接获取HTML源代码，不启动浏览器
+    """
+    
+    
+    
+    def __init__(self, timeout=HTTP_TIMEOUT, user_agent=USER_AGENT):
+        """
+        HTTP抓取类初始化
+        
+        :parameter timeout: HTTP超时时间（秒），默认为HTTP_TIMEOUT
+        :type timeout: <class 'int'>
+        
+        :parameter user_agent: HTTP User Agent，默认为USER_AGENT
+        :type user_agent: <class 'str'>
+        """
+        
+        self.__timeout = timeout
+        self.__user_agent = user_agent
+        self.__local = local()  # 每个线程持有各自的长连接
+    
+    
+    
+    def __get_connections(self):
+        """
+        获取当前线程的长连接字典
+        
+        :return: connections: (scheme, netloc)到HTTP连接对象的字典
+        :rtype: <class 'dict'>
+        """
+        
+        if not hasattr(self.__local, 'connections'):
+            self.__local.connections = {}
+        
+        return self.__local.connections
+    
+    
+    
+    def __get_connection(self, scheme, netloc):
+        """
+        获取（或创建）目标主机的长连接
+        
+        :parameter scheme: URL协议
+        :type scheme: <class 'str'>
+        
+        :parameter netloc: URL主机
+        :type netloc: <class 'str'>
+        
+        :return: connection: HTTP连接对象
+        :rtype: <class 'http.client.HTTPConnection'>
+        """
+        
+        connections = self.__get_connections()
+        key = (scheme, netloc)
+        
+        if key not in connections:
+            if scheme == 'https':
+                connections[key] = HTTPSConnection(netloc, timeout=self.__timeout)
+            else:
+                connections[key] = HTTPConnection(netloc, timeout=self.__timeout)
+        
+        return connections[key]
+    
+    
+    
+    def __drop_connection(self, scheme, netloc):
+        """
+        关闭并丢弃目标主机的长连接
+        
+        :parameter scheme: URL协议
+        :type scheme: <class 'str'>
+        
+        :parameter netloc: URL主机
+        :type netloc: <class 'str'>
+        """
+        
+        connection = self.__get_connections().pop((scheme, netloc), None)
+        
+        if connection:
+            connection.close()
+    
+    
+    
+    def request(self, url, headers=None):
+        """
+        发送GET请求
+        
+        :parameter url: 爬虫目标地址
+        :type url: <class 'str'>
+        
+        :parameter headers: 附加请求头，默认为None
+        :type headers: <class 'dict'>
+        
+        :returns
+        
+        :return: status: HTTP状态码
+        :rtype: <class 'int'>
+        
+        :return: response_headers: HTTP响应头（键为小写）
+        :rtype: <class 'dict'>
+        
+        :return: body: 解压后的HTTP响应体
+        :rtype: <class 'bytes'>
+        
+        :raise: exception: 重定向次数过多
+        :type: <class 'Exception'>
+        """
+        
+        request_headers = {
+            'User-Agent': self.__user_agent, 'Accept-Encoding': 'gzip, deflate', 'Connection': 'keep-alive',
+        }
+        
+        if headers:
+            request_headers.update(headers)
+        
+        for _ in range(MAX_REDIRECTS + 1):
+            split_url = urlsplit(url)
+            path = split_url.path or '/'
+            
+            if split_url.query:
+                path += '?' + split_url.query
+            
+            # 长连接可能已被服务器关闭，重试一次
+            for attempt in range(2):
+                connection = self.__get_connection(split_url.scheme, split_url.netloc)
+                
+                try:
+                    with measure('raingod_fetch_seconds', method='http'):
+                        connection.request('GET', path, headers=request_headers)
+                        response = connection.getresponse()
+                        body = response.read()
+                    
+                    break
+                except (HTTPException, ConnectionError, OSError):
+                    self.__drop_connection(split_url.scheme, split_url.netloc)
+                    
+                    if attempt:
+                        raise
+            
+            increase('raingod_fetch_responses_total', status=str(response.status))
+            response_headers = {key.lower(): value for key, value in response.getheaders()}
+            
+            if response_headers.get('connection', '').lower() == 'close':
+                self.__drop_connection(split_url.scheme, split_url.netloc)
+            
+            if response.status in (301, 302, 303, 307, 308) and 'location' in response_headers:
+                url = urljoin(url, response_headers['location'])
+                
+                continue
+            
+            encoding = response_headers.get('content-encoding', '').lower()
+            
+            if encoding == 'gzip':
+                body = gzip_decompress(body)
+            elif encoding == 'deflate':
+                body = zlib_decompress(body, -MAX_WBITS) if body[:1] != b'\x78' else zlib_decompress(body)
+            
+            return response.status, response_headers, body
+        
+        raise Exception('HTTP Redirect ERROR! ')
+    
+    
+    
+    def fetch(self, url):
+        """
+        获取爬虫目标地址HTML源代码
+        
+        :parameter url: 爬虫目标地址
+        :type url: <class 'str'>
+        
+        :return: html: 爬虫目标地址HTML源代码
+        :rtype: <class 'str'>
+        
+        :raise: exception: HTTP状态码错误
+        :type: <class 'Exception'>
+        """
+        
+        status, headers, body = self.request(url)
+        
+        if status != 200:
+            raise Exception('HTTP Status ERROR! ' + str(status))
+        
+        return decode_body(headers, body)
+    
+    
+    
+    def close(self):
+        """
+        关闭当前线程的所有长连接
+        """
+        
+        connections = self.__get_connections()
+        
+        for connection in connections.values():
+            connection.close()
+        
+        connections.clear()
+
+
+
+# 每个进程各自持有一个HttpFetcher，fork后的子进程不复用父进程的连接
+_http_fetcher = None
+_http_fetcher_pid = None
+
+
+
+def get_http_fetcher():
+    """
+    获取当前进程的HTTP抓取类对象
+    
+    :return: http_fetcher: HTTP抓取类对象
+    :rtype: <class 'fetcher.HttpFetcher'>
+    """
+    
+    global _http_fetcher, _http_fetcher_pid
+    
+    if _http_fetcher is None or _http_fetcher_pid != getpid():
+        _http_fetcher = HttpFetcher()
+        _http_fetcher_pid = getpid()
+        print_log('HTTP Fetcher Initialization Successfully! ')
+    
+    return _http_fetcher
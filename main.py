@@ -5,34 +5,49 @@
 main.py
 """
 
-from multiprocessing import Pool, Manager
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
 from os import cpu_count
-from time import sleep
-from random import uniform
 from datetime import datetime
+from time import sleep
 
-from crawler import get_province_data, get_city_data, get_weather_data
-from mysql import (
-    delete_all_provinces, update_province, delete_all_city, update_city, delete_all_weathers_data,
-    update_all_weathers_data,
-)
-from tools import print_log, print_traceback_error
+from crawler import web_driver_pool_initialization, get_province_data, get_city_data, get_weather_data_if_changed
+from engine import CrawlEngine
+from mysql import STAGING_SUFFIX, BulkWriter, publish_provinces, publish_cities, begin_snapshot, publish_snapshot, \
+    bump_generations, query_page_views, delete_expired_page_views, maintain_history_partitions
+from cache import FingerprintCache
+from checkpoint import CrawlCheckpoint
+from exporter import export_all_weathers_data
+from scheduler import RETRY_INTERVAL, Job, Scheduler
+from planner import CRAWL_BUDGET, plan_crawl
+from aggregator import aggregate_all_weathers_data
+from tools import logging_initialization, get_log_queue, print_log, print_traceback_error
 
 
 
 # Define Global Variables.
 DEFAULT_URL = 'http://www.nmc.cn/publish/forecast/ASH/xujiahui.html'  # Default URL
+FORECAST_URL = 'http://www.nmc.cn/publish/forecast/'  # Forecast URL Prefix
 FIRST_CITY_URLS = ['beijing', 'tianjin', 'shijiazhuang', 'taiyuan', 'huhehaote', 'shenyang', 'changchun', 'haerbin',
                    'xujiahui', 'nanjing', 'hangzhou', 'hefei', 'fuzhou', 'nanchang', 'jinan', 'zhengzhou', 'wuhan',
                    'changshashi', 'guangzhou', 'nanning', 'haikou', 'shapingba', 'chengdu', 'guiyang', 'kunming',
                    'lasa', 'xian', 'lanzhou', 'xining', 'yinchuan', 'wulumuqi', 'xianggang', 'aomen',
                    'taibei']  # First City URLs
+FORECAST_INTERVAL = 24 * 3600  # Forecast Job Runs Once a Day
+FORECAST_OFFSET = 0  # Forecast Job Runs at 00:00 Local Time
+FORECAST_JITTER = 300  # Forecast Job Max Random Delay(Seconds)
+REAL_TIME_INTERVAL = 3600  # Real Time Job Runs Once an Hour
+REAL_TIME_OFFSET = 300  # Real Time Job Runs at Minute 5, After nmc.cn Publishes the Hourly Observation
+REAL_TIME_JITTER = 120  # Real Time Job Max Random Delay(Seconds)
+REAL_TIME_KEY_PREFIX = 'realtime:'  # Fingerprint Cache Key Prefix of the Real Time Job
+MAX_CRAWL_FAILURE_RATIO = 0.05  # Max Ratio of Failed Cities for a Run to Still Publish and Finish
+INITIALIZATION_RETRY_DELAY = 30  # Seconds Before the First Initialization Retry, Doubled Up to RETRY_INTERVAL
 
 
 
-def get_all_cities_data(province_id, province, first_city_url, all_city_urls, all_cities, lock):
+def get_all_cities_data(province_id, province, first_city_url):
     """
-    获取所有城市数据
+    获取一个省份的所有城市数据，在爬虫引擎的执行器中运行，结果直接返回给主进程
 
     :parameter province_id: 省份代号
     :type province_id: <class 'str'>
@@ -43,30 +58,22 @@ def get_all_cities_data(province_id, province, first_city_url, all_city_urls, al
     :parameter first_city_url: 第一个城市的url
     :type first_city_url: <class 'str'>
 
-    :parameter all_city_urls: 所有城市url的字典列表
-    :type all_city_urls: <class 'multiprocessing.managers.ListProxy'>
+    :return: result: (省份代号, 省份名, 城市url列表, 城市名列表)元组，获取失败时为None
+    :rtype: <class 'tuple'>
+    """
 
-    :parameter all_cities: 所有城市的字典列表
-    :type all_cities: <class 'multiprocessing.managers.ListProxy'>
+    city_urls, cities = get_city_data(FORECAST_URL + province_id + '/' + first_city_url + '.html')
 
-    :parameter lock: 多进程管理锁
-    :type lock: <class 'multiprocessing.managers.AcquirerProxy'>
-    """
-    
-    city_urls, cities = get_city_data(
-        'http://www.nmc.cn/publish/forecast/' + province_id + '/' + first_city_url + '.html')
+    if not city_urls:
+        return None
     
-    # 操作共享变量的临界区代码
-    lock.acquire()  # 子进程获取多进程管理锁
-    all_city_urls.append({province_id: city_urls})
-    all_cities.append({province: cities})
-    lock.release()  # 子进程释放多进程管理锁
+    return province_id, province, city_urls, cities
 
 
 
-def get_all_weathers_data(province_id, province, city_url, city, all_real_time_weathers, all_date_weathers, lock):
+def get_all_weathers_data(province_id, province, city_url, city, fingerprint):
     """
-    获取所有气象数据
+    获取所有气象数据，在爬虫引擎的执行器中运行，页面或数据未变化时不返回气象数据
 
     :parameter province_id: 省份代号
     :type province_id: <class 'str'>
@@ -80,23 +87,187 @@ def get_all_weathers_data(province_id, province, city_url, city, all_real_time_w
     :parameter city: 城市名
     :type city: <class 'str'>
 
-    :parameter all_real_time_weathers: 所有实时天气元组列表
-    :type all_real_time_weathers: <class 'multiprocessing.managers.ListProxy'>
+    :parameter fingerprint: 上一次的(ETag, Last-Modified, 数据哈希值)元组，未缓存时为None
+    :type fingerprint: <class 'tuple'>
+    
+    :return: result: (省份名, 城市名, 新的内容指纹, 实时天气类对象, 日期天气类对象列表)元组，
+                     未变化时气象数据为None，获取失败时为None
+    :rtype: <class 'tuple'>
+    """
 
-    :parameter all_date_weathers: 所有日期天气元组列表
-    :type all_date_weathers: <class 'multiprocessing.managers.ListProxy'>
+    fingerprint, real_time_weather, date_weathers = get_weather_data_if_changed(
+        FORECAST_URL + province_id + '/' + city_url + '.html', fingerprint)
+
+    if fingerprint is None:
+        return None
+    
+    return province, city, fingerprint, real_time_weather, date_weathers
 
-    :parameter lock: 多进程管理锁
-    :type lock: <class 'multiprocessing.managers.AcquirerProxy'>
+
+
+def consume_weathers_data(fingerprint_cache, key_prefix, writer, written, checkpoint, url, result):
     """
+    消费一个城市的爬取结果：保存内容指纹，内容发生变化时交给流式写入者，再记入检查点，
+    在爬虫引擎的消费线程中调用
+    
+    :parameter fingerprint_cache: 城市url内容指纹缓存
+    :type fingerprint_cache: <class 'cache.FingerprintCache'>
+    
+    :parameter key_prefix: 内容指纹键前缀，实时天气任务为REAL_TIME_KEY_PREFIX，预报任务为''，
+                           两个任务的条件请求状态互不影响；实时天气任务不写入日期天气
+    :type key_prefix: <class 'str'>
     
-    real_time_weather, date_weathers = get_weather_data(
-        'http://www.nmc.cn/publish/forecast/' + province_id + '/' + city_url + '.html')
+    :parameter writer: 流式气象数据写入对象
+    :type writer: <class 'mysql.BulkWriter'>
     
-    lock.acquire()
-    all_real_time_weathers.append((province, city, real_time_weather))
-    all_date_weathers.append((province, city, date_weathers))
-    lock.release()
+    :parameter written: 本轮写入的(省份名, 城市名)元组集合，实时天气任务只重新导出这些城市
+    :type written: <class 'set'>
+    
+    :parameter checkpoint: 爬取检查点，重放检查点中的结果时为None；重放预报任务的结果时不写入实时天气
+    :type checkpoint: <class 'checkpoint.CrawlCheckpoint'>
+    
+    :parameter url: 爬虫目标地址
+    :type url: <class 'str'>
+    
+    :parameter result: get_all_weathers_data()返回的元组
+    :type result: <class 'tuple'>
+    """
+    
+    province, city, fingerprint, real_time_weather, date_weathers = result
+    fingerprint_cache.put(key_prefix + url, fingerprint, real_time_weather is not None)
+    
+    if key_prefix:
+        date_weathers = None
+    elif checkpoint is None:
+        # 预报任务中断期间实时天气任务可能已向在线数据表写入更新的实时天气，影子表从在线数据表复制，
+        # 重放时不用检查点中较旧的实时天气覆盖
+        real_time_weather = None
+    
+    if real_time_weather is not None or date_weathers is not None:
+        writer.put((province, city, real_time_weather, date_weathers))  # 队列满时阻塞，形成背压
+        written.add((province, city))
+    
+    if checkpoint is not None:
+        checkpoint.put(url, result)
+
+
+
+def crawl_weathers_data(all_cities, fingerprint_cache, checkpoint, job):
+    """
+    运行一轮气象数据爬取与写入，由调度器调用：
+    预报任务（'forecast'）复制当前数据到影子表，爬取结果经有界队列流式写入影子表，全部写入后一次性原子替换；
+    实时天气任务（'realtime'）只把实时天气直接写入在线数据表，不复制、不替换
+    
+    :parameter all_cities: (省份代号, 省份名, 城市url, 城市名)元组列表
+    :type all_cities: <class 'list'>
+    
+    :parameter fingerprint_cache: 城市url内容指纹缓存
+    :type fingerprint_cache: <class 'cache.FingerprintCache'>
+    
+    :parameter checkpoint: 爬取检查点
+    :type checkpoint: <class 'checkpoint.CrawlCheckpoint'>
+    
+    :parameter job: 任务名，'forecast'或'realtime'
+    :type job: <class 'str'>
+    
+    :return: success: 是否成功
+    :rtype: <class 'bool'>
+    """
+    
+    real_time_only = job == 'realtime'
+    key_prefix = REAL_TIME_KEY_PREFIX if real_time_only else ''
+    
+    try:
+        print_log('RainGod Running %s Job...... \n' % job)
+        print_log('Getting All Weather Data...... \n')
+        
+        completed = checkpoint.begin(job)  # 已完成的url到解析结果的字典
+        tasks = []  # (爬虫目标地址, 参数元组)列表
+        
+        for province_id, province, city_url, city in all_cities:
+            url = FORECAST_URL + province_id + '/' + city_url + '.html'
+            
+            if url not in completed:
+                tasks.append((url, (province_id, province, city_url, city, fingerprint_cache.get(key_prefix + url))))
+        
+        # 按页面浏览量与内容变化频率排序，热门且变化频繁的城市先爬取；实时天气任务每小时只爬取预算内的城市，
+        # 其余城市由每天的预报任务全部更新
+        budget = max(0, CRAWL_BUDGET - len(completed)) if real_time_only else None
+        tasks = plan_crawl(tasks, query_page_views() or {}, fingerprint_cache.get_visits(), key_prefix, budget)
+        delete_expired_page_views()
+        
+        # 预报任务复制当前数据到影子表（只写入内容发生变化的城市），网站在整个写入过程中始终读取完整的旧数据；
+        # 实时天气任务每行独立，直接按主键原地更新在线数据表；
+        # 两者都把变化的数据以本轮开始时间追加到按天分区的历史表，从断点继续时开始时间不变，不会重复追加
+        weather_tables = ['RealTimeWeather', 'DateWeather']
+        crawled_at = datetime.fromtimestamp(int(checkpoint.get_started_at()))
+        maintain_history_partitions()  # 失败时新数据写入pmax分区，下一轮维护时再拆分
+        
+        if real_time_only:
+            writer = BulkWriter(crawled_at=crawled_at)
+        else:
+            if not begin_snapshot(weather_tables):
+                raise Exception('Begin Weather Snapshot ERROR! ')
+            
+            writer = BulkWriter(suffix=STAGING_SUFFIX, crawled_at=crawled_at)
+        
+        written = set()
+        consumer = partial(consume_weathers_data, fingerprint_cache, key_prefix, writer, written)
+        
+        try:
+            # 影子表已重新创建，先重放检查点中已完成的结果，再只爬取剩余的url
+            for url, result in completed.items():
+                consumer(None, url, result)
+            
+            # 使用asyncio爬虫引擎限制并发数并按主机限速，每个子进程持有各自的Web Driver池
+            with ProcessPoolExecutor(cpu_count(), initializer=web_driver_pool_initialization,
+                                     initargs=(get_log_queue(),)) as executor:
+                crawl_failed, consume_failed = CrawlEngine(executor).run(get_all_weathers_data, tasks,
+                                                                         partial(consumer, checkpoint))
+        finally:
+            rows, failed = writer.close()
+            checkpoint.commit()
+        
+        fingerprint_cache.report()
+        
+        print_log('Get All Weather Data Successfully! ')
+        
+        if consume_failed:  # 出错的城市未记入检查点，下次从断点继续时重新爬取
+            raise Exception('Consume Weather Data ERROR! %d Cities Failed. ' % consume_failed)
+        
+        if failed:
+            raise Exception('Stream Write ERROR! %d Cities Failed. ' % failed)
+        
+        # 少数城市爬取失败时仍然发布，这些城市保留旧数据；失败过多（如网络中断）时不发布，检查点保留，下次从断点继续
+        if crawl_failed > len(tasks) * MAX_CRAWL_FAILURE_RATIO:
+            raise Exception('Crawl Weather Data ERROR! %d of %d Cities Failed. ' % (crawl_failed, len(tasks)))
+        
+        if rows:
+            if real_time_only:
+                if not bump_generations(['RealTimeWeather']):  # 通知网站丢弃缓存
+                    raise Exception('Bump Real Time Weather Generation ERROR! ')
+            elif not publish_snapshot(weather_tables):
+                raise Exception('Publish Weather Snapshot ERROR! ')
+        
+        fingerprint_cache.commit()  # 发布完成后再提交内容指纹，发布前中断时下一轮重新获取
+        checkpoint.finish()  # 数据完整发布后才结束本轮爬取
+        
+        print_log('Update MySQL Database "raingod" Successfully! \n')
+        
+        if rows:  # 预渲染静态页面与JSON，由nginx直接发送；实时天气任务只重新导出本轮写入的城市
+            export_all_weathers_data(cities=written if real_time_only else None)
+        
+        if not real_time_only:
+            aggregate_all_weathers_data()  # 汇总只依赖预报，每天重新计算一次（日期滚动后即使数据未变化也需要更新）
+        
+        print_log('RainGod %s Job Finish! \n' % job)
+        
+        return True
+    except Exception as exception:
+        print_traceback_error(exception, 'RainGod Runtime')
+        fingerprint_cache.rollback()  # 本轮未发布，丢弃本轮的内容指纹，检查点保留，下次从断点继续
+        
+        return False
 
 
 
@@ -105,55 +276,50 @@ def main():
     Python气象数据爬取服务器端主函数
     """
     
+    logging_initialization()  # 主进程启动日志监听线程，进程池子进程经队列写日志
+    scheduler = Scheduler()
+    scheduler.lock()  # 在初始化之前获取调度锁，第二个进程不会重复爬取、发布省份与城市数据
     print_log('RainGod Initializing...... \n')
     
-    manager = Manager()  # 创建多进程管理对象
-    lock = manager.Lock()  # 创建多进程管理锁
-    # 初始化共享变量
-    all_city_urls = manager.list()  # 所有城市url的字典列表
-    all_cities = manager.list()  # 所有城市的字典列表
-    all_real_time_weathers = manager.list()  # 所有实时天气元组列表
-    all_date_weathers = manager.list()  # 所有日期天气元组列表
-    
-    print_log('Getting Province Data...... \n')
-    province_ids, provinces = get_province_data(DEFAULT_URL)
-    delete_all_provinces()
+    all_cities = []  # (省份代号, 省份名, 城市url, 城市名)元组列表
+    fingerprint_cache = FingerprintCache()  # 城市url内容指纹缓存
+    # 爬取检查点，进程中断后从断点继续；实时天气任务的未完成爬取最多继续一个周期，不用过时的实时天气覆盖新数据
+    checkpoint = CrawlCheckpoint(max_ages={'realtime': REAL_TIME_INTERVAL})
     
-    for i in range(len(province_ids)):
-        update_province(provinces[i])
-    
-    print_log('Get Province Data Successfully! \n')
+    # 省份或城市数据获取、发布失败时等待后重新开始，不以空的或过期的城市表继续运行；
+    # 等待时间每次加倍，最长与调度器重试失败任务的间隔相同，网站或MySQL不可用时不连续重试
+    retry_delay = INITIALIZATION_RETRY_DELAY
     
     while True:
         try:
-            print_log('Getting City Data...... \n')
+            print_log('Getting Province Data...... \n')
+            province_ids, provinces = get_province_data(DEFAULT_URL)
             
-            pool = Pool(cpu_count())  # 创建多进程池，最大进程容量为当前机器上的CPU处理器核心数
+            if province_ids is None:
+                raise Exception('Get Province Data ERROR! ')
             
-            for i in range(len(FIRST_CITY_URLS)):
-                pool.apply_async(func=get_all_cities_data, args=(
-                    province_ids[i], provinces[i], FIRST_CITY_URLS[i], all_city_urls, all_cities,
-                    lock,))  # 循环创建获取所有城市数据异步子进程
-                sleep(uniform(0, 5))
+            if not publish_provinces(provinces):  # 写入影子表后原子替换，读者不会看到空的省份表
+                raise Exception('Publish Province Data ERROR! ')
             
-            pool.close()  # 关闭多进程池
-            pool.join()  # 主进程阻塞，等待子进程退出
+            print_log('Get Province Data Successfully! \n')
+            print_log('Getting City Data...... \n')
+            
+            tasks = [(FORECAST_URL + province_ids[i] + '/' + FIRST_CITY_URLS[i] + '.html',
+                      (province_ids[i], provinces[i], FIRST_CITY_URLS[i])) for i in range(len(FIRST_CITY_URLS))]
             
-            delete_all_city()
+            # 子进程直接返回结果元组，不经过Manager进程；爬虫引擎按主机限速，每个子进程持有各自的Web Driver池
+            with ProcessPoolExecutor(cpu_count(), initializer=web_driver_pool_initialization,
+                                     initargs=(get_log_queue(),)) as executor:
+                results = CrawlEngine(executor).run(get_all_cities_data, tasks)
             
-            pool = Pool(cpu_count())
+            if None in results:
+                raise Exception('Get City Data ERROR! %d Provinces Failed. ' % results.count(None))
             
-            for i in range(len(all_city_urls)):
-                province_id = list(all_city_urls[i].keys())[0]
-                province = list(all_cities[i].keys())[0]
-                city_urls = list(all_city_urls[i].values())[0]
-                cities = list(all_cities[i].values())[0]
-                
-                for j in range(len(city_urls)):
-                    pool.apply_async(func=update_city, args=(province, cities[j],))  # 循环创建更新城市数据异步子进程
+            all_cities = [(province_id, province, city_urls[j], cities[j])
+                          for province_id, province, city_urls, cities in results for j in range(len(city_urls))]
             
-            pool.close()
-            pool.join()
+            if not publish_cities([(province, city) for _, province, _, city in all_cities]):  # 写入影子表后原子替换
+                raise Exception('Publish City Data ERROR! ')
             
             print_log('Get City Data Successfully! \n')
             print_log('RainGod Initialization Successfully! \n')
@@ -161,63 +327,19 @@ def main():
             break
         except Exception as exception:
             print_traceback_error(exception, 'RainGod Initialization')
-            all_city_urls[:] = []
-            all_cities[:] = []
+            print_log('Retrying RainGod Initialization in %ds...... \n' % retry_delay)
+            sleep(retry_delay)
+            retry_delay = min(2 * retry_delay, RETRY_INTERVAL)
     
-    # 主循环
-    while True:
-        hour = datetime.now().hour  # 获取当前日期时间的小时数
-        minute = datetime.now().minute  # 获取当前日期时间的分钟数
-        
-        if (not minute) and (not hour % 24):  # 每天0点0分、24点0分进行一次气象数据爬取与写入MySQL数据库表操作
-            try:
-                print_log('RainGod Running...... \n')
-                print_log('Getting All Weather Data...... \n')
-                
-                all_real_time_weathers[:] = []
-                all_date_weathers[:] = []
-                
-                pool = Pool(cpu_count())
-                
-                for i in range(len(all_city_urls)):
-                    province_id = list(all_city_urls[i].keys())[0]
-                    province = list(all_cities[i].keys())[0]
-                    city_urls = list(all_city_urls[i].values())[0]
-                    cities = list(all_cities[i].values())[0]
-                    
-                    for j in range(len(city_urls)):
-                        pool.apply_async(func=get_all_weathers_data, args=(
-                            province_id, province, city_urls[j], cities[j], all_real_time_weathers, all_date_weathers,
-                            lock,))  # 循环创建获取所有气象数据异步子进程
-                        sleep(uniform(5 * cpu_count(), 15 * cpu_count()))
-                
-                pool.close()
-                pool.join()
-                
-                print_log('Get All Weather Data Successfully! ')
-                print_log('Updating MySQL Database "raingod"...... ')
-                
-                delete_all_weathers_data()
-                
-                pool = Pool(cpu_count())
-                
-                for i in range(len(all_real_time_weathers)):
-                    pool.apply_async(func=update_all_weathers_data, args=(
-                        all_real_time_weathers[i][0], all_real_time_weathers[i][1], all_real_time_weathers[i][2],
-                        all_date_weathers[i][2],))  # 循环创建更新所有气象数据异步子进程
-                
-                pool.close()
-                pool.join()
-                
-                print_log('Update MySQL Database "raingod" Successfully! \n')
-                print_log('RainGod Finish! \n')
-                sleep(55)
-                print_log('RainGod New Round. \n')
-            except Exception as exception:
-                print_traceback_error(exception, 'RainGod Runtime')
-                sleep(5)
-        else:
-            sleep(55)
+    # 预报任务每天0点运行，替换全部数据；实时天气任务每小时运行，只更新实时天气，预报任务成功时视为同时完成；
+    # 上一次成功运行早于当前周期（如进程停止期间错过）时启动后立即补运行，未完成的爬取从断点继续
+    scheduler.add(Job('forecast', partial(crawl_weathers_data, all_cities, fingerprint_cache, checkpoint, 'forecast'),
+                      FORECAST_INTERVAL, FORECAST_OFFSET, FORECAST_JITTER, covers=['realtime']),
+                  checkpoint.get_last_run('forecast'))
+    scheduler.add(Job('realtime', partial(crawl_weathers_data, all_cities, fingerprint_cache, checkpoint, 'realtime'),
+                      REAL_TIME_INTERVAL, REAL_TIME_OFFSET, REAL_TIME_JITTER),
+                  max(checkpoint.get_last_run('realtime'), checkpoint.get_last_run('forecast')))
+    scheduler.run_forever()
 
 
 
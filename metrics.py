@@ -0,0 +1,462 @@
+#!usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+metrics.py
+Define Some Metrics Functions.
+1. get_metrics_path()
+2. metrics_initialization()
+3. flush_metrics()
+4. write_metrics_file()
+5. merge_metrics_file()
+6. is_alive()
+7. fold_metrics()
+8. increase()
+9. observe()
+10. measure()
+11. collect_metrics()
+12. format_labels()
+13. render_metrics()
+"""
+
+from threading import Lock
+from contextlib import contextmanager
+from bisect import bisect_left
+from json import dumps, loads
+from os import getpid, kill, link, listdir, makedirs, remove, rename, replace
+from os.path import getmtime
+from time import time, monotonic
+from sys import platform
+from multiprocessing.util import Finalize
+
+from tools import print_log, print_traceback_error
+
+if platform != 'win32':
+    from fcntl import flock, LOCK_EX, LOCK_NB
+
+
+
+# Define Global Variables.
+METRICS_DIRECTORY = './metrics'  # Per Process Metrics Files Directory, Shared by Crawler and uWSGI Processes
+METRICS_FLUSH_INTERVAL = 5  # Write the Metrics File of a Process at Most Once per So Many Seconds
+METRICS_RETIRED_FILE = 'retired.json'  # Metrics File Holding the Summed Values of Exited Processes
+METRICS_MTIME_PRECISION = 2  # Coarsest File Modification Time Precision of Supported File Systems(Seconds)
+METRICS_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)  # Histogram Upper Bounds(Seconds)
+METRICS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'  # Prometheus Text Exposition Format
+# 指标名到(类型, 说明)元组的字典；measure()记录的直方图xxx_seconds在出错时递增计数器xxx_failures_total
+METRICS = {
+    'raingod_fetch_seconds': ('histogram', 'Page fetch latency in seconds by method (http, selenium).'),
+    'raingod_fetch_failures_total': ('counter', 'Failed page fetches by method.'),
+    'raingod_fetch_responses_total': ('counter', 'HTTP fetch responses by status code.'),
+    'raingod_selenium_initialization_seconds': ('histogram', 'Selenium web driver start latency in seconds.'),
+    'raingod_selenium_initialization_failures_total': ('counter', 'Failed Selenium web driver starts.'),
+    'raingod_parse_seconds': ('histogram', 'HTML extraction latency in seconds by extractor.'),
+    'raingod_parse_failures_total': ('counter', 'Failed HTML extractions by extractor.'),
+    'raingod_db_acquire_seconds': ('histogram', 'Wait in seconds for a pooled MySQL connection.'),
+    'raingod_db_acquire_failures_total': ('counter', 'Failed pooled MySQL connection acquisitions.'),
+    'raingod_db_seconds': ('histogram', 'MySQL statement round trip latency in seconds by statement.'),
+    'raingod_db_failures_total': ('counter', 'Failed MySQL statements by statement.'),
+    'raingod_db_write_seconds': ('histogram', 'Weather data write transaction latency in seconds.'),
+    'raingod_db_write_failures_total': ('counter', 'Rolled back weather data write transactions.'),
+    'raingod_db_written_rows_total': ('counter', 'Weather data rows written.'),
+    'raingod_http_request_seconds': ('histogram', 'Flask request latency in seconds by route.'),
+    'raingod_http_requests_total': ('counter', 'Flask responses by route and status code.'),
+}
+
+# 每个进程的指标先累加在内存中，定期写到各自的<进程号>.json文件，/metrics读取所有文件汇总；
+# 已退出进程的文件在汇总时累加到retired.json后删除，计数器不回退，文件数不随进程重启增长
+_metrics_lock = Lock()
+_metrics_values = {}  # (指标名, 标签元组)到计数器值或直方图列表（各桶计数、+Inf桶计数、总和）的字典
+_metrics_pid = None
+_metrics_dirty = False
+_metrics_flushed_at = 0.0
+
+
+
+def get_metrics_path(pid):
+    """
+    获取进程的指标文件路径
+    
+    :parameter pid: 进程号
+    :type pid: <class 'int'>
+    
+    :return: path: 指标文件路径
+    :rtype: <class 'str'>
+    """
+    
+    return METRICS_DIRECTORY + '/' + str(pid) + '.json'
+
+
+
+def metrics_initialization():
+    """
+    初始化当前进程的指标：载入同一进程号的旧指标文件，并在进程退出时写出指标，
+    fork后的子进程（进程池、uWSGI worker）在第一次记录时自动重新初始化
+    """
+    
+    global _metrics_lock, _metrics_values, _metrics_pid, _metrics_dirty, _metrics_flushed_at
+    
+    pid = getpid()
+    values = {}
+    
+    try:
+        makedirs(METRICS_DIRECTORY, exist_ok=True)
+        
+        with open(get_metrics_path(pid)) as file:
+            for name, labels, value in loads(file.read()):
+                values[(name, tuple(tuple(i) for i in labels))] = value
+    except (OSError, ValueError):
+        pass
+    
+    _metrics_lock = Lock()  # fork时锁可能正被父进程的其他线程持有
+    _metrics_values = values
+    _metrics_pid = pid
+    _metrics_dirty = False
+    _metrics_flushed_at = monotonic()
+    Finalize(None, flush_metrics, args=(True,), exitpriority=5)
+
+
+
+def flush_metrics(force=False):
+    """
+    把当前进程的指标写到指标文件（先写临时文件再原子替换），距上次写出不足METRICS_FLUSH_INTERVAL秒时跳过
+    
+    :parameter force: 是否立即写出，默认为False
+    :type force: <class 'bool'>
+    """
+    
+    global _metrics_dirty, _metrics_flushed_at
+    
+    if _metrics_pid != getpid() or not _metrics_dirty:
+        return
+    
+    now = monotonic()
+    
+    if not force and now - _metrics_flushed_at < METRICS_FLUSH_INTERVAL:
+        return
+    
+    with _metrics_lock:
+        _metrics_dirty = False
+        _metrics_flushed_at = now
+        path = get_metrics_path(_metrics_pid)
+        
+        try:
+            write_metrics_file(path, _metrics_values)
+        except OSError as exception:
+            print_traceback_error(exception, 'Metrics Flush')
+
+
+
+def write_metrics_file(path, values):
+    """
+    把指标写到指标文件：先写临时文件再原子替换，读取者不会读到写了一半的文件
+    
+    :parameter path: 指标文件路径
+    :type path: <class 'str'>
+    
+    :parameter values: (指标名, 标签元组)到计数器值或直方图列表的字典
+    :type values: <class 'dict'>
+    """
+    
+    with open(path + '.tmp', 'w') as file:
+        file.write(dumps([[name, labels, value] for (name, labels), value in values.items()]))
+    
+    replace(path + '.tmp', path)
+
+
+
+def merge_metrics_file(values, path):
+    """
+    读取指标文件并累加到values中
+    
+    :parameter values: (指标名, 标签元组)到汇总后计数器值或直方图列表的字典
+    :type values: <class 'dict'>
+    
+    :parameter path: 指标文件路径
+    :type path: <class 'str'>
+    
+    :return: success: 是否成功读取
+    :rtype: <class 'bool'>
+    """
+    
+    try:
+        with open(path) as file:
+            metrics = loads(file.read())
+    except (OSError, ValueError):  # 进程正在替换文件、文件已被合并删除或已损坏
+        return False
+    
+    for name, labels, value in metrics:
+        key = (name, tuple(tuple(i) for i in labels))
+        total = values.get(key)
+        
+        if total is None:
+            values[key] = value[:] if isinstance(value, list) else value
+        elif isinstance(value, list):
+            values[key] = [i + j for i, j in zip(total, value)]
+        else:
+            values[key] = total + value
+    
+    return True
+
+
+
+def is_alive(pid):
+    """
+    判断进程是否存活
+    
+    :parameter pid: 进程号
+    :type pid: <class 'int'>
+    
+    :return: alive: 是否存活
+    :rtype: <class 'bool'>
+    """
+    
+    try:
+        kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except OSError:  # 进程存在但属于其他用户
+        return True
+    
+    return True
+
+
+
+def fold_metrics():
+    """
+    把已退出进程的指标文件累加到METRICS_RETIRED_FILE后删除，汇总值不变；
+    进程号可能在判断存活后被新进程重用，指标文件先原子地改名再读取，之后新进程写入的是新的文件，
+    改名后的文件修改时间不早于判断存活的时间时属于新进程，改回原名不合并；
+    多个进程同时汇总时只有获得锁的进程合并，其他进程跳过；
+    Windows上kill(pid, 0)会结束进程，无法用来判断进程是否存活，不合并
+    """
+    
+    if platform == 'win32':
+        return
+    
+    try:
+        names = listdir(METRICS_DIRECTORY)
+    except OSError:
+        return
+    
+    checked_at = time() - METRICS_MTIME_PRECISION
+    dead = [i for i in names if i.endswith('.json') and i[:-5].isdigit() and not is_alive(int(i[:-5]))]
+    
+    if not dead:
+        return
+    
+    retired_path = METRICS_DIRECTORY + '/' + METRICS_RETIRED_FILE
+    
+    try:
+        with open(retired_path + '.lock', 'w') as lock_file:
+            try:
+                flock(lock_file, LOCK_EX | LOCK_NB)
+            except OSError:  # 其他进程正在合并
+                return
+            
+            values = {}
+            merge_metrics_file(values, retired_path)
+            folded = []
+            
+            for file_name in dead:
+                path = METRICS_DIRECTORY + '/' + file_name
+                
+                try:
+                    rename(path, path + '.fold')
+                    folding = getmtime(path + '.fold') < checked_at and merge_metrics_file(values, path + '.fold')
+                except OSError:  # 文件已被合并删除
+                    continue
+                
+                if folding:
+                    folded.append(file_name + '.fold')
+                    continue
+                
+                try:
+                    link(path + '.fold', path)  # 新进程已写入新文件时不覆盖，新文件包含全部累计值
+                except OSError:
+                    pass
+                
+                remove(path + '.fold')
+            
+            if not folded:
+                return
+            
+            write_metrics_file(retired_path, values)  # 先写入合并结果再删除，中断时不会丢失已退出进程的指标
+            
+            for file_name in folded:
+                remove(METRICS_DIRECTORY + '/' + file_name)
+            
+            print_log('Fold Metrics Files of %d Exited Processes. ' % len(folded))
+    except OSError as exception:
+        print_traceback_error(exception, 'Metrics Fold')
+
+
+
+def increase(name, value=1, **labels):
+    """
+    递增计数器
+    
+    :parameter name: 指标名
+    :type name: <class 'str'>
+    
+    :parameter value: 增量，默认为1
+    :type value: <class 'float'>
+    
+    :parameter labels: 标签名到标签值的字典
+    :type labels: <class 'dict'>
+    """
+    
+    global _metrics_dirty
+    
+    if _metrics_pid != getpid():
+        metrics_initialization()
+    
+    key = (name, tuple(sorted(labels.items())))
+    
+    with _metrics_lock:
+        _metrics_values[key] = _metrics_values.get(key, 0) + value
+        _metrics_dirty = True
+    
+    flush_metrics()
+
+
+
+def observe(name, value, **labels):
+    """
+    记录一次直方图观测值
+    
+    :parameter name: 指标名
+    :type name: <class 'str'>
+    
+    :parameter value: 观测值（秒）
+    :type value: <class 'float'>
+    
+    :parameter labels: 标签名到标签值的字典
+    :type labels: <class 'dict'>
+    """
+    
+    global _metrics_dirty
+    
+    if _metrics_pid != getpid():
+        metrics_initialization()
+    
+    key = (name, tuple(sorted(labels.items())))
+    
+    with _metrics_lock:
+        histogram = _metrics_values.get(key)
+        
+        if histogram is None:
+            histogram = _metrics_values[key] = [0] * (len(METRICS_BUCKETS) + 2)
+        
+        histogram[bisect_left(METRICS_BUCKETS, value)] += 1
+        histogram[-1] += value
+        _metrics_dirty = True
+    
+    flush_metrics()
+
+
+
+@contextmanager
+def measure(name, **labels):
+    """
+    记录with语句块的耗时到直方图name，语句块抛出异常时同时递增计数器xxx_failures_total（name为xxx_seconds）
+    
+    :parameter name: 直方图指标名
+    :type name: <class 'str'>
+    
+    :parameter labels: 标签名到标签值的字典
+    :type labels: <class 'dict'>
+    """
+    
+    start_time = monotonic()
+    
+    try:
+        yield
+    except Exception:
+        increase(name[:-len('_seconds')] + '_failures_total', **labels)
+        
+        raise
+    finally:
+        observe(name, monotonic() - start_time, **labels)
+
+
+
+def collect_metrics():
+    """
+    先写出当前进程的指标并合并已退出进程的指标文件，再读取所有指标文件并汇总
+    
+    :return: values: (指标名, 标签元组)到汇总后计数器值或直方图列表的字典
+    :rtype: <class 'dict'>
+    """
+    
+    flush_metrics(True)
+    fold_metrics()
+    values = {}
+    
+    try:
+        names = listdir(METRICS_DIRECTORY)
+    except OSError:
+        return values
+    
+    for file_name in names:
+        if file_name.endswith('.json'):
+            merge_metrics_file(values, METRICS_DIRECTORY + '/' + file_name)
+    
+    return values
+
+
+
+def format_labels(labels):
+    """
+    按Prometheus文本格式格式化标签
+    
+    :parameter labels: (标签名, 标签值)元组组成的元组
+    :type labels: <class 'tuple'>
+    
+    :return: text: {name="value",...}格式的标签字符串，没有标签时为''
+    :rtype: <class 'str'>
+    """
+    
+    if not labels:
+        return ''
+    
+    return '{' + ','.join('%s="%s"' % (name, str(value).replace('\\', '\\\\').replace('"', '\\"').replace(
+        '\n', '\\n')) for name, value in labels) + '}'
+
+
+
+def render_metrics():
+    """
+    汇总所有进程的指标并生成Prometheus文本格式
+    
+    :return: text: Prometheus文本格式的指标
+    :rtype: <class 'str'>
+    """
+    
+    values = collect_metrics()
+    samples = {}
+    lines = []
+    
+    for (name, labels), value in values.items():
+        samples.setdefault(name, []).append((labels, value))
+    
+    for name, (metric_type, description) in METRICS.items():
+        lines.append('# HELP %s %s' % (name, description))
+        lines.append('# TYPE %s %s' % (name, metric_type))
+        
+        for labels, value in sorted(samples.get(name, [])):
+            if metric_type == 'counter':
+                lines.append('%s%s %s' % (name, format_labels(labels), value))
+                
+                continue
+            
+            count = 0
+            
+            for bound, bucket in zip(METRICS_BUCKETS + ('+Inf',), value):
+                count += bucket
+                lines.append('%s_bucket%s %d' % (name, format_labels(labels + (('le', str(bound)),)), count))
+            
+            lines.append('%s_sum%s %s' % (name, format_labels(labels), value[-1]))
+            lines.append('%s_count%s %d' % (name, format_labels(labels), count))
+    
+    return '\n'.join(lines) + '\n'
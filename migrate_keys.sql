@@ -0,0 +1,29 @@
+-- 为已有的raingod数据库添加主键：重复数据只保留一行，新表建好后一次性原子替换旧表
+-- Usage: mysql -u root -p < migrate_keys.sql
+
+USE raingod;
+
+DROP TABLE IF EXISTS Province_new, City_new, RealTimeWeather_new, DateWeather_new;
+
+CREATE TABLE Province_new LIKE Province;
+ALTER TABLE Province_new ADD PRIMARY KEY (province);
+INSERT IGNORE INTO Province_new SELECT * FROM Province;
+
+CREATE TABLE City_new LIKE City;
+ALTER TABLE City_new ADD PRIMARY KEY (province, city);
+INSERT IGNORE INTO City_new SELECT * FROM City;
+
+CREATE TABLE RealTimeWeather_new LIKE RealTimeWeather;
+ALTER TABLE RealTimeWeather_new ADD PRIMARY KEY (province, city);
+INSERT IGNORE INTO RealTimeWeather_new SELECT * FROM RealTimeWeather;
+
+CREATE TABLE DateWeather_new LIKE DateWeather;
+ALTER TABLE DateWeather_new ADD PRIMARY KEY (province, city, date_time);
+INSERT IGNORE INTO DateWeather_new SELECT * FROM DateWeather;
+
+RENAME TABLE Province TO Province_old, Province_new TO Province,
+             City TO City_old, City_new TO City,
+             RealTimeWeather TO RealTimeWeather_old, RealTimeWeather_new TO RealTimeWeather,
+             DateWeather TO DateWeather_old, DateWeather_new TO DateWeather;
+
+DROP TABLE Province_old, City_old, RealTimeWeather_old, DateWeather_old;
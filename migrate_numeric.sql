@@ -0,0 +1,22 @@
+-- 为已有的raingod数据库添加数值列：从显示字符串中解析第一个数值回填（需要MySQL 8.0的REGEXP_SUBSTR），
+-- 之后由爬虫写入路径同时写入显示字符串与数值
+-- Usage: mysql -u root -p < migrate_numeric.sql
+
+USE raingod;
+
+ALTER TABLE RealTimeWeather ADD COLUMN temperature_value DOUBLE, ADD COLUMN precipitation_value DOUBLE,
+                            ADD COLUMN relative_humidity_value DOUBLE, ADD COLUMN sensible_temperature_value DOUBLE,
+                            ADD COLUMN aqi_value DOUBLE, ADD INDEX temperature_value (temperature_value);
+
+UPDATE RealTimeWeather SET temperature_value = REGEXP_SUBSTR(temperature, '-?[0-9]+(\\.[0-9]+)?'),
+                           precipitation_value = REGEXP_SUBSTR(precipitation, '-?[0-9]+(\\.[0-9]+)?'),
+                           relative_humidity_value = REGEXP_SUBSTR(relative_humidity, '-?[0-9]+(\\.[0-9]+)?'),
+                           sensible_temperature_value = REGEXP_SUBSTR(sensible_temperature, '-?[0-9]+(\\.[0-9]+)?'),
+                           aqi_value = REGEXP_SUBSTR(aqi, '-?[0-9]+(\\.[0-9]+)?');
+
+ALTER TABLE DateWeather ADD COLUMN highest_temperature_value DOUBLE, ADD COLUMN lowest_temperature_value DOUBLE,
+                        ADD INDEX date_highest_temperature (date_time, highest_temperature_value),
+                        ADD INDEX date_lowest_temperature (date_time, lowest_temperature_value);
+
+UPDATE DateWeather SET highest_temperature_value = REGEXP_SUBSTR(highest_temperature, '-?[0-9]+(\\.[0-9]+)?'),
+                       lowest_temperature_value = REGEXP_SUBSTR(lowest_temperature, '-?[0-9]+(\\.[0-9]+)?');
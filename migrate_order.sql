@@ -0,0 +1,17 @@
+-- 为已有的raingod数据库添加自增id列记录省份与城市的写入顺序（即爬取时页面上的顺序），网站下拉列表按id排序；
+-- 并创建网站判断缓存是否过期所用的发布代数表，之后爬虫不再在运行时建表
+-- Usage: mysql -u root -p < migrate_order.sql
+
+USE raingod;
+
+ALTER TABLE Province ADD COLUMN id INT NOT NULL AUTO_INCREMENT FIRST, ADD UNIQUE KEY id (id);
+ALTER TABLE City ADD COLUMN id INT NOT NULL AUTO_INCREMENT FIRST, ADD UNIQUE KEY id (id);
+
+CREATE TABLE IF NOT EXISTS Generation
+(
+    name VARCHAR(50) NOT NULL,
+    generation BIGINT NOT NULL,
+    published_at DATETIME,
+    PRIMARY KEY (name)
+)
+DEFAULT CHARSET = utf8mb4;
@@ -0,0 +1,23 @@
+-- 把已有raingod数据库的PageView表改为按天记录浏览量，爬取计划按最近几天指数衰减加权后的浏览量排序；
+-- 原有的累计浏览量记为当天的浏览量，之后随时间衰减并过期删除
+-- Usage: mysql -u root -p < migrate_page_views.sql
+
+USE raingod;
+
+DROP TABLE IF EXISTS PageView_new;
+
+CREATE TABLE PageView_new
+(
+    date_time DATE NOT NULL,
+    province VARCHAR(50) NOT NULL,
+    city VARCHAR(100) NOT NULL,
+    views BIGINT NOT NULL,
+    PRIMARY KEY (date_time, province, city)
+)
+DEFAULT CHARSET = utf8mb4;
+
+CREATE TABLE IF NOT EXISTS PageView LIKE PageView_new;
+INSERT INTO PageView_new SELECT CURDATE(), province, city, views FROM PageView;
+
+RENAME TABLE PageView TO PageView_old, PageView_new TO PageView;
+DROP TABLE PageView_old;
@@ -0,0 +1,22 @@
+-- 为已有的raingod数据库创建每日汇总表，之后爬虫发布汇总时不再在运行时建表
+-- Usage: mysql -u root -p < migrate_summary.sql
+
+USE raingod;
+
+CREATE TABLE IF NOT EXISTS WeatherSummary
+(
+    scope VARCHAR(50) NOT NULL,
+    date_time DATE NOT NULL,
+    cities INT NOT NULL,
+    max_highest_temperature DOUBLE,
+    min_lowest_temperature DOUBLE,
+    mean_highest_temperature DOUBLE,
+    mean_lowest_temperature DOUBLE,
+    hottest_province VARCHAR(50),
+    hottest_city VARCHAR(100),
+    coldest_province VARCHAR(50),
+    coldest_city VARCHAR(100),
+    rain_cities INT NOT NULL,
+    PRIMARY KEY (scope, date_time)
+)
+DEFAULT CHARSET = utf8mb4;
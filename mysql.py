@@ -10,27 +10,48 @@ Define Some MySQL Functions.
 4. retrieve()
 5. delete()
 6. mysql_close()
-7. delete_all_provinces()
-8. update_province()
-9. query_all_provinces()
-10. delete_all_city()
-11. update_city()
-12. query_city()
-13. delete_all_real_time_weathers()
-14. update_real_time_weather()
+7. get_statement()
+8. MeasuredCursor
+9. ConnectionPool
+10. mysql_acquire()
+11. mysql_release()
+12. mysql_connection()
+13. get_real_time_weather_row()
+14. get_date_weather_rows()
 15. query_real_time_weather()
-16. delete_all_date_weathers()
-17. update_date_weather()
-18. query_date_weather()
-19. delete_all_weathers_data()
-20. update_all_weathers_data()
-21. query_all_weathers_data()
+16. query_date_weather()
+17. query_all_weathers_data()
+18. query_every_city_weathers_data()
+19. write_weathers_chunk()
+20. BulkWriter
+21. begin_snapshot()
+22. publish_snapshot()
+23. bump_generations()
+24. query_generations()
+25. query_province_city_tree()
+26. publish_provinces()
+27. publish_cities()
+28. add_page_views()
+29. query_page_views()
+30. delete_expired_page_views()
+31. maintain_history_partitions()
+32. query_weather_history()
+33. query_summary_source()
+34. publish_summaries()
+35. query_summaries()
 """
 
 from pymysql import connect
 from pymysql.cursors import DictCursor
+from threading import Lock, BoundedSemaphore, Thread
+from contextlib import contextmanager
+from queue import Queue, Empty, Full
+from os import getpid
+from time import monotonic
+from datetime import date, timedelta
 
-from tools import print_log, print_traceback_error
+from metrics import increase, observe, measure
+from tools import DEBUG, print_log, print_traceback_error
 
 
 
@@ -38,6 +59,79 @@ from tools import print_log, print_traceback_error
 HOST = 'localhost'  # MySQL Host
 PORT = 3306  # MySQL Port
 USERNAME = 'root'  # MySQL Username
+PASSWORD = 'qwaszx123'  # MySQL Password
+DATABASE = 'raingod'  # MySQL Database
+POOL_MAX_SIZE = 10  # MySQL Connection Pool Max Size Per Process
+POOL_IDLE_TIMEOUT = 300  # Close Pooled Connections Idle Longer Than So Many Seconds
+POOL_PING_INTERVAL = 5  # Ping Pooled Connections Idle Longer Than So Many Seconds Before Reuse
+POOL_WAIT_TIMEOUT = 30  # Max Seconds to Wait for a Free Pooled Connection
+BULK_CHUNK_SIZE = 200  # Cities Per Transaction in Bulk Writes
+WRITER_QUEUE_SIZE = 400  # Max Cities Waiting in the Stream Writer Queue
+WRITER_FLUSH_INTERVAL = 2.0  # Max Seconds a Partial Micro Batch Waits Before Commit
+STAGING_SUFFIX = '_staging'  # Staging Table Name Suffix
+DB_STATEMENTS = frozenset(('SELECT', 'INSERT', 'REPLACE', 'UPDATE', 'DELETE', 'CREATE', 'DROP', 'ALTER', 'RENAME',
+                           'TRUNCATE'))  # Statement Labels of MySQL Latency Metrics, Others Are Labeled OTHER
+OLD_SUFFIX = '_old'  # Replaced Table Name Suffix
+PAGE_VIEW_WINDOW_DAYS = 14  # Days of Daily Page View Rows Kept and Counted by the Crawl Planner
+PAGE_VIEW_HALF_LIFE_DAYS = 3  # Page Views Count Half as Much Every So Many Days
+REAL_TIME_WEATHER_INSERT = 'INSERT INTO RealTimeWeather{}(province,city,publish_time,temperature,precipitation,' \
+                           'wind_direction,wind_power,relative_humidity,sensible_temperature,aqi,comfort,' \
+                           'temperature_value,precipitation_value,relative_humidity_value,' \
+                           'sensible_temperature_value,aqi_value) VALUES ' \
+                           '(%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s) ON DUPLICATE KEY UPDATE ' \
+                           'publish_time=VALUES(publish_time),temperature=VALUES(temperature),' \
+                           'precipitation=VALUES(precipitation),wind_direction=VALUES(wind_direction),' \
+                           'wind_power=VALUES(wind_power),relative_humidity=VALUES(relative_humidity),' \
+                           'sensible_temperature=VALUES(sensible_temperature),aqi=VALUES(aqi),' \
+                           'comfort=VALUES(comfort),temperature_value=VALUES(temperature_value),' \
+                           'precipitation_value=VALUES(precipitation_value),' \
+                           'relative_humidity_value=VALUES(relative_humidity_value),' \
+                           'sensible_temperature_value=VALUES(sensible_temperature_value),' \
+                           'aqi_value=VALUES(aqi_value);'  # Real Time Weather UPSERT SQL
+DATE_WEATHER_INSERT = 'INSERT INTO DateWeather{}(province,city,date_time,highest_temperature,lowest_temperature,' \
+                      'weather_description1,weather_description2,wind_direction1,wind_direction2,wind_level1,' \
+                      'wind_level2,highest_temperature_value,lowest_temperature_value) VALUES ' \
+                      '(%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s) ON DUPLICATE KEY UPDATE ' \
+                      'highest_temperature=VALUES(highest_temperature),lowest_temperature=VALUES(lowest_temperature),' \
+                      'weather_description1=VALUES(weather_description1),' \
+                      'weather_description2=VALUES(weather_description2),wind_direction1=VALUES(wind_direction1),' \
+                      'wind_direction2=VALUES(wind_direction2),wind_level1=VALUES(wind_level1),' \
+                      'wind_level2=VALUES(wind_level2),highest_temperature_value=VALUES(highest_temperature_value),' \
+                      'lowest_temperature_value=VALUES(lowest_temperature_value);'  # Date Weather UPSERT SQL
+NATIONAL_SCOPE = '全国'  # Weather Summary Scope Name of National Summaries
+HISTORY_RETENTION_DAYS = 90  # Days of History Kept, Older Daily Partitions Are Dropped
+HISTORY_PRECREATE_DAYS = 7  # Daily History Partitions Created Ahead of Time
+REAL_TIME_WEATHER_HISTORY_TABLE = 'CREATE TABLE IF NOT EXISTS RealTimeWeatherHistory (crawled_at DATETIME NOT NULL, ' \
+                                  'province VARCHAR(50) NOT NULL, city VARCHAR(100) NOT NULL, ' \
+                                  'publish_time VARCHAR(20), temperature VARCHAR(20), precipitation VARCHAR(20), ' \
+                                  'wind_direction VARCHAR(50), wind_power VARCHAR(50), ' \
+                                  'relative_humidity VARCHAR(20), ' \
+                                  'sensible_temperature VARCHAR(20), aqi VARCHAR(20), comfort VARCHAR(50), ' \
+                                  'temperature_value DOUBLE, precipitation_value DOUBLE, ' \
+                                  'relative_humidity_value DOUBLE, sensible_temperature_value DOUBLE, ' \
+                                  'aqi_value DOUBLE, PRIMARY KEY (province, city, crawled_at)) ' \
+                                  'DEFAULT CHARSET = utf8mb4 PARTITION BY RANGE (TO_DAYS(crawled_at)) ' \
+                                  '(PARTITION pmax VALUES LESS THAN MAXVALUE);'  # Real Time Weather History DDL
+DATE_WEATHER_HISTORY_TABLE = 'CREATE TABLE IF NOT EXISTS DateWeatherHistory (crawled_at DATETIME NOT NULL, ' \
+                             'province VARCHAR(50) NOT NULL, city VARCHAR(100) NOT NULL, date_time DATE NOT NULL, ' \
+                             'highest_temperature VARCHAR(20), lowest_temperature VARCHAR(20), ' \
+                             'weather_description1 VARCHAR(20), weather_description2 VARCHAR(20), ' \
+                             'wind_direction1 VARCHAR(50), wind_direction2 VARCHAR(50), wind_level1 VARCHAR(50), ' \
+                             'wind_level2 VARCHAR(50), highest_temperature_value DOUBLE, ' \
+                             'lowest_temperature_value DOUBLE, PRIMARY KEY (province, city, crawled_at, date_time), ' \
+                             'INDEX city_date (province, city, date_time)) ' \
+                             'DEFAULT CHARSET = utf8mb4 PARTITION BY RANGE (TO_DAYS(crawled_at)) ' \
+                             '(PARTITION pmax VALUES LESS THAN MAXVALUE);'  # Date Weather History DDL
+REAL_TIME_WEATHER_HISTORY_INSERT = 'INSERT IGNORE INTO RealTimeWeatherHistory(crawled_at,province,city,publish_time,' \
+                                   'temperature,precipitation,wind_direction,wind_power,relative_humidity,' \
+                                   'sensible_temperature,aqi,comfort,temperature_value,precipitation_value,' \
+                                   'relative_humidity_value,sensible_temperature_value,aqi_value) VALUES ' \
+                                   '(%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s);'  # Append, Resumed Runs Skip
+DATE_WEATHER_HISTORY_INSERT = 'INSERT IGNORE INTO DateWeatherHistory(crawled_at,province,city,date_time,' \
+                              'highest_temperature,lowest_temperature,weather_description1,weather_description2,' \
+                              'wind_direction1,wind_direction2,wind_level1,wind_level2,highest_temperature_value,' \
+                              'lowest_temperature_value) VALUES ' \
+                              '(%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s);'  # Append, Resumed Runs Skip
 
 
 
@@ -110,7 +204,7 @@ def create(connection, cursor, sql):
     
     try:
         cursor.execute(sql)  # 执行SQL语句进行创建操作
-        print_log('Create Successfully! ')
+        print_log('Create Successfully! ', DEBUG)
     except Exception as exception:
         print_traceback_error(exception, 'Create')
 
@@ -147,11 +241,11 @@ def update(connection, cursor, operation, sql, value=None):
         if operation == 'update' or operation == 'Update' or operation == 'UPDATE':
             cursor.execute(sql, value)  # 执行SQL语句进行更新操作
             connection.commit()  # 提交操作更改
-            print_log('Update Data Successfully! ')
+            print_log('Update Data Successfully! ', DEBUG)
         elif operation == 'insert' or operation == 'Insert' or operation == 'INSERT':
             cursor.executemany(sql, value)  # 执行SQL语句进行插入多条数据操作
             connection.commit()
-            print_log('Update Data Successfully! ')
+            print_log('Update Data Successfully! ', DEBUG)
         else:
             raise Exception('Update Operation ERROR! ')
     except Exception as exception:
@@ -160,7 +254,7 @@ def update(connection, cursor, operation, sql, value=None):
 
 
 
-def retrieve(connection, cursor, query):
+def retrieve(connection, cursor, query, value=None):
     """
     MySQL查询
     
@@ -170,9 +264,12 @@ def retrieve(connection, cursor, query):
     :parameter cursor: MySQL游标对象
     :type cursor: <class 'pymysql.cursors.DictCursor'>
     
-    :parameter query: SQL查询语句
+    :parameter query: SQL查询语句，参数使用%s占位符
     :type query: <class 'str'>
     
+    :parameter value: 查询参数，由驱动转义，默认为None
+    :type value: <class 'tuple'>
+    
     :return: results: MySQL查询结果字典列表
     :rtype: <class 'list'>
     
@@ -181,9 +278,9 @@ def retrieve(connection, cursor, query):
     """
     
     try:
-        cursor.execute(query)  # 执行SQL语句进行查询操作
+        cursor.execute(query, value)  # 执行SQL语句进行查询操作
         results = cursor.fetchall()  # 获取游标所有结果
-        print_log('Retrieve Data Successfully! ')
+        print_log('Retrieve Data Successfully! ', DEBUG)
         
         return results
     except Exception as exception:
@@ -224,11 +321,11 @@ def delete(connection, cursor, operation, sql, value=None):
         if operation == 'drop' or operation == 'Drop' or operation == 'DROP':
             cursor.execute(sql)  # 执行SQL语句进行（结构性）删除操作
             connection.commit()
-            print_log('Delete Successfully! ')
+            print_log('Delete Successfully! ', DEBUG)
         elif operation == 'delete' or operation == 'Delete' or operation == 'DELETE':
             cursor.execute(sql, value)  # 执行SQL语句进行（内容性）删除操作
             connection.commit()
-            print_log('Delete Data Successfully! ')
+            print_log('Delete Data Successfully! ', DEBUG)
         else:
             raise Exception('Delete Operation ERROR! ')
     except Exception as exception:
@@ -256,147 +353,399 @@ def mysql_close(connection, cursor):
             if cursor:
                 cursor.close()  # 关闭MySQL游标
                 connection.close()  # 关闭MySQL连接
-                print_log('MySQL Connection Close Successfully! ')
+                print_log('MySQL Connection Close Successfully! ', DEBUG)
             else:
                 connection.close()
-                print_log('MySQL Connection Close Successfully! ')
+                print_log('MySQL Connection Close Successfully! ', DEBUG)
     except Exception as exception:
         print_traceback_error(exception, 'MySQL Connection Close')
 
 
 
-def delete_all_provinces():
+def get_statement(query):
     """
-    删除所有省份数据
+    获取SQL语句的类型，作为MySQL耗时指标的标签
+    
+    :parameter query: SQL语句（executemany()拼接的多行INSERT为bytes）
+    :type query: <class 'str'>
+    
+    :return: statement: 语句类型，如SELECT、INSERT，不在DB_STATEMENTS中时为OTHER
+    :rtype: <class 'str'>
     """
     
-    connection, cursor = mysql_initialization(host=HOST, port=PORT, username=USERNAME, password='qwaszx123',
-                                              database='raingod')
-    print_log('Deleting All Provinces...... ')
-    sql = 'DELETE FROM Province;'
-    delete(connection, cursor, 'delete', sql)
-    print_log('Delete All Provinces Successfully! ')
-    mysql_close(connection, cursor)
+    words = query[:16].split(None, 1)
+    statement = words[0].upper() if words else ''
+    
+    if not isinstance(statement, str):
+        statement = statement.decode('ascii', 'replace')
+    
+    return statement if statement in DB_STATEMENTS else 'OTHER'
 
 
 
-def update_province(province):
+class MeasuredCursor(DictCursor):
+    """
+    记录每条SQL语句往返耗时的MySQL游标类，executemany()拼接的每条多行INSERT也各记录一次
     """
-    更新省份数据
     
-    :parameter province: 省份名
-    :type province: <class 'str'>
+    
+    
+    def execute(self, query, args=None):
+        """
+        执行SQL语句并记录耗时
+        
+        :parameter query: SQL语句
+        :type query: <class 'str'>
+        
+        :parameter args: SQL语句参数，默认为None
+        :type args: <class 'tuple'>
+        
+        :return: rows: 受影响的行数
+        :rtype: <class 'int'>
+        """
+        
+        with measure('raingod_db_seconds', statement=get_statement(query)):
+            return super().execute(query, args)
+
+
+
+class ConnectionPool:
+    """
+    MySQL连接池类，线程安全，每个进程各自持有连接（fork后的子进程不复用父进程的连接）
     """
     
-    connection, cursor = mysql_initialization(host=HOST, port=PORT, username=USERNAME, password='qwaszx123',
-                                              database='raingod')
-    print_log('Updating Province Data...... ')
-    sql = 'INSERT INTO Province(province) VALUES (%s);'
-    insert_data = [(province)]
-    update(connection, cursor, 'insert', sql, insert_data)
-    print_log('Update Province Data Successfully! ')
-    mysql_close(connection, cursor)
+    
+    
+    def __init__(self, database, host='localhost', port=3306, username='root', password=None, charset='utf8mb4',
+                 max_size=POOL_MAX_SIZE, idle_timeout=POOL_IDLE_TIMEOUT, ping_interval=POOL_PING_INTERVAL):
+        """
+        MySQL连接池类初始化
+        
+        :parameter database: MySQL数据库名称
+        :type database: <class 'str'>
+        
+        :parameter host: MySQL Host，默认为localhost
+        :type host: <class 'str'>
+        
+        :parameter port: MySQL端口号，默认为3306
+        :type port: <class 'int'>
+        
+        :parameter username: MySQL用户名，默认为root
+        :type username: <class 'str'>
+        
+        :parameter password: MySQL密码，默认为None
+        :type password: <class 'str'>
+        
+        :parameter charset: MySQL字符集，默认为utf8mb4
+        :type charset: <class 'str'>
+        
+        :parameter max_size: 连接池最大连接数，默认为POOL_MAX_SIZE
+        :type max_size: <class 'int'>
+        
+        :parameter idle_timeout: 空闲连接超时时间（秒），默认为POOL_IDLE_TIMEOUT
+        :type idle_timeout: <class 'int'>
+        
+        :parameter ping_interval: 空闲超过该时间（秒）的连接复用前先ping，默认为POOL_PING_INTERVAL
+        :type ping_interval: <class 'int'>
+        """
+        
+        self.__connect_arguments = {
+            'host': host, 'port': port, 'user': username, 'password': password, 'database': database,
+            'charset': charset,
+        }
+        self.__max_size = max_size
+        self.__idle_timeout = idle_timeout
+        self.__ping_interval = ping_interval
+        self.__reset()
+    
+    
+    
+    def __reset(self):
+        """
+        重置连接池状态，fork后的子进程丢弃从父进程继承的连接（不关闭，避免影响父进程）
+        """
+        
+        self.__pid = getpid()
+        self.__lock = Lock()
+        self.__semaphore = BoundedSemaphore(self.__max_size)
+        self.__idle_connections = []  # (连接对象, 归还时间)列表
+    
+    
+    
+    def __close_connection(self, connection):
+        """
+        关闭连接
+        
+        :parameter connection: MySQL连接对象
+        :type connection: <class 'pymysql.connections.Connection'>
+        """
+        
+        try:
+            connection.close()
+        except Exception:
+            pass
+    
+    
+    
+    def acquire(self):
+        """
+        从连接池获取连接，没有可用的空闲连接时创建
+        
+        :returns
+        
+        :return: connection: MySQL连接对象
+        :rtype: <class 'pymysql.connections.Connection'>
+        
+        :return: cursor: MySQL游标对象
+        :rtype: <class 'pymysql.cursors.DictCursor'>
+        
+        :raise: exception: 等待空闲连接超时
+        :type: <class 'Exception'>
+        """
+        
+        if self.__pid != getpid():
+            with _pool_reset_lock:  # fork后的子进程中多个线程可能同时发现进程号变化，只重置一次
+                if self.__pid != getpid():
+                    self.__reset()
+        
+        if not self.__semaphore.acquire(timeout=POOL_WAIT_TIMEOUT):
+            raise Exception('MySQL Connection Pool Exhausted! ')
+        
+        try:
+            while True:
+                with self.__lock:
+                    connection, released_time = self.__idle_connections.pop() if self.__idle_connections else (
+                        None, None)
+                
+                if connection is None:
+                    break
+                
+                idle_time = monotonic() - released_time
+                
+                if idle_time > self.__idle_timeout:
+                    self.__close_connection(connection)
+                    
+                    continue
+                
+                if idle_time > self.__ping_interval:
+                    try:
+                        connection.ping(reconnect=False)  # 预先ping，丢弃已被服务器断开的连接
+                    except Exception:
+                        self.__close_connection(connection)
+                        
+                        continue
+                
+                return connection, connection.cursor(cursor=MeasuredCursor)
+            
+            connection = connect(**self.__connect_arguments)  # 创建MySQL连接
+            print_log('Connect MySQL Database "' + self.__connect_arguments['database'] + '" Successfully! ', DEBUG)
+            
+            return connection, connection.cursor(cursor=MeasuredCursor)
+        except BaseException:
+            self.__semaphore.release()
+            
+            raise
+    
+    
+    
+    def release(self, connection, cursor):
+        """
+        归还连接到连接池，回滚未提交的事务以结束读快照
+        
+        :parameter connection: MySQL连接对象
+        :type connection: <class 'pymysql.connections.Connection'>
+        
+        :parameter cursor: MySQL游标对象
+        :type cursor: <class 'pymysql.cursors.DictCursor'>
+        """
+        
+        if self.__pid != getpid():
+            return
+        
+        try:
+            if cursor:
+                cursor.close()
+            
+            connection.rollback()
+            
+            with self.__lock:
+                self.__idle_connections.append((connection, monotonic()))
+        except Exception:
+            self.__close_connection(connection)
+        finally:
+            self.__semaphore.release()
+    
+    
+    
+    def close(self):
+        """
+        关闭连接池中所有空闲连接
+        """
+        
+        with self.__lock:
+            connections = self.__idle_connections[:]
+            self.__idle_connections.clear()
+        
+        for connection, _ in connections:
+            self.__close_connection(connection)
+
+
 
+# 每个进程共用一个连接池，由爬虫与Flask app中的所有查询/更新函数使用
+_pool_reset_lock = Lock()
+_connection_pool = ConnectionPool(host=HOST, port=PORT, username=USERNAME, password=PASSWORD, database=DATABASE)
 
 
-def query_all_provinces():
+
+def mysql_acquire():
     """
-    查询所有省份数据
+    从连接池获取MySQL连接
     
-    :return: results: MySQL查询结果字典列表
-    :rtype: <class 'list'>
+    :returns
+    
+    :return: connection: MySQL连接对象
+    :rtype: <class 'pymysql.connections.Connection'>
+    
+    :return: cursor: MySQL游标对象
+    :rtype: <class 'pymysql.cursors.DictCursor'>
+    
+    :exception: exception: MySQL连接获取错误
+    :type: <class 'Exception'>
     """
     
-    connection, cursor = mysql_initialization(host=HOST, port=PORT, username=USERNAME, password='qwaszx123',
-                                              database='raingod')
-    print_log('Retrieving All Provinces...... ')
-    query = 'SELECT * FROM Province;'
-    results = retrieve(connection, cursor, query)
-    print_log('Retrieve ALl Provinces Successfully! ')
-    mysql_close(connection, cursor)
+    try:
+        with measure('raingod_db_acquire_seconds'):
+            return _connection_pool.acquire()
+    except Exception as exception:
+        print_log('Fail to Connect MySQL Database "' + DATABASE + '"! ')
+        print_traceback_error(exception, 'MySQL Connection Pool Acquire')
+        
+        return None, None
+
+
+
+def mysql_release(connection, cursor):
+    """
+    归还MySQL连接到连接池
     
-    return results
+    :parameter connection: MySQL连接对象
+    :type connection: <class 'pymysql.connections.Connection'>
+    
+    :parameter cursor: MySQL游标对象
+    :type cursor: <class 'pymysql.cursors.DictCursor'>
+    """
+    
+    if connection:
+        _connection_pool.release(connection, cursor)
 
 
 
-def delete_all_city():
+@contextmanager
+def mysql_connection():
     """
-    删除所有城市数据
+    从连接池获取MySQL连接，with语句块结束或抛出异常时都归还连接，获取失败时得到(None, None)
+    
+    :returns
+    
+    :return: connection: MySQL连接对象
+    :rtype: <class 'pymysql.connections.Connection'>
+    
+    :return: cursor: MySQL游标对象
+    :rtype: <class 'pymysql.cursors.DictCursor'>
     """
     
-    connection, cursor = mysql_initialization(host=HOST, port=PORT, username=USERNAME, password='qwaszx123',
-                                              database='raingod')
-    print_log('Deleting All Cities...... ')
-    sql = 'DELETE FROM City;'
-    delete(connection, cursor, 'delete', sql)
-    print_log('Delete All Cities Successfully! ')
-    mysql_close(connection, cursor)
+    connection, cursor = mysql_acquire()
+    
+    try:
+        yield connection, cursor
+    finally:
+        mysql_release(connection, cursor)
 
 
 
-def update_city(province, city):
+def get_real_time_weather_row(province, city, real_time_weather):
     """
-    更新城市数据
+    获取实时天气数据行
     
     :parameter province: 省份名
     :type province: <class 'str'>
     
     :parameter city: 城市名
     :type city: <class 'str'>
+    
+    :parameter real_time_weather: 实时天气类对象
+    :type real_time_weather: <class 'weather.RealTimeWeather'>
+    
+    :return: row: 与REAL_TIME_WEATHER_INSERT对应的数据元组
+    :rtype: <class 'tuple'>
     """
     
-    connection, cursor = mysql_initialization(host=HOST, port=PORT, username=USERNAME, password='qwaszx123',
-                                              database='raingod')
-    print_log('Updating City Data...... ')
-    sql = 'INSERT INTO City(province,city) VALUES (%s,%s);'
-    insert_data = [(province, city)]
-    update(connection, cursor, 'insert', sql, insert_data)
-    print_log('Update City Data Successfully! ')
-    mysql_close(connection, cursor)
+    return (province, city, real_time_weather.get_publish_time(), real_time_weather.get_temperature(),
+            real_time_weather.get_precipitation(), real_time_weather.get_wind_direction(),
+            real_time_weather.get_wind_power(), real_time_weather.get_relative_humidity(),
+            real_time_weather.get_sensible_temperature(), real_time_weather.get_aqi(), real_time_weather.get_comfort(),
+            real_time_weather.get_temperature_value(), real_time_weather.get_precipitation_value(),
+            real_time_weather.get_relative_humidity_value(), real_time_weather.get_sensible_temperature_value(),
+            real_time_weather.get_aqi_value())
 
 
 
-def query_city(province):
+def get_date_weather_rows(province, city, date_weathers):
     """
-    查询城市数据
+    获取日期天气数据行列表
     
     :parameter province: 省份名
     :type province: <class 'str'>
     
-    :return: results: MySQL查询结果字典列表
+    :parameter city: 城市名
+    :type city: <class 'str'>
+    
+    :parameter date_weathers: 日期天气类对象列表
+    :type date_weathers: <class 'list'>
+    
+    :return: rows: 与DATE_WEATHER_INSERT对应的数据元组列表
     :rtype: <class 'list'>
     """
     
-    connection, cursor = mysql_initialization(host=HOST, port=PORT, username=USERNAME, password='qwaszx123',
-                                              database='raingod')
-    print_log('Retrieving City Data......')
-    query = 'SELECT * FROM City WHERE province="%s";' % province
-    results = retrieve(connection, cursor, query)
-    print_log('Retrieve City Data Successfully! ')
-    mysql_close(connection, cursor)
+    rows = []
     
-    return results
+    for i in date_weathers:
+        rows.append((province, city, i.get_date(), i.get_highest_temperature(), i.get_lowest_temperature(),
+                     i.get_weather_description1(), i.get_weather_description2(), i.get_wind_direction1(),
+                     i.get_wind_direction2(), i.get_wind_level1(), i.get_wind_level2(),
+                     i.get_highest_temperature_value(), i.get_lowest_temperature_value()))
+    
+    return rows
 
 
 
-def delete_all_real_time_weathers():
+def query_real_time_weather(province, city):
     """
-    删除所有实时天气数据
+    查询实时天气数据
+    
+    :parameter province: 省份名
+    :type province: <class 'str'>
+    
+    :parameter city: 城市名
+    :type city: <class 'str'>
+    
+    :return: results: MySQL查询结果字典列表
+    :rtype: <class 'list'>
     """
     
-    connection, cursor = mysql_initialization(host=HOST, port=PORT, username=USERNAME, password='qwaszx123',
-                                              database='raingod')
-    print_log('Deleting All Real Time Weathers...... ')
-    sql = 'DELETE FROM RealTimeWeather;'
-    delete(connection, cursor, 'delete', sql)
-    print_log('Delete All Real Time Weathers Successfully! ')
-    mysql_close(connection, cursor)
+    with mysql_connection() as (connection, cursor):
+        print_log('Retrieving Real Time Weather Data...... ', DEBUG)
+        query = 'SELECT * FROM RealTimeWeather WHERE province=%s AND city=%s;'
+        results = retrieve(connection, cursor, query, (province, city))
+        print_log('Retrieve Real Time Weather Data Successfully! ', DEBUG)
+    
+    return results
 
 
 
-def update_real_time_weather(province, city, real_time_weather):
+def query_date_weather(province, city):
     """
-    更新实时天气数据
+    查询日期天气数据
     
     :parameter province: 省份名
     :type province: <class 'str'>
@@ -404,29 +753,23 @@ def update_real_time_weather(province, city, real_time_weather):
     :parameter city: 城市名
     :type city: <class 'str'>
     
-    :parameter real_time_weather: 实时天气类对象
-    :type real_time_weather: <class 'weather.RealTimeWeather'>
+    :return: results: MySQL查询结果字典列表
+    :rtype: <class 'list'>
     """
     
-    connection, cursor = mysql_initialization(host=HOST, port=PORT, username=USERNAME, password='qwaszx123',
-                                              database='raingod')
-    print_log('Updating Real Time Weather Data...... ')
-    sql = 'INSERT INTO RealTimeWeather(province,city,publish_time,temperature,precipitation,wind_direction,' \
-          'wind_power,relative_humidity,sensible_temperature,aqi,comfort) VALUES (%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s);'
-    insert_data = [(province, city, real_time_weather.get_publish_time(), real_time_weather.get_temperature(),
-                    real_time_weather.get_precipitation(), real_time_weather.get_wind_direction(),
-                    real_time_weather.get_wind_power(), real_time_weather.get_relative_humidity(),
-                    real_time_weather.get_sensible_temperature(), real_time_weather.get_aqi(),
-                    real_time_weather.get_comfort())]
-    update(connection, cursor, 'insert', sql, insert_data)
-    print_log('Update Real Time Weather Data Successfully! ')
-    mysql_close(connection, cursor)
+    with mysql_connection() as (connection, cursor):
+        print_log('Retrieving Date Weather Data...... ', DEBUG)
+        query = 'SELECT * FROM DateWeather WHERE province=%s AND city=%s ORDER BY date_time;'
+        results = retrieve(connection, cursor, query, (province, city))
+        print_log('Retrieve Date Weather Data Successfully! ', DEBUG)
+    
+    return results
 
 
 
-def query_real_time_weather(province, city):
+def query_all_weathers_data(province, city):
     """
-    查询实时天气数据
+    查询所有气象数据
     
     :parameter province: 省份名
     :type province: <class 'str'>
@@ -434,135 +777,703 @@ def query_real_time_weather(province, city):
     :parameter city: 城市名
     :type city: <class 'str'>
     
-    :return: results: MySQL查询结果字典列表
+    :returns
+    
+    :return: real_time_weather_results: MySQL查询结果字典列表
+    :rtype: <class 'list'>
+    
+    :return: date_weathers_results: MySQL查询结果字典列表
     :rtype: <class 'list'>
     """
     
-    connection, cursor = mysql_initialization(host=HOST, port=PORT, username=USERNAME, password='qwaszx123',
-                                              database='raingod')
-    print_log('Retrieving Real Time Weather Data...... ')
-    query = 'SELECT * FROM RealTimeWeather WHERE province="%s" AND city="%s";' % (province, city)
-    results = retrieve(connection, cursor, query)
-    print_log('Retrieve Real Time Weather Data Successfully! ')
-    mysql_close(connection, cursor)
+    print_log('Retrieving All Weather Data...... ', DEBUG)
+    real_time_weather_results = query_real_time_weather(province, city)
+    date_weathers_results = query_date_weather(province, city)
+    print_log('Retrieve All Weather Data Successfully! ', DEBUG)
     
-    return results
+    return real_time_weather_results, date_weathers_results
 
 
 
-def delete_all_date_weathers():
+def query_every_city_weathers_data():
     """
-    删除所有日期天气数据
+    用两条有序查询获取所有城市的气象数据，在Python中按城市分组
+    
+    :return: weathers: (省份名, 城市名)到(实时天气查询结果字典列表, 日期天气查询结果字典列表)元组的字典，
+                       查询失败时为None
+    :rtype: <class 'dict'>
     """
     
-    connection, cursor = mysql_initialization(host=HOST, port=PORT, username=USERNAME, password='qwaszx123',
-                                              database='raingod')
-    print_log('Deleting All Date Weathers...... ')
-    sql = 'DELETE FROM DateWeather;'
-    delete(connection, cursor, 'delete', sql)
-    print_log('Delete All Date Weathers Successfully! ')
-    mysql_close(connection, cursor)
+    with mysql_connection() as (connection, cursor):
+        if connection is None:
+            return None
+        
+        print_log('Retrieving Every City Weather Data...... ')
+        real_time_weather_results = retrieve(connection, cursor, 'SELECT * FROM RealTimeWeather;')
+        date_weather_results = retrieve(connection, cursor,
+                                        'SELECT * FROM DateWeather ORDER BY province, city, date_time;')
+    
+    if real_time_weather_results is None or date_weather_results is None:
+        return None
+    
+    weathers = {}
+    
+    for i in real_time_weather_results:
+        weathers[(i['province'], i['city'])] = ([i], [])
+    
+    for i in date_weather_results:
+        if (i['province'], i['city']) in weathers:
+            weathers[(i['province'], i['city'])][1].append(i)
+    
+    print_log('Retrieve Every City Weather Data Successfully! ')
+    
+    return weathers
 
 
 
-def update_date_weather(province, city, date_weathers):
+def write_weathers_chunk(connection, cursor, chunk, suffix='', crawled_at=None):
     """
-    更新日期天气数据
+    在一个事务中写入一块城市的气象数据：以多行INSERT ... ON DUPLICATE KEY UPDATE按主键原地更新，
+    再删除这些城市不在新预报中的过期日期，给定爬取时间时同时追加到历史表，失败时回滚；
+    日期天气类对象列表为None的城市只更新实时天气，实时天气类对象为None的城市只更新日期天气
     
-    :parameter province: 省份名
-    :type province: <class 'str'>
+    :parameter connection: MySQL连接对象
+    :type connection: <class 'pymysql.connections.Connection'>
     
-    :parameter city: 城市名
-    :type city: <class 'str'>
+    :parameter cursor: MySQL游标对象
+    :type cursor: <class 'pymysql.cursors.DictCursor'>
     
-    :parameter date_weathers: 日期天气类对象列表
-    :type date_weathers: <class 'list'>
+    :parameter chunk: (省份名, 城市名, 实时天气类对象或None, 日期天气类对象列表或None)元组列表
+    :type chunk: <class 'list'>
+    
+    :parameter suffix: 数据表名后缀，写入影子表时为STAGING_SUFFIX，默认为''
+    :type suffix: <class 'str'>
+    
+    :parameter crawled_at: 本轮爬取开始时间，默认为None（不写入历史表）
+    :type crawled_at: <class 'datetime.datetime'>
+    
+    :return: rows: 写入的数据行数，失败时为None
+    :rtype: <class 'int'>
+    
+    :exception: exception: 批量更新错误
+    :type: <class 'Exception'>
     """
     
-    connection, cursor = mysql_initialization(host=HOST, port=PORT, username=USERNAME, password='qwaszx123',
-                                              database='raingod')
-    print_log('Updating Date Weather Data...... ')
-    sql = 'INSERT INTO DateWeather(province,city,date_time,highest_temperature,lowest_temperature,' \
-          'weather_description1,weather_description2,wind_direction1,wind_direction2,wind_level1,wind_level2) VALUES ' \
-          '(%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s);'
-    insert_data = []
+    start_time = monotonic()
     
-    for i in date_weathers:
-        insert_data.append((province, city, i.get_date(), i.get_highest_temperature(), i.get_lowest_temperature(),
-                            i.get_weather_description1(), i.get_weather_description2(), i.get_wind_direction1(),
-                            i.get_wind_direction2(), i.get_wind_level1(), i.get_wind_level2()))
+    try:
+        conditions = []  # 每个城市各自的过期日期条件，同一块中的城市预报窗口可能不同（如从断点继续时跨过0点）
+        condition_values = []
+        real_time_weather_rows = []
+        date_weather_rows = []
+        
+        for province, city, real_time_weather, date_weathers in chunk:
+            if real_time_weather is not None:  # 重放中断的预报任务时不覆盖实时天气
+                real_time_weather_rows.append(get_real_time_weather_row(province, city, real_time_weather))
+            
+            if date_weathers is None:  # 实时天气任务与页面未修改的城市不更新预报
+                continue
+            
+            dates = sorted({date_weather.get_date().strftime('%Y-%m-%d') for date_weather in date_weathers})
+            date_weather_rows.extend(get_date_weather_rows(province, city, date_weathers))
+            conditions.append('(province=%s AND city=%s' + (
+                ' AND date_time NOT IN (' + ','.join(['%s'] * len(dates)) + '))' if dates else ')'))
+            condition_values.extend([province, city] + dates)
+        
+        if real_time_weather_rows:
+            cursor.executemany(REAL_TIME_WEATHER_INSERT.format(suffix), real_time_weather_rows)  # 合并为多行INSERT
+        
+        if date_weather_rows:
+            cursor.executemany(DATE_WEATHER_INSERT.format(suffix), date_weather_rows)
+        
+        if conditions:  # 删除每个城市不在其新预报中的日期
+            cursor.execute('DELETE FROM DateWeather' + suffix + ' WHERE ' + ' OR '.join(conditions) + ';',
+                           condition_values)
+        
+        if crawled_at is not None:  # 与当前数据在同一事务中追加到历史表
+            if real_time_weather_rows:
+                cursor.executemany(REAL_TIME_WEATHER_HISTORY_INSERT,
+                                   [(crawled_at,) + i for i in real_time_weather_rows])
+            
+            if date_weather_rows:
+                cursor.executemany(DATE_WEATHER_HISTORY_INSERT, [(crawled_at,) + i for i in date_weather_rows])
+        
+        connection.commit()
+        rows = len(real_time_weather_rows) + len(date_weather_rows)
+        observe('raingod_db_write_seconds', monotonic() - start_time)
+        increase('raingod_db_written_rows_total', rows)
+        
+        return rows
+    except Exception as exception:
+        print_traceback_error(exception, 'Bulk Update')
+        increase('raingod_db_write_failures_total')
+        
+        try:
+            connection.rollback()
+        except Exception as exception:  # 连接已断开时回滚也会出错，事务由服务器丢弃
+            print_traceback_error(exception, 'Bulk Update Rollback')
+        
+        return None
+
+
+
+class BulkWriter:
+    """
+    流式气象数据写入类：爬取结果经有界队列交给专用写入线程，按微批次及时提交，
+    队列满时put()阻塞，使爬取速度不超过写入速度，内存占用与城市总数无关；
+    任何写入错误都只计入失败城市数，写入线程继续处理队列，close()返回失败城市数
+    """
     
-    update(connection, cursor, 'insert', sql, insert_data)
-    print_log('Update Date Weather Data Successfully! ')
-    mysql_close(connection, cursor)
+    
+    
+    def __init__(self, suffix='', batch_size=BULK_CHUNK_SIZE, queue_size=WRITER_QUEUE_SIZE,
+                 flush_interval=WRITER_FLUSH_INTERVAL, crawled_at=None):
+        """
+        流式气象数据写入类初始化，启动写入线程
+        
+        :parameter suffix: 数据表名后缀，写入影子表时为STAGING_SUFFIX，默认为''
+        :type suffix: <class 'str'>
+        
+        :parameter batch_size: 每个微批次的最大城市数，默认为BULK_CHUNK_SIZE
+        :type batch_size: <class 'int'>
+        
+        :parameter queue_size: 队列容量（城市数），默认为WRITER_QUEUE_SIZE
+        :type queue_size: <class 'int'>
+        
+        :parameter flush_interval: 未满一个微批次时最长等待多少秒后提交，默认为WRITER_FLUSH_INTERVAL
+        :type flush_interval: <class 'float'>
+        
+        :parameter crawled_at: 本轮爬取开始时间，给定时同时追加到历史表，默认为None
+        :type crawled_at: <class 'datetime.datetime'>
+        """
+        
+        self.__suffix = suffix
+        self.__crawled_at = crawled_at
+        self.__batch_size = batch_size
+        self.__flush_interval = flush_interval
+        self.__queue = Queue(queue_size)
+        self.__rows = 0
+        self.__cities = 0
+        self.__failed = 0
+        self.__start_time = monotonic()
+        self.__thread = Thread(target=self.__run, name='BulkWriter', daemon=True)
+        self.__thread.start()
+    
+    
+    
+    def __flush(self, connection, cursor, batch):
+        """
+        提交一个微批次，出错时整个微批次计为失败
+        
+        :parameter connection: MySQL连接对象
+        :type connection: <class 'pymysql.connections.Connection'>
+        
+        :parameter cursor: MySQL游标对象
+        :type cursor: <class 'pymysql.cursors.DictCursor'>
+        
+        :parameter batch: (省份名, 城市名, 实时天气类对象或None, 日期天气类对象列表或None)元组列表
+        :type batch: <class 'list'>
+        """
+        
+        try:
+            rows = write_weathers_chunk(connection, cursor, batch, self.__suffix, self.__crawled_at) \
+                if connection else None
+        except Exception as exception:
+            print_traceback_error(exception, 'Stream Write')
+            rows = None
+        
+        if rows is None:
+            self.__failed += len(batch)
+        else:
+            self.__rows += rows
+            self.__cities += len(batch)
+        
+        batch.clear()
+    
+    
+    
+    def __run(self):
+        """
+        写入线程：凑满batch_size个城市或等待超过flush_interval秒后提交，收到None时提交剩余数据并退出
+        """
+        
+        batch = []
+        deadline = None
+        
+        with mysql_connection() as (connection, cursor):
+            try:
+                while True:
+                    try:
+                        timeout = None if deadline is None else max(0.0, deadline - monotonic())
+                        item = self.__queue.get(timeout=timeout)
+                    except Empty:
+                        item = False  # 等待超时，提交未满的微批次
+                    
+                    if item:
+                        batch.append(item)
+                        
+                        if deadline is None:
+                            deadline = monotonic() + self.__flush_interval
+                    
+                    if batch and (not item or len(batch) >= self.__batch_size):
+                        self.__flush(connection, cursor, batch)
+                        deadline = None
+                    
+                    if item is None:
+                        break
+            finally:
+                self.__failed += len(batch)  # 写入线程异常退出时未提交的城市
+    
+    
+    
+    def put(self, weather):
+        """
+        提交一个城市的气象数据，队列满时阻塞
+        
+        :parameter weather: (省份名, 城市名, 实时天气类对象或None, 日期天气类对象列表或None)元组
+        :type weather: <class 'tuple'>
+        
+        :raise: exception: 写入线程已退出
+        :type: <class 'Exception'>
+        """
+        
+        while True:
+            if not self.__thread.is_alive():  # 写入线程已退出时不再阻塞等待
+                raise Exception('Stream Writer Thread ERROR! ')
+            
+            try:
+                self.__queue.put(weather, timeout=1)
+                
+                return
+            except Full:
+                continue
+    
+    
+    
+    def close(self):
+        """
+        提交剩余数据并等待写入线程退出，写入线程异常退出时队列中剩余的城市计为失败
+        
+        :returns
+        
+        :return: rows: 写入的数据行数
+        :rtype: <class 'int'>
+        
+        :return: failed: 写入失败的城市数
+        :rtype: <class 'int'>
+        """
+        
+        try:
+            self.put(None)
+        except Exception as exception:
+            print_traceback_error(exception, 'Stream Writer Close')
+        
+        self.__thread.join()
+        
+        while True:
+            try:
+                item = self.__queue.get_nowait()
+            except Empty:
+                break
+            
+            if item:
+                self.__failed += 1
+        
+        seconds = monotonic() - self.__start_time
+        print_log('Stream Write %d Rows of %d Cities in %.2fs (%.0f Rows/s), Failed Cities: %d' % (
+            self.__rows, self.__cities, seconds, self.__rows / seconds if seconds else 0.0, self.__failed))
+        
+        return self.__rows, self.__failed
 
 
 
-def query_date_weather(province, city):
+def begin_snapshot(tables, copy=True):
     """
-    查询日期天气数据
+    开始写入新快照：为每个数据表创建结构相同的影子表，读者在发布前始终读取旧数据表
     
-    :parameter province: 省份名
-    :type province: <class 'str'>
+    :parameter tables: 数据表名列表
+    :type tables: <class 'list'>
     
-    :parameter city: 城市名
-    :type city: <class 'str'>
+    :parameter copy: 是否将当前数据复制到影子表（只写入部分数据时为True），默认为True
+    :type copy: <class 'bool'>
     
-    :return: results: MySQL查询结果字典列表
-    :rtype: <class 'list'>
+    :return: success: 是否成功
+    :rtype: <class 'bool'>
+    
+    :exception: exception: 影子表创建错误
+    :type: <class 'Exception'>
     """
     
-    connection, cursor = mysql_initialization(host=HOST, port=PORT, username=USERNAME, password='qwaszx123',
-                                              database='raingod')
-    print_log('Retrieving Date Weather Data...... ')
-    query = 'SELECT * FROM DateWeather WHERE province="%s" AND city="%s" ORDER BY date_time;' % (province, city)
-    results = retrieve(connection, cursor, query)
-    print_log('Retrieve Date Weather Data Successfully! ')
-    mysql_close(connection, cursor)
+    with mysql_connection() as (connection, cursor):
+        if connection is None:
+            return False
+        
+        print_log('Creating Staging Tables ' + ', '.join(tables) + '...... ')
+        
+        try:
+            for table in tables:
+                cursor.execute('DROP TABLE IF EXISTS ' + table + STAGING_SUFFIX + ';')
+                cursor.execute('CREATE TABLE ' + table + STAGING_SUFFIX + ' LIKE ' + table + ';')
+                
+                if copy:
+                    cursor.execute('INSERT INTO ' + table + STAGING_SUFFIX + ' SELECT * FROM ' + table + ';')
+            
+            connection.commit()
+            print_log('Create Staging Tables Successfully! ')
+            success = True
+        except Exception as exception:
+            print_traceback_error(exception, 'Create Staging Tables')
+            connection.rollback()
+            success = False
     
-    return results
+    return success
 
 
 
-def delete_all_weathers_data():
+def publish_snapshot(tables):
     """
-    删除所有气象数据
+    发布新快照：用一条RENAME TABLE语句原子地将所有影子表换为正式数据表，再删除旧数据表
+    
+    :parameter tables: 数据表名列表
+    :type tables: <class 'list'>
+    
+    :return: success: 是否成功
+    :rtype: <class 'bool'>
+    
+    :exception: exception: 快照发布错误
+    :type: <class 'Exception'>
     """
     
-    print_log('Deleting All Weather Data...... ')
-    delete_all_real_time_weathers()
-    delete_all_date_weathers()
-    print_log('Delete All Weather Data Successfully! ')
+    with mysql_connection() as (connection, cursor):
+        if connection is None:
+            return False
+        
+        print_log('Publishing Snapshot ' + ', '.join(tables) + '...... ')
+        
+        try:
+            for table in tables:
+                cursor.execute('DROP TABLE IF EXISTS ' + table + OLD_SUFFIX + ';')
+            
+            cursor.execute('RENAME TABLE ' + ', '.join(
+                table + ' TO ' + table + OLD_SUFFIX + ', ' + table + STAGING_SUFFIX + ' TO ' + table for table in
+                tables) + ';')
+            
+            for table in tables:
+                cursor.execute('DROP TABLE IF EXISTS ' + table + OLD_SUFFIX + ';')
+            
+            print_log('Publish Snapshot Successfully! ')
+            success = True
+        except Exception as exception:
+            print_traceback_error(exception, 'Publish Snapshot')
+            success = False
+    
+    return success and bump_generations(tables)  # 通知网站数据已更新，失败时网站会一直使用旧缓存
+
+
+
+def bump_generations(names):
+    """
+    递增数据表的发布代数，网站据此判断缓存是否过期
+    
+    :parameter names: 数据表名列表
+    :type names: <class 'list'>
+    
+    :return: success: 是否成功
+    :rtype: <class 'bool'>
+    
+    :exception: exception: 发布代数更新错误
+    :type: <class 'Exception'>
+    """
+    
+    with mysql_connection() as (connection, cursor):
+        if connection is None:
+            return False
+        
+        try:
+            cursor.executemany('INSERT INTO Generation(name,generation,published_at) VALUES (%s,1,NOW()) '
+                               'ON DUPLICATE KEY UPDATE generation=generation+1,published_at=NOW();',
+                               [(name,) for name in names])
+            connection.commit()
+            print_log('Bump Generations ' + ', '.join(names) + ' Successfully! ')
+            
+            return True
+        except Exception as exception:
+            print_traceback_error(exception, 'Bump Generations')
+            connection.rollback()
+            
+            return False
 
 
 
-def update_all_weathers_data(province, city, real_time_weather, date_weathers):
+def query_generations():
     """
-    更新所有气象数据
+    查询所有数据表的发布代数
     
-    :parameter province: 省份名
-    :type province: <class 'str'>
+    :return: generations: 数据表名到发布代数的字典，查询失败时为None
+    :rtype: <class 'dict'>
+    """
     
-    :parameter city: 城市名
-    :type city: <class 'str'>
+    with mysql_connection() as (connection, cursor):
+        if connection is None:
+            return None
+        
+        results = retrieve(connection, cursor, 'SELECT name, generation FROM Generation;')
     
-    :parameter real_time_weather: 实时天气类对象
-    :type real_time_weather: <class 'weather.RealTimeWeather'>
+    if results is None:
+        return None
     
-    :parameter date_weathers: 日期天气类对象列表
-    :type date_weathers: <class 'list'>
+    return {i['name']: i['generation'] for i in results}
+
+
+
+def query_province_city_tree():
+    """
+    用一条有序查询获取所有省份及其城市，在Python中按省份分组
+    
+    :return: tree: 省份名到城市名列表的字典（按爬取时页面上的顺序排列），查询失败时为None
+    :rtype: <class 'dict'>
     """
     
-    print_log('Updating All Weather Data...... ')
-    update_real_time_weather(province, city, real_time_weather)
-    update_date_weather(province, city, date_weathers)
-    print_log('Update All Weather Data Successfully! ')
+    with mysql_connection() as (connection, cursor):
+        if connection is None:
+            return None
+        
+        print_log('Retrieving Province City Tree...... ', DEBUG)
+        query = 'SELECT Province.province, City.city FROM Province LEFT JOIN City ON City.province=Province.province ' \
+                'ORDER BY Province.id, City.id;'
+        results = retrieve(connection, cursor, query)
+    
+    if results is None:
+        return None
+    
+    tree = {}
+    
+    for i in results:
+        cities = tree.setdefault(i['province'], [])
+        
+        if i['city'] is not None:  # 没有城市的省份
+            cities.append(i['city'])
+    
+    print_log('Retrieve Province City Tree Successfully! ', DEBUG)
+    
+    return tree
 
 
 
-def query_all_weathers_data(province, city):
+def publish_provinces(provinces):
     """
-    查询所有气象数据
+    以原子快照替换所有省份数据，写入失败时不发布
+    
+    :parameter provinces: 省份名列表
+    :type provinces: <class 'list'>
+    
+    :return: success: 是否成功
+    :rtype: <class 'bool'>
+    
+    :exception: exception: 省份数据写入错误
+    :type: <class 'Exception'>
+    """
+    
+    if not begin_snapshot(['Province'], copy=False):
+        return False
+    
+    with mysql_connection() as (connection, cursor):
+        if connection is None:
+            return False
+        
+        print_log('Updating Province Data...... ')
+        
+        try:
+            cursor.executemany('INSERT INTO Province' + STAGING_SUFFIX + '(province) VALUES (%s) '
+                               'ON DUPLICATE KEY UPDATE province=VALUES(province);',
+                               [(province,) for province in provinces])
+            connection.commit()
+            success = True
+        except Exception as exception:
+            print_traceback_error(exception, 'Update Province')
+            connection.rollback()
+            success = False
+    
+    return success and publish_snapshot(['Province'])
+
+
+
+def publish_cities(cities):
+    """
+    以原子快照替换所有城市数据，写入失败时不发布
+    
+    :parameter cities: (省份名, 城市名)元组列表
+    :type cities: <class 'list'>
+    
+    :return: success: 是否成功
+    :rtype: <class 'bool'>
+    
+    :exception: exception: 城市数据写入错误
+    :type: <class 'Exception'>
+    """
+    
+    if not begin_snapshot(['City'], copy=False):
+        return False
+    
+    with mysql_connection() as (connection, cursor):
+        if connection is None:
+            return False
+        
+        print_log('Updating City Data...... ')
+        
+        try:
+            cursor.executemany('INSERT INTO City' + STAGING_SUFFIX + '(province,city) VALUES (%s,%s) '
+                               'ON DUPLICATE KEY UPDATE city=VALUES(city);', cities)
+            connection.commit()
+            success = True
+        except Exception as exception:
+            print_traceback_error(exception, 'Update City')
+            connection.rollback()
+            success = False
+    
+    return success and publish_snapshot(['City'])
+
+
+
+def add_page_views(counts):
+    """
+    累加城市当天的页面浏览量，由网站进程定期批量调用
+    
+    :parameter counts: (省份名, 城市名)到新增浏览量的字典
+    :type counts: <class 'dict'>
+    
+    :return: success: 是否成功
+    :rtype: <class 'bool'>
+    
+    :exception: exception: 页面浏览量更新错误
+    :type: <class 'Exception'>
+    """
+    
+    with mysql_connection() as (connection, cursor):
+        if connection is None:
+            return False
+        
+        try:
+            cursor.executemany('INSERT INTO PageView(date_time,province,city,views) VALUES (CURDATE(),%s,%s,%s) '
+                               'ON DUPLICATE KEY UPDATE views=views+VALUES(views);',
+                               [(province, city, views) for (province, city), views in counts.items()])
+            connection.commit()
+            success = True
+        except Exception as exception:
+            print_traceback_error(exception, 'Add Page Views')
+            connection.rollback()
+            success = False
+    
+    return success
+
+
+
+def query_page_views(window_days=PAGE_VIEW_WINDOW_DAYS, half_life_days=PAGE_VIEW_HALF_LIFE_DAYS):
+    """
+    查询所有城市最近window_days天按指数衰减加权的页面浏览量，每过half_life_days天权重减半，
+    近期热门的城市排在长期累计浏览量高但已不再热门的城市之前
+    
+    :parameter window_days: 统计天数，默认为PAGE_VIEW_WINDOW_DAYS
+    :type window_days: <class 'int'>
+    
+    :parameter half_life_days: 半衰期天数，默认为PAGE_VIEW_HALF_LIFE_DAYS
+    :type half_life_days: <class 'float'>
+    
+    :return: views: (省份名, 城市名)到衰减后浏览量的字典，查询失败时为None
+    :rtype: <class 'dict'>
+    """
+    
+    with mysql_connection() as (connection, cursor):
+        if connection is None:
+            return None
+        
+        query = 'SELECT province, city, SUM(views*POW(0.5,DATEDIFF(CURDATE(),date_time)/%s)) AS views FROM PageView ' \
+                'WHERE date_time>CURDATE()-INTERVAL %s DAY GROUP BY province, city;'
+        results = retrieve(connection, cursor, query, (half_life_days, window_days))
+    
+    if results is None:
+        return None
+    
+    return {(i['province'], i['city']): i['views'] for i in results}
+
+
+
+def delete_expired_page_views(window_days=PAGE_VIEW_WINDOW_DAYS):
+    """
+    删除window_days天以前的每日页面浏览量，由爬虫每轮调用一次
+    
+    :parameter window_days: 保留天数，默认为PAGE_VIEW_WINDOW_DAYS
+    :type window_days: <class 'int'>
+    """
+    
+    with mysql_connection() as (connection, cursor):
+        if connection is None:
+            return
+        
+        sql = 'DELETE FROM PageView WHERE date_time<=CURDATE()-INTERVAL %s DAY;'
+        delete(connection, cursor, 'delete', sql, window_days)
+
+
+
+def maintain_history_partitions(retention_days=HISTORY_RETENTION_DAYS, precreate_days=HISTORY_PRECREATE_DAYS):
+    """
+    维护历史表的按天分区：从pmax中拆分出今后precreate_days天的分区，删除早于retention_days天的分区，
+    删除分区只删除数据文件，不逐行DELETE
+    
+    :parameter retention_days: 保留天数，默认为HISTORY_RETENTION_DAYS
+    :type retention_days: <class 'int'>
+    
+    :parameter precreate_days: 提前创建的天数，默认为HISTORY_PRECREATE_DAYS
+    :type precreate_days: <class 'int'>
+    
+    :return: success: 是否成功
+    :rtype: <class 'bool'>
+    
+    :exception: exception: 分区维护错误
+    :type: <class 'Exception'>
+    """
+    
+    with mysql_connection() as (connection, cursor):
+        if connection is None:
+            return False
+        
+        today = date.today()
+        success = True
+        
+        for table, ddl in (('RealTimeWeatherHistory', REAL_TIME_WEATHER_HISTORY_TABLE),
+                           ('DateWeatherHistory', DATE_WEATHER_HISTORY_TABLE)):
+            try:
+                cursor.execute(ddl)
+                cursor.execute('SELECT PARTITION_NAME FROM information_schema.PARTITIONS WHERE TABLE_SCHEMA=DATABASE() '
+                               'AND TABLE_NAME=%s;', (table,))
+                existing = {i['PARTITION_NAME'] for i in cursor.fetchall()}
+                days = [today + timedelta(days=i) for i in range(precreate_days + 1)]
+                partitions = ['PARTITION p%s VALUES LESS THAN (TO_DAYS(\'%s\'))' % (
+                    day.strftime('%Y%m%d'), (day + timedelta(days=1)).isoformat())
+                    for day in days if 'p' + day.strftime('%Y%m%d') not in existing]
+                
+                if partitions:  # 分区按天连续创建，新分区总在已有分区之后，从pmax中拆分
+                    cursor.execute('ALTER TABLE ' + table + ' REORGANIZE PARTITION pmax INTO (' +
+                                   ', '.join(partitions) + ', PARTITION pmax VALUES LESS THAN MAXVALUE);')
+                
+                expired = sorted(i for i in existing if i != 'pmax' and
+                                 i < 'p' + (today - timedelta(days=retention_days)).strftime('%Y%m%d'))
+                
+                if expired:
+                    cursor.execute('ALTER TABLE ' + table + ' DROP PARTITION ' + ', '.join(expired) + ';')
+                
+                print_log('Maintain %s Partitions: %d Created, %d Dropped. ' % (table, len(partitions), len(expired)))
+            except Exception as exception:
+                print_traceback_error(exception, 'Maintain ' + table + ' Partitions')
+                success = False
+    
+    return success
+
+
+
+def query_weather_history(province, city, start, end):
+    """
+    查询一个城市在一段时间内爬取的历史气象数据，按主键(province, city, crawled_at)范围查询，只扫描相关分区
     
     :parameter province: 省份名
     :type province: <class 'str'>
@@ -570,21 +1481,111 @@ def query_all_weathers_data(province, city):
     :parameter city: 城市名
     :type city: <class 'str'>
     
+    :parameter start: 开始时间（含）
+    :type start: <class 'datetime.datetime'>
+    
+    :parameter end: 结束时间（不含）
+    :type end: <class 'datetime.datetime'>
+    
     :returns
     
-    :return: real_time_weather_results: MySQL查询结果字典列表
+    :return: real_time_weathers: 实时天气历史MySQL查询结果字典列表，按爬取时间排序，查询失败时为None
     :rtype: <class 'list'>
     
-    :return: date_weathers_results: MySQL查询结果字典列表
+    :return: date_weathers: 日期天气历史MySQL查询结果字典列表，按爬取时间与日期排序，查询失败时为None
     :rtype: <class 'list'>
     """
     
-    print_log('Retrieving All Weather Data...... ')
-    real_time_weather_results = query_real_time_weather(province, city)
-    date_weathers_results = query_date_weather(province, city)
-    print_log('Retrieve All Weather Data Successfully! ')
+    with mysql_connection() as (connection, cursor):
+        if connection is None:
+            return None, None
+        
+        condition = ' WHERE province=%s AND city=%s AND crawled_at>=%s AND crawled_at<%s'
+        values = (province, city, start, end)
+        
+        try:
+            cursor.execute('SELECT * FROM RealTimeWeatherHistory' + condition + ' ORDER BY crawled_at;', values)
+            real_time_weathers = cursor.fetchall()
+            cursor.execute('SELECT * FROM DateWeatherHistory' + condition + ' ORDER BY crawled_at, date_time;', values)
+            date_weathers = cursor.fetchall()
+        except Exception as exception:
+            print_traceback_error(exception, 'Query Weather History')
+            real_time_weathers, date_weathers = None, None
     
-    return real_time_weather_results, date_weathers_results
+    return real_time_weathers, date_weathers
+
+
+
+def query_summary_source():
+    """
+    查询汇总阶段所需的日期天气列
+    
+    :return: results: 日期天气MySQL查询结果字典列表，查询失败时为None
+    :rtype: <class 'list'>
+    """
+    
+    with mysql_connection() as (connection, cursor):
+        if connection is None:
+            return None
+        
+        results = retrieve(connection, cursor, 'SELECT province, city, date_time, highest_temperature_value, '
+                                               'lowest_temperature_value, weather_description1, weather_description2 '
+                                               'FROM DateWeather;')
+    
+    return results
+
+
+
+def publish_summaries(summaries):
+    """
+    以原子快照替换所有汇总数据，写入失败时不发布；WeatherSummary表由raingod.sql或migrate_summary.sql创建
+    
+    :parameter summaries: 与WeatherSummary列顺序一致的汇总数据元组列表
+    :type summaries: <class 'list'>
+    
+    :return: success: 是否成功
+    :rtype: <class 'bool'>
+    
+    :exception: exception: 汇总数据写入错误
+    :type: <class 'Exception'>
+    """
+    
+    with mysql_connection() as (connection, cursor):
+        if connection is None:
+            return False
+        
+        if not begin_snapshot(['WeatherSummary'], copy=False):
+            return False
+        
+        try:
+            cursor.executemany('INSERT INTO WeatherSummary' + STAGING_SUFFIX + ' VALUES (%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,'
+                               '%s,%s);', summaries)
+            connection.commit()
+            success = True
+        except Exception as exception:
+            print_traceback_error(exception, 'Update Weather Summary')
+            connection.rollback()
+            success = False
+    
+    return success and publish_snapshot(['WeatherSummary'])
+
+
+
+def query_summaries():
+    """
+    查询所有汇总数据
+    
+    :return: results: 汇总MySQL查询结果字典列表，按范围与日期排序，查询失败时为None
+    :rtype: <class 'list'>
+    """
+    
+    with mysql_connection() as (connection, cursor):
+        if connection is None:
+            return None
+        
+        results = retrieve(connection, cursor, 'SELECT * FROM WeatherSummary ORDER BY scope, date_time;')
+    
+    return results
 
 
 
@@ -638,8 +1639,8 @@ if __name__ == '__main__':
     for i in results:
         print(i)
     
-    query_one = 'SELECT * FROM test WHERE test_id=%s;' % '1'
-    results = retrieve(connection, cursor, query_one)
+    query_one = 'SELECT * FROM test WHERE test_id=%s;'
+    results = retrieve(connection, cursor, query_one, ('1',))
     
     for i in results:
         print(i)
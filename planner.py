@@ -0,0 +1,119 @@
+#!usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+planner.py
+Define Some Crawl Planner Functions.
+1. get_change_rate()
+2. get_priority()
+3. plan_crawl()
+"""
+
+from math import exp, log
+from time import time
+
+from tools import print_log
+
+
+
+# Define Global Variables.
+CRAWL_BUDGET = 600  # Max Cities Crawled per Run of the Hourly Real Time Job
+DEFAULT_CHANGE_RATE = 1.0 / 3600  # Assumed Change Rate(Per Second) of URLs With No Visit History
+
+
+
+def get_change_rate(intervals, changes, elapsed):
+    """
+    估计url内容的变化频率（泊松过程），只知道每次访问时内容是否变化，不知道两次访问之间变化了几次，
+    因此用ln((n + 0.5) / (n - X + 0.5))除以平均访问间隔，而不是简单的X / elapsed（访问稀疏时会低估）
+    
+    :parameter intervals: 访问间隔数n
+    :type intervals: <class 'int'>
+    
+    :parameter changes: 其中内容发生变化的次数X
+    :type changes: <class 'int'>
+    
+    :parameter elapsed: 间隔总秒数
+    :type elapsed: <class 'float'>
+    
+    :return: rate: 每秒变化次数，没有访问历史时为DEFAULT_CHANGE_RATE
+    :rtype: <class 'float'>
+    """
+    
+    if not intervals or elapsed <= 0:
+        return DEFAULT_CHANGE_RATE
+    
+    return log((intervals + 0.5) / (intervals - changes + 0.5)) / (elapsed / intervals)
+
+
+
+def get_priority(views, rate, age):
+    """
+    计算城市的重新爬取优先级：页面价值（浏览量）乘以距上一次爬取以来内容已发生变化的概率，
+    热门且变化频繁的城市优先，长时间未爬取的城市优先级随时间上升
+    
+    :parameter views: 衰减加权后的页面浏览量
+    :type views: <class 'float'>
+    
+    :parameter rate: 每秒变化次数
+    :type rate: <class 'float'>
+    
+    :parameter age: 距上一次爬取的秒数，从未爬取时为None
+    :type age: <class 'float'>
+    
+    :return: priority: 优先级
+    :rtype: <class 'float'>
+    """
+    
+    probability = 1.0 if age is None else 1.0 - exp(-rate * age)
+    
+    return (1 + views) * probability
+
+
+
+def plan_crawl(tasks, views, visits, key_prefix='', budget=None, now=None):
+    """
+    按优先级从高到低排列爬取任务，给定预算时只保留优先级最高的budget个
+    
+    :parameter tasks: (爬虫目标地址, 参数元组)列表，参数元组的第2、4项为省份名、城市名
+    :type tasks: <class 'list'>
+    
+    :parameter views: (省份名, 城市名)到页面浏览量的字典
+    :type views: <class 'dict'>
+    
+    :parameter visits: 内容指纹键到(访问间隔数, 变化次数, 间隔总秒数, 上一次访问时间戳)元组的字典
+    :type visits: <class 'dict'>
+    
+    :parameter key_prefix: 内容指纹键前缀，默认为''
+    :type key_prefix: <class 'str'>
+    
+    :parameter budget: 最多爬取的城市数，默认为None（不限）
+    :type budget: <class 'int'>
+    
+    :parameter now: 当前时间戳，默认为None（当前时间）
+    :type now: <class 'float'>
+    
+    :return: tasks: 排序（并截断）后的爬取任务列表
+    :rtype: <class 'list'>
+    """
+    
+    now = time() if now is None else now
+    priorities = {}
+    
+    for url, arguments in tasks:
+        city_views = views.get((arguments[1], arguments[3]), 0)
+        visit = visits.get(key_prefix + url)
+        
+        if visit is None:
+            priorities[url] = get_priority(city_views, DEFAULT_CHANGE_RATE, None)
+        else:
+            intervals, changes, elapsed, visited_at = visit
+            priorities[url] = get_priority(city_views, get_change_rate(intervals, changes, elapsed), now - visited_at)
+    
+    planned = sorted(tasks, key=lambda task: priorities[task[0]], reverse=True)
+    
+    if budget is not None and len(planned) > budget:
+        print_log('Crawl Plan: %d of %d Cities Within Budget. ' % (budget, len(planned)))
+        planned = planned[:budget]
+    
+    return planned
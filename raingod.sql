@@ -6,15 +6,21 @@ USE raingod;
 DROP TABLE IF EXISTS Province;
 CREATE TABLE IF NOT EXISTS Province
 (
-    province VARCHAR(50) NOT NULL
+    id INT NOT NULL AUTO_INCREMENT,
+    province VARCHAR(50) NOT NULL,
+    PRIMARY KEY (province),
+    UNIQUE KEY id (id)
 )
 DEFAULT CHARSET = utf8mb4;
 
 DROP TABLE IF EXISTS City;
 CREATE TABLE IF NOT EXISTS City
 (
+    id INT NOT NULL AUTO_INCREMENT,
     province VARCHAR(50) NOT NULL,
-    city VARCHAR(100) NOT NULL
+    city VARCHAR(100) NOT NULL,
+    PRIMARY KEY (province, city),
+    UNIQUE KEY id (id)
 )
 DEFAULT CHARSET = utf8mb4;
 
@@ -31,7 +37,14 @@ CREATE TABLE IF NOT EXISTS RealTimeWeather
     relative_humidity VARCHAR(20),
     sensible_temperature VARCHAR(20),
     aqi VARCHAR(20),
-    comfort VARCHAR(50)
+    comfort VARCHAR(50),
+    temperature_value DOUBLE,
+    precipitation_value DOUBLE,
+    relative_humidity_value DOUBLE,
+    sensible_temperature_value DOUBLE,
+    aqi_value DOUBLE,
+    PRIMARY KEY (province, city),
+    INDEX temperature_value (temperature_value)
 )
 DEFAULT CHARSET = utf8mb4;
 
@@ -48,6 +61,99 @@ CREATE TABLE IF NOT EXISTS DateWeather
     wind_direction1 VARCHAR(50),
     wind_direction2 VARCHAR(50),
     wind_level1 VARCHAR(50),
-    wind_level2 VARCHAR(50)
+    wind_level2 VARCHAR(50),
+    highest_temperature_value DOUBLE,
+    lowest_temperature_value DOUBLE,
+    PRIMARY KEY (province, city, date_time),
+    INDEX date_highest_temperature (date_time, highest_temperature_value),
+    INDEX date_lowest_temperature (date_time, lowest_temperature_value)
+)
+DEFAULT CHARSET = utf8mb4;
+
+DROP TABLE IF EXISTS Generation;
+CREATE TABLE IF NOT EXISTS Generation
+(
+    name VARCHAR(50) NOT NULL,
+    generation BIGINT NOT NULL,
+    published_at DATETIME,
+    PRIMARY KEY (name)
+)
+DEFAULT CHARSET = utf8mb4;
+
+DROP TABLE IF EXISTS PageView;
+CREATE TABLE IF NOT EXISTS PageView
+(
+    date_time DATE NOT NULL,
+    province VARCHAR(50) NOT NULL,
+    city VARCHAR(100) NOT NULL,
+    views BIGINT NOT NULL,
+    PRIMARY KEY (date_time, province, city)
+)
+DEFAULT CHARSET = utf8mb4;
+
+DROP TABLE IF EXISTS RealTimeWeatherHistory;
+CREATE TABLE IF NOT EXISTS RealTimeWeatherHistory
+(
+    crawled_at DATETIME NOT NULL,
+    province VARCHAR(50) NOT NULL,
+    city VARCHAR(100) NOT NULL,
+    publish_time VARCHAR(20),
+    temperature VARCHAR(20),
+    precipitation VARCHAR(20),
+    wind_direction VARCHAR(50),
+    wind_power VARCHAR(50),
+    relative_humidity VARCHAR(20),
+    sensible_temperature VARCHAR(20),
+    aqi VARCHAR(20),
+    comfort VARCHAR(50),
+    temperature_value DOUBLE,
+    precipitation_value DOUBLE,
+    relative_humidity_value DOUBLE,
+    sensible_temperature_value DOUBLE,
+    aqi_value DOUBLE,
+    PRIMARY KEY (province, city, crawled_at)
+)
+DEFAULT CHARSET = utf8mb4
+PARTITION BY RANGE (TO_DAYS(crawled_at)) (PARTITION pmax VALUES LESS THAN MAXVALUE);
+
+DROP TABLE IF EXISTS DateWeatherHistory;
+CREATE TABLE IF NOT EXISTS DateWeatherHistory
+(
+    crawled_at DATETIME NOT NULL,
+    province VARCHAR(50) NOT NULL,
+    city VARCHAR(100) NOT NULL,
+    date_time DATE NOT NULL,
+    highest_temperature VARCHAR(20),
+    lowest_temperature VARCHAR(20),
+    weather_description1 VARCHAR(20),
+    weather_description2 VARCHAR(20),
+    wind_direction1 VARCHAR(50),
+    wind_direction2 VARCHAR(50),
+    wind_level1 VARCHAR(50),
+    wind_level2 VARCHAR(50),
+    highest_temperature_value DOUBLE,
+    lowest_temperature_value DOUBLE,
+    PRIMARY KEY (province, city, crawled_at, date_time),
+    INDEX city_date (province, city, date_time)
+)
+DEFAULT CHARSET = utf8mb4
+PARTITION BY RANGE (TO_DAYS(crawled_at)) (PARTITION pmax VALUES LESS THAN MAXVALUE);
+
+DROP TABLE IF EXISTS WeatherSummary;
+CREATE TABLE IF NOT EXISTS WeatherSummary
+(
+    scope VARCHAR(50) NOT NULL,
+    date_time DATE NOT NULL,
+    cities INT NOT NULL,
+    max_highest_temperature DOUBLE,
+    min_lowest_temperature DOUBLE,
+    mean_highest_temperature DOUBLE,
+    mean_lowest_temperature DOUBLE,
+    hottest_province VARCHAR(50),
+    hottest_city VARCHAR(100),
+    coldest_province VARCHAR(50),
+    coldest_city VARCHAR(100),
+    rain_cities INT NOT NULL,
+    PRIMARY KEY (scope, date_time)
 )
 DEFAULT CHARSET = utf8mb4;
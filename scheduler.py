@@ -0,0 +1,230 @@
+#!usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+scheduler.py
+Define Some Scheduler Classes.
+1. Job
+2. Scheduler
+"""
+
+from random import uniform
+from time import time, sleep, localtime, strftime
+from os import makedirs
+from os.path import dirname
+from sys import platform
+
+from tools import print_log, print_traceback_error
+
+if platform == 'win32':
+    from msvcrt import locking, LK_NBLCK
+else:
+    from fcntl import flock, LOCK_EX, LOCK_NB
+
+
+
+# Define Global Variables.
+SCHEDULER_LOCK_PATH = './state/scheduler.lock'  # Lock File Preventing Two Schedulers From Running at Once
+SCHEDULER_MAX_SLEEP = 60  # Max Seconds the Scheduler Sleeps Before Rechecking Jobs
+RETRY_INTERVAL = 300  # Seconds Before Retrying a Failed Job Within the Same Slot
+
+
+
+class Job:
+    """
+    定时任务类，在本地时间每interval秒的第offset秒（如每天0点、每小时第5分钟）运行一次，并加入随机延迟
+    """
+    
+    
+    
+    def __init__(self, name, function, interval, offset=0, jitter=0, covers=None):
+        """
+        定时任务类初始化
+        
+        :parameter name: 任务名
+        :type name: <class 'str'>
+        
+        :parameter function: 任务函数，无参数，返回是否成功
+        :type function: <class 'function'>
+        
+        :parameter interval: 运行周期（秒）
+        :type interval: <class 'int'>
+        
+        :parameter offset: 周期内的运行时刻（秒），默认为0
+        :type offset: <class 'int'>
+        
+        :parameter jitter: 最大随机延迟（秒），避免每次都在同一时刻请求目标网站，默认为0
+        :type jitter: <class 'int'>
+        
+        :parameter covers: 本任务成功后视为同时完成的任务名列表，默认为None
+        :type covers: <class 'list'>
+        """
+        
+        self.name = name
+        self.function = function
+        self.interval = interval
+        self.offset = offset
+        self.jitter = jitter
+        self.covers = covers or []
+        self.last_run = 0.0  # 上一次成功运行的开始时间
+        self.retry_at = 0.0  # 失败后允许重试的时间
+        self.__delays = {}  # 周期开始时间到随机延迟的字典
+    
+    
+    
+    def get_slot(self, now):
+        """
+        获取当前所在周期的开始时间（按本地时间对齐）
+        
+        :parameter now: 当前时间戳
+        :type now: <class 'float'>
+        
+        :return: slot: 周期开始时间戳
+        :rtype: <class 'float'>
+        """
+        
+        local = now + localtime(now).tm_gmtoff
+        
+        return round(now - (local - self.offset) % self.interval)  # 取整，同一周期多次计算结果相同
+    
+    
+    
+    def get_due_time(self, now):
+        """
+        获取任务下一次应运行的时间：本周期尚未成功运行时为本周期开始时间加随机延迟（已错过时立即补运行），
+        否则为下一周期开始时间加随机延迟；失败后不早于重试时间
+        
+        :parameter now: 当前时间戳
+        :type now: <class 'float'>
+        
+        :return: due_time: 应运行时间戳
+        :rtype: <class 'float'>
+        """
+        
+        slot = self.get_slot(now)
+        
+        if self.last_run >= slot:
+            slot += self.interval
+        
+        if slot not in self.__delays:
+            self.__delays = {slot: uniform(0, self.jitter)}  # 每个周期只抽取一次随机延迟
+        
+        return max(slot + self.__delays[slot], self.retry_at)
+
+
+
+class Scheduler:
+    """
+    定时任务调度类：按加入顺序决定同时到期任务的优先级，在同一线程中依次运行，任务之间不会重叠，
+    运行期间错过的周期在结束后只补运行一次
+    """
+    
+    
+    
+    def __init__(self, lock_path=SCHEDULER_LOCK_PATH):
+        """
+        定时任务调度类初始化
+        
+        :parameter lock_path: 锁文件路径，默认为SCHEDULER_LOCK_PATH
+        :type lock_path: <class 'str'>
+        """
+        
+        self.__lock_path = lock_path
+        self.__lock_file = None
+        self.__jobs = []
+    
+    
+    
+    def lock(self):
+        """
+        获取调度锁，同一时间只允许一个调度进程运行；锁文件保持打开，进程退出时由操作系统释放锁
+        
+        :raise: exception: 已有调度进程在运行
+        :type: <class 'Exception'>
+        """
+        
+        makedirs(dirname(self.__lock_path) or '.', exist_ok=True)
+        lock_file = open(self.__lock_path, 'w')
+        
+        try:
+            if platform == 'win32':
+                locking(lock_file.fileno(), LK_NBLCK, 1)
+            else:
+                flock(lock_file, LOCK_EX | LOCK_NB)
+        except OSError:
+            lock_file.close()
+            
+            raise Exception('Another Scheduler is Running! ')
+        
+        self.__lock_file = lock_file
+    
+    
+    
+    def add(self, job, last_run=0.0):
+        """
+        加入定时任务
+        
+        :parameter job: 定时任务对象
+        :type job: <class 'scheduler.Job'>
+        
+        :parameter last_run: 上一次成功运行的开始时间，早于当前周期时启动后立即补运行，默认为0.0
+        :type last_run: <class 'float'>
+        """
+        
+        job.last_run = last_run
+        self.__jobs.append(job)
+        print_log('Scheduled Job %s, Next Run at %s' % (
+            job.name, strftime('%Y-%m-%d %H:%M:%S', localtime(job.get_due_time(time())))))
+    
+    
+    
+    def run_pending(self):
+        """
+        运行一个已到期的任务
+        
+        :return: seconds: 距离下一个任务到期的秒数
+        :rtype: <class 'float'>
+        
+        :exception: exception: 定时任务运行错误
+        :type: <class 'Exception'>
+        """
+        
+        now = time()
+        
+        for job in self.__jobs:
+            if job.get_due_time(now) <= now:
+                print_log('Running Job %s...... ' % job.name)
+                
+                try:
+                    success = job.function()
+                except Exception as exception:
+                    print_traceback_error(exception, 'Job ' + job.name)
+                    success = False
+                
+                if success:
+                    job.last_run = now
+                    job.retry_at = 0.0
+                    
+                    for covered in self.__jobs:
+                        if covered.name in job.covers:
+                            covered.last_run = max(covered.last_run, now)
+                    
+                    print_log('Run Job %s Successfully! ' % job.name)
+                else:
+                    job.retry_at = time() + RETRY_INTERVAL
+                
+                break
+        
+        now = time()
+        
+        return max(0.0, min(job.get_due_time(now) for job in self.__jobs) - now)
+    
+    
+    
+    def run_forever(self):
+        """
+        持续调度所有任务，调用前应先以lock()获取调度锁
+        """
+
+        while True:
+            sleep(min(self.run_pending(), SCHEDULER_MAX_SLEEP))
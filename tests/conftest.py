@@ -0,0 +1,37 @@
+#!usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+conftest.py
+Define Some Pytest Fixtures.
+1. working_directory()
+"""
+
+from os.path import dirname, abspath
+from sys import path
+
+import pytest
+
+path.insert(0, dirname(dirname(abspath(__file__))))
+
+
+
+# Define Global Variables.
+ROOT_DIRECTORY = dirname(dirname(abspath(__file__)))  # Repository Root Directory
+FIXTURE_DIRECTORY = ROOT_DIRECTORY + '/fixtures'  # HTML and JSON Fixture Directory
+
+
+
+@pytest.fixture(autouse=True)
+def working_directory(tmp_path, monkeypatch):
+    """
+    在临时目录中运行每个测试，状态文件、指标文件不写入仓库目录
+    
+    :parameter tmp_path: 临时目录
+    :type tmp_path: <class 'pathlib.Path'>
+    
+    :parameter monkeypatch: pytest monkeypatch对象
+    :type monkeypatch: <class '_pytest.monkeypatch.MonkeyPatch'>
+    """
+    
+    monkeypatch.chdir(tmp_path)
@@ -0,0 +1,160 @@
+#!usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+test_aggregator.py
+Test the Aggregation Functions of aggregator.py.
+1. get_source_row()
+2. aggregate()
+3. aggregate_reference()
+4. test_aggregate_all_weathers_data()
+5. test_aggregate_all_weathers_data_reference()
+6. test_aggregate_all_weathers_data_failure()
+"""
+
+from datetime import date
+from random import Random
+
+import aggregator
+from mysql import NATIONAL_SCOPE
+
+
+
+def get_source_row(province, city, date_time, highest, lowest, description1='晴', description2='多云'):
+    """
+    构造与query_summary_source()返回结果格式相同的日期天气行
+    
+    :parameter province: 省份名
+    :type province: <class 'str'>
+    
+    :parameter city: 城市名
+    :type city: <class 'str'>
+    
+    :parameter date_time: 日期
+    :type date_time: <class 'datetime.date'>
+    
+    :parameter highest: 最高温度，缺失时为None
+    :type highest: <class 'float'>
+    
+    :parameter lowest: 最低温度，缺失时为None
+    :type lowest: <class 'float'>
+    
+    :parameter description1: 白天天气描述，默认为'晴'
+    :type description1: <class 'str'>
+    
+    :parameter description2: 夜间天气描述，默认为'多云'
+    :type description2: <class 'str'>
+    
+    :return: row: 日期天气行字典
+    :rtype: <class 'dict'>
+    """
+    
+    return {'province': province, 'city': city, 'date_time': date_time, 'highest_temperature_value': highest,
+            'lowest_temperature_value': lowest, 'weather_description1': description1,
+            'weather_description2': description2}
+
+
+
+def aggregate(monkeypatch, source):
+    """
+    在合成数据上运行汇总阶段，返回发布的汇总行
+    
+    :parameter monkeypatch: pytest monkeypatch对象
+    :type monkeypatch: <class '_pytest.monkeypatch.MonkeyPatch'>
+    
+    :parameter source: 日期天气行字典列表
+    :type source: <class 'list'>
+    
+    :return: summaries: (范围名, 日期)到汇总行元组的字典
+    :rtype: <class 'dict'>
+    """
+    
+    published = []
+    monkeypatch.setattr(aggregator, 'query_summary_source', lambda: source)
+    monkeypatch.setattr(aggregator, 'publish_summaries', lambda rows: published.extend(rows) or True)
+    
+    assert aggregator.aggregate_all_weathers_data() == len(published)
+    
+    return {(row[0], row[1]): row for row in published}
+
+
+
+def aggregate_reference(source):
+    """
+    逐行计算汇总结果，作为向量化实现的参照
+    
+    :parameter source: 日期天气行字典列表
+    :type source: <class 'list'>
+    
+    :return: summaries: (范围名, 日期)到汇总行元组的字典
+    :rtype: <class 'dict'>
+    """
+    
+    groups = {}
+    
+    for row in source:
+        for scope in (row['province'], NATIONAL_SCOPE):
+            groups.setdefault((scope, row['date_time']), []).append(row)
+    
+    summaries = {}
+    
+    for (scope, date_time), rows in groups.items():
+        highest = [i for i in rows if i['highest_temperature_value'] is not None]
+        lowest = [i for i in rows if i['lowest_temperature_value'] is not None]
+        hottest = max(highest, key=lambda i: i['highest_temperature_value']) if highest else None
+        coldest = min(lowest, key=lambda i: i['lowest_temperature_value']) if lowest else None
+        summaries[(scope, date_time)] = (
+            scope, date_time, len(rows), hottest and hottest['highest_temperature_value'],
+            coldest and coldest['lowest_temperature_value'],
+            round(sum(i['highest_temperature_value'] for i in highest) / len(highest), 1) if highest else None,
+            round(sum(i['lowest_temperature_value'] for i in lowest) / len(lowest), 1) if lowest else None,
+            hottest and hottest['province'], hottest and hottest['city'],
+            coldest and coldest['province'], coldest and coldest['city'],
+            sum('雨' in i['weather_description1'] + i['weather_description2'] for i in rows))
+    
+    return summaries
+
+
+
+def test_aggregate_all_weathers_data(monkeypatch):
+    today, tomorrow = date(2026, 10, 18), date(2026, 10, 19)
+    summaries = aggregate(monkeypatch, [
+        get_source_row('上海', '徐家汇', today, 24.0, 16.0, '小雨'),
+        get_source_row('上海', '闵行', today, 26.0, 15.0),
+        get_source_row('北京', '北京', today, 18.0, 6.0, '晴', '雷阵雨'),
+        get_source_row('北京', '北京', tomorrow, None, None),  # 气温缺失
+        get_source_row('上海', '徐家汇', tomorrow, 22.0, 17.0),
+    ])
+    
+    assert len(summaries) == 6
+    assert summaries[('上海', today)] == ('上海', today, 2, 26.0, 15.0, 25.0, 15.5, '上海', '闵行', '上海', '闵行', 1)
+    assert summaries[('北京', tomorrow)] == ('北京', tomorrow, 1, None, None, None, None, None, None, None, None, 0)
+    assert summaries[(NATIONAL_SCOPE, today)] == (NATIONAL_SCOPE, today, 3, 26.0, 6.0, 22.7, 12.3, '上海', '闵行',
+                                                  '北京', '北京', 2)
+    assert summaries[(NATIONAL_SCOPE, tomorrow)] == (NATIONAL_SCOPE, tomorrow, 2, 22.0, 17.0, 22.0, 17.0, '上海',
+                                                     '徐家汇', '上海', '徐家汇', 0)
+
+
+
+def test_aggregate_all_weathers_data_reference(monkeypatch):
+    random = Random(0)
+    temperatures = random.sample(range(-800, 800), 1400)  # 气温互不相同，最热、最冷城市唯一
+    source = []
+    
+    for i in range(100):
+        for day in range(7):
+            highest = temperatures.pop() / 20 if random.random() > 0.1 else None
+            lowest = temperatures.pop() / 20 if random.random() > 0.1 else None
+            source.append(get_source_row('Province%02d' % (i % 7), 'City%03d' % i, date(2026, 10, 18 + day),
+                                         highest, lowest, random.choice(['晴', '小雨', '多云'])))
+    
+    random.shuffle(source)
+    
+    assert aggregate(monkeypatch, source) == aggregate_reference(source)
+
+
+
+def test_aggregate_all_weathers_data_failure(monkeypatch):
+    monkeypatch.setattr(aggregator, 'query_summary_source', lambda: None)
+    
+    assert aggregator.aggregate_all_weathers_data() is None
@@ -0,0 +1,140 @@
+#!usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+test_cache.py
+Test the Cache Classes of cache.py.
+1. test_fingerprint_cache_commit()
+2. test_fingerprint_cache_rollback()
+3. test_fingerprint_cache_visits()
+4. test_lru_cache_eviction()
+5. test_generation_watcher_interval()
+6. test_generation_watcher_failure()
+7. test_generation_watcher_loads_outside_lock()
+"""
+
+from threading import Thread, Event
+
+import cache
+from cache import FingerprintCache, GenerationWatcher, LRUCache
+
+
+
+def test_fingerprint_cache_commit(tmp_path):
+    path = str(tmp_path / 'fingerprint.db')
+    first = FingerprintCache(path)
+    
+    assert first.get('http://a/xujiahui.html') is None
+    
+    first.put('http://a/xujiahui.html', ('"etag"', 'Sun, 18 Oct 2026 07:00:00 GMT', 'digest'), True)
+    first.put('http://a/minhang.html', ('"etag2"', None, 'digest2'), False)
+    
+    assert first.get('http://a/xujiahui.html') == ('"etag"', 'Sun, 18 Oct 2026 07:00:00 GMT', 'digest')
+    assert first.report() == 0.5
+    
+    first.commit()
+    first.close()
+    second = FingerprintCache(path)
+    
+    assert second.get('http://a/minhang.html') == ('"etag2"', None, 'digest2')
+
+
+
+def test_fingerprint_cache_rollback(tmp_path):
+    path = str(tmp_path / 'fingerprint.db')
+    first = FingerprintCache(path)
+    first.put('http://a/xujiahui.html', ('"etag"', None, 'digest'), True)
+    first.commit()
+    first.put('http://a/xujiahui.html', ('"etag2"', None, 'digest2'), True)
+    
+    # 本轮未发布时丢弃本轮的内容指纹，下一轮重新获取
+    first.rollback()
+    
+    assert first.get('http://a/xujiahui.html') == ('"etag"', None, 'digest')
+
+
+
+def test_fingerprint_cache_visits(tmp_path, monkeypatch):
+    now = [1792310400.0]
+    monkeypatch.setattr(cache, 'time', lambda: now[0])
+    fingerprint_cache = FingerprintCache(str(tmp_path / 'fingerprint.db'))
+    fingerprint = ('"etag"', None, 'digest')
+    fingerprint_cache.put('http://a/xujiahui.html', fingerprint, True)  # 第一次访问只记录时间
+    now[0] += 3600
+    fingerprint_cache.put('http://a/xujiahui.html', fingerprint, False)
+    now[0] += 1800
+    fingerprint_cache.put('http://a/xujiahui.html', fingerprint, True)
+    
+    assert fingerprint_cache.get_visits() == {'http://a/xujiahui.html': (2, 1, 5400.0, now[0])}
+
+
+
+def test_lru_cache_eviction():
+    cache = LRUCache(max_size=2)
+    cache.put(('html', 1, '上海', '徐家汇'), b'a')
+    cache.put(('html', 1, '上海', '闵行'), b'b')
+    
+    assert cache.get(('html', 1, '上海', '徐家汇')) == b'a'  # 标记为最近使用
+    
+    cache.put(('html', 2, '上海', '徐家汇'), b'c')
+    
+    assert cache.get(('html', 1, '上海', '闵行')) is None
+    assert cache.get(('html', 1, '上海', '徐家汇')) == b'a'
+    assert cache.get(('html', 2, '上海', '徐家汇')) == b'c'
+
+
+
+def test_generation_watcher_interval():
+    loads = []
+    
+    def loader():
+        loads.append(None)
+        
+        return {'RealTimeWeather': len(loads)}
+    
+    watcher = GenerationWatcher(loader, interval=3600)
+    
+    assert watcher.get('RealTimeWeather') == 1
+    assert watcher.get('RealTimeWeather') == 1
+    assert watcher.get('DateWeather') is None
+    assert len(loads) == 1
+    
+    watcher = GenerationWatcher(loader, interval=0)
+    
+    assert watcher.get('RealTimeWeather') == 2
+    assert watcher.get('RealTimeWeather') == 3
+
+
+
+def test_generation_watcher_failure():
+    results = [{'DateWeather': 5}, None]
+    watcher = GenerationWatcher(lambda: results.pop(0), interval=0)
+    
+    assert watcher.get('DateWeather') == 5
+    assert watcher.get('DateWeather') == 5  # 查询失败时沿用上次结果
+
+
+
+def test_generation_watcher_loads_outside_lock():
+    started, release = Event(), Event()
+    
+    def loader():
+        started.set()
+        release.wait(5)
+        
+        return {'City': 7}
+    
+    watcher = GenerationWatcher(loader, interval=3600)
+    results = []
+    thread = Thread(target=lambda: results.append(watcher.get('City')))
+    thread.start()
+    started.wait(5)
+    
+    # 查询进行中时其他线程不等待，沿用上次结果
+    assert watcher.get('City') is None
+    
+    release.set()
+    thread.join(5)
+    
+    assert results == [7]
+    assert watcher.get('City') == 7
@@ -0,0 +1,87 @@
+#!usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+test_checkpoint.py
+Test the Checkpoint Classes of checkpoint.py.
+1. test_checkpoint_resume()
+2. test_checkpoint_finish()
+3. test_checkpoint_max_age()
+4. test_checkpoint_jobs()
+"""
+
+import checkpoint
+from checkpoint import CrawlCheckpoint
+from weather import RealTimeWeather
+
+
+
+def test_checkpoint_resume(tmp_path):
+    path = str(tmp_path / 'checkpoint.db')
+    result = ('上海', '徐家汇', ('"etag"', None, 'digest'),
+              RealTimeWeather('2026-10-18 15:00 发布', '21.0', '', '东北风', '3级', '31', '20.3', '优', '舒适'), None)
+    first = CrawlCheckpoint(path, commit_step=100)
+    
+    assert first.begin('forecast') == {}
+    
+    started_at = first.get_started_at()
+    first.put('http://a/xujiahui.html', result)
+    first.commit()
+    first.put('http://a/minhang.html', result)  # 未提交，进程中断时丢失
+    
+    # 进程中断后从断点继续，开始时间不变
+    second = CrawlCheckpoint(path)
+    completed = second.begin('forecast')
+    
+    assert list(completed) == ['http://a/xujiahui.html']
+    assert completed['http://a/xujiahui.html'][3].get_temperature_value() == 21.0
+    assert second.get_started_at() == started_at
+
+
+
+def test_checkpoint_finish(tmp_path):
+    path = str(tmp_path / 'checkpoint.db')
+    first = CrawlCheckpoint(path)
+    first.begin('forecast')
+    first.put('http://a/xujiahui.html', 'result')
+    first.finish()
+    
+    assert first.get_last_run('forecast') == first.get_started_at()
+    assert first.get_last_run('realtime') == 0.0
+    assert first.begin('forecast') == {}  # 已完成的爬取不再继续
+
+
+
+def test_checkpoint_max_age(tmp_path, monkeypatch):
+    path = str(tmp_path / 'checkpoint.db')
+    now = [1792310400.0]
+    monkeypatch.setattr(checkpoint, 'time', lambda: now[0])
+    first = CrawlCheckpoint(path, max_age=6 * 3600, max_ages={'realtime': 3600})
+    first.begin('forecast')
+    first.put('http://a/xujiahui.html', 'forecast')
+    first.begin('realtime')
+    first.put('http://a/xujiahui.html', 'realtime')
+    first.commit()
+    now[0] += 2 * 3600
+    
+    # 实时天气任务的未完成爬取最多继续一个周期，预报任务继续
+    assert first.begin('realtime') == {}
+    assert first.begin('forecast') == {'http://a/xujiahui.html': 'forecast'}
+    
+    now[0] += 6 * 3600
+    
+    assert first.begin('forecast') == {}
+
+
+
+def test_checkpoint_jobs(tmp_path):
+    path = str(tmp_path / 'checkpoint.db')
+    first = CrawlCheckpoint(path)
+    first.begin('forecast')
+    first.put('http://a/xujiahui.html', 'forecast')
+    first.begin('realtime')
+    first.put('http://a/xujiahui.html', 'realtime')
+    first.finish()
+    
+    # 一个任务完成不影响另一个任务的断点
+    assert first.begin('forecast') == {'http://a/xujiahui.html': 'forecast'}
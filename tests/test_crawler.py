@@ -0,0 +1,168 @@
+#!usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+test_crawler.py
+Test HTTP Fetch Mode of crawler.py Against a Local Fixture HTTP Server.
+1. FixtureHandler
+2. fixture_server()
+3. test_get_city_data()
+4. test_get_weather_data()
+5. test_get_weather_data_if_changed()
+6. test_extract_real_time_weather_data_missing()
+"""
+
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from threading import Thread
+from os.path import basename, isfile
+
+import pytest
+
+import crawler
+from conftest import FIXTURE_DIRECTORY
+
+
+
+# Define Global Variables.
+FIXTURE_ETAG = '"fixture"'  # ETag of Every Fixture Page
+
+
+
+class FixtureHandler(BaseHTTPRequestHandler):
+    """
+    fixture HTTP请求处理类：/publish/forecast/<省份代号>/<城市url>.html返回fixtures/<城市url>.html（支持If-None-Match），
+    页面脚本使用的JSON接口返回fixtures/rest/下的合成JSON，并记录收到的请求
+    """
+    
+    requests = []  # (路径, If-None-Match)元组列表
+    
+    
+    
+    def do_GET(self):
+        """
+        处理GET请求
+        """
+        
+        self.requests.append((self.path, self.headers.get('If-None-Match')))
+        
+        if self.path.startswith(crawler.CITY_LIST_PATH):
+            file_path = FIXTURE_DIRECTORY + '/rest/province/' + self.path[len(crawler.CITY_LIST_PATH):] + '.json'
+            content_type = 'application/json; charset=utf-8'
+        elif self.path.startswith(crawler.REAL_TIME_WEATHER_PATH):
+            file_path = FIXTURE_DIRECTORY + '/rest/weather/' + self.path[len(crawler.REAL_TIME_WEATHER_PATH):] + '.json'
+            content_type = 'application/json; charset=utf-8'
+        else:
+            if self.headers.get('If-None-Match') == FIXTURE_ETAG:
+                self.send_response(304)
+                self.send_header('ETag', FIXTURE_ETAG)
+                self.end_headers()
+                
+                return
+            
+            file_path = FIXTURE_DIRECTORY + '/' + basename(self.path)
+            content_type = 'text/html; charset=utf-8'
+        
+        if not isfile(file_path):
+            self.send_error(404)
+            
+            return
+        
+        with open(file_path, 'rb') as file:
+            body = file.read()
+        
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('ETag', FIXTURE_ETAG)
+        self.end_headers()
+        self.wfile.write(body)
+    
+    
+    
+    def log_message(self, *arguments):
+        """
+        不输出访问日志
+        """
+        
+        pass
+
+
+
+@pytest.fixture
+def fixture_server(monkeypatch):
+    """
+    在本地随机端口启动fixture HTTP服务器，并禁止回退到Selenium，HTTP模式失败时测试直接失败
+    
+    :parameter monkeypatch: pytest monkeypatch对象
+    :type monkeypatch: <class '_pytest.monkeypatch.MonkeyPatch'>
+    
+    :return: url: 服务器地址，如http://127.0.0.1:12345
+    :rtype: <class 'str'>
+    """
+    
+    def fail(url):
+        raise AssertionError('Fell Back to Selenium: ' + url)
+    
+    monkeypatch.setattr(crawler, 'FETCH_MODE', 'http')
+    monkeypatch.setattr(crawler, 'fetch_with_web_driver', fail)
+    monkeypatch.setattr(crawler, '_station_ids', {})
+    FixtureHandler.requests = []
+    server = ThreadingHTTPServer(('127.0.0.1', 0), FixtureHandler)
+    thread = Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    
+    yield 'http://127.0.0.1:%d' % server.server_address[1]
+    
+    server.shutdown()
+    server.server_close()
+
+
+
+def test_get_city_data(fixture_server):
+    city_urls, cities = crawler.get_city_data(fixture_server + '/publish/forecast/ASH/xujiahui.html')
+    
+    assert city_urls == ['xujiahui', 'minhang']
+    assert cities == ['徐家汇', '闵行']
+
+
+
+def test_get_weather_data(fixture_server):
+    real_time_weather, date_weathers = crawler.get_weather_data(fixture_server + '/publish/forecast/ASH/xujiahui.html')
+    
+    assert real_time_weather.get_publish_time() == '2026-10-18 15:00 发布'
+    assert real_time_weather.get_temperature() == '21.0'
+    assert real_time_weather.get_wind_direction() == '东北风'
+    assert real_time_weather.get_aqi() == '优'
+    assert real_time_weather.get_comfort() == crawler.COMFORT_TEXTS[0]
+    assert len(date_weathers) == 7
+    assert date_weathers[0].get_highest_temperature() == '26℃'
+
+
+
+def test_get_weather_data_if_changed(fixture_server):
+    url = fixture_server + '/publish/forecast/AGD/guangzhou.html'
+    fingerprint, real_time_weather, date_weathers = crawler.get_weather_data_if_changed(url)
+    
+    assert fingerprint[0] == FIXTURE_ETAG
+    assert real_time_weather.get_precipitation() == '-'  # 缺测值
+    assert len(date_weathers) == 7
+    
+    # 页面未修改且实时天气未变化
+    FixtureHandler.requests = []
+    assert crawler.get_weather_data_if_changed(url, fingerprint) == (fingerprint, None, None)
+    assert ('/publish/forecast/AGD/guangzhou.html', FIXTURE_ETAG) in FixtureHandler.requests
+    
+    # 页面未修改但实时天气变化时只返回实时天气
+    etag, last_modified, digest = fingerprint
+    changed = (etag, last_modified, '0' * 40 + digest[40:])
+    new_fingerprint, real_time_weather, date_weathers = crawler.get_weather_data_if_changed(url, changed)
+    
+    assert new_fingerprint == fingerprint
+    assert real_time_weather is not None
+    assert date_weathers is None
+
+
+
+def test_extract_real_time_weather_data_missing():
+    with pytest.raises(Exception):
+        crawler.extract_real_time_weather_data({'msg': 'success', 'code': 0, 'data': {}})
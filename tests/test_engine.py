@@ -0,0 +1,73 @@
+#!usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+test_engine.py
+Test the Crawl Engine of engine.py.
+1. crawl()
+2. test_run_results()
+3. test_run_consumer_counts()
+4. test_run_broken_executor()
+"""
+
+from concurrent.futures import ThreadPoolExecutor, BrokenExecutor
+
+import pytest
+
+from engine import CrawlEngine
+
+
+
+def crawl(value):
+    """
+    模拟爬取与解析函数：负数表示爬取失败，'broken'表示执行器已损坏
+    
+    :parameter value: 任务参数
+    :type value: <class 'object'>
+    
+    :return: result: 任务参数，失败时为None
+    :rtype: <class 'object'>
+    """
+    
+    if value == 'broken':
+        raise BrokenExecutor('A Child Process Terminated Abruptly. ')
+    
+    if value < 0:
+        raise ValueError('Crawl Failed. ')
+    
+    return value
+
+
+
+def test_run_results():
+    with ThreadPoolExecutor(2) as executor:
+        results = CrawlEngine(executor, concurrency=2, host_interval=0.0).run(
+            crawl, [('http://a/%d' % i, (i,)) for i in (1, -2, 3)])
+    
+    assert results == [1, None, 3]
+
+
+
+def test_run_consumer_counts():
+    consumed = []
+    
+    def consumer(url, result):
+        if result == 3:
+            raise ValueError('Consume Failed. ')
+        
+        consumed.append(result)
+    
+    with ThreadPoolExecutor(2) as executor:
+        counts = CrawlEngine(executor, concurrency=2, host_interval=0.0).run(
+            crawl, [('http://a/%d' % i, (i,)) for i in (1, -2, 3, -4)], consumer)
+    
+    assert counts == (2, 1)
+    assert consumed == [1]
+
+
+
+def test_run_broken_executor():
+    with ThreadPoolExecutor(1) as executor:
+        with pytest.raises(BrokenExecutor):
+            CrawlEngine(executor, concurrency=1, host_interval=0.0).run(
+                crawl, [('http://a/1', (1,)), ('http://a/broken', ('broken',)), ('http://a/3', (3,))], print)
@@ -0,0 +1,132 @@
+#!usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+test_main.py
+Test the Weather Data Consumer of main.py.
+1. FakeWriter
+2. FakeCheckpoint
+3. consume()
+4. test_consume_forecast()
+5. test_consume_real_time()
+6. test_consume_forecast_replay()
+"""
+
+from datetime import datetime
+
+from main import REAL_TIME_KEY_PREFIX, consume_weathers_data
+from cache import FingerprintCache
+from weather import RealTimeWeather, DateWeather
+
+
+
+# Define Global Variables.
+REAL_TIME_WEATHER = RealTimeWeather('2026-10-18 15:00 发布', '21.0', '0.0', '东北风', '3级', '31.0', '20.3', '优', '舒适')
+DATE_WEATHERS = [DateWeather(datetime(2026, 10, 18), '26℃', '18℃', '晴', '多云', '东北风', '东风', '3~4级', '微风')]
+RESULT = ('上海', '徐家汇', ('"etag"', None, 'digest'), REAL_TIME_WEATHER, DATE_WEATHERS)
+
+
+
+class FakeWriter:
+    """
+    记录写入数据的流式写入类
+    """
+    
+    
+    
+    def __init__(self):
+        """
+        记录写入数据的流式写入类初始化
+        """
+        
+        self.weathers = []
+    
+    
+    
+    def put(self, weather):
+        """
+        记录一个城市的气象数据
+        
+        :parameter weather: (省份名, 城市名, 实时天气类对象或None, 日期天气类对象列表或None)元组
+        :type weather: <class 'tuple'>
+        """
+        
+        self.weathers.append(weather)
+
+
+
+class FakeCheckpoint:
+    """
+    记录已完成url的爬取检查点类
+    """
+    
+    
+    
+    def __init__(self):
+        """
+        记录已完成url的爬取检查点类初始化
+        """
+        
+        self.items = {}
+    
+    
+    
+    def put(self, url, result):
+        """
+        记录一个已完成的url
+        
+        :parameter url: 爬虫目标地址
+        :type url: <class 'str'>
+        
+        :parameter result: 解析结果
+        :type result: <class 'object'>
+        """
+        
+        self.items[url] = result
+
+
+
+def consume(key_prefix, checkpoint, result):
+    """
+    消费一个爬取结果
+    
+    :parameter key_prefix: 内容指纹键前缀
+    :type key_prefix: <class 'str'>
+    
+    :parameter checkpoint: 爬取检查点，重放时为None
+    :type checkpoint: <class 'object'>
+    
+    :parameter result: get_all_weathers_data()返回的元组
+    :type result: <class 'tuple'>
+    
+    :return: weathers: 写入的气象数据元组列表
+    :rtype: <class 'list'>
+    """
+    
+    writer = FakeWriter()
+    fingerprint_cache = FingerprintCache()
+    consume_weathers_data(fingerprint_cache, key_prefix, writer, set(), checkpoint, 'http://a/b.html', result)
+    fingerprint_cache.rollback()
+    fingerprint_cache.close()
+    
+    return writer.weathers
+
+
+
+def test_consume_forecast():
+    checkpoint = FakeCheckpoint()
+    
+    assert consume('', checkpoint, RESULT) == [('上海', '徐家汇', REAL_TIME_WEATHER, DATE_WEATHERS)]
+    assert 'http://a/b.html' in checkpoint.items
+
+
+
+def test_consume_real_time():
+    assert consume(REAL_TIME_KEY_PREFIX, FakeCheckpoint(), RESULT) == [('上海', '徐家汇', REAL_TIME_WEATHER, None)]
+
+
+
+def test_consume_forecast_replay():
+    # 重放中断的预报任务时不用检查点中较旧的实时天气覆盖影子表
+    assert consume('', None, RESULT) == [('上海', '徐家汇', None, DATE_WEATHERS)]
+    assert consume('', None, RESULT[:3] + (REAL_TIME_WEATHER, None)) == []
@@ -0,0 +1,90 @@
+#!usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+test_scheduler.py
+Test the Scheduler Classes of scheduler.py.
+1. test_job_slot()
+2. test_job_jitter()
+3. test_scheduler_covers()
+4. test_scheduler_retry()
+5. test_scheduler_lock()
+"""
+
+from time import localtime
+
+import pytest
+
+import scheduler
+from scheduler import RETRY_INTERVAL, Job, Scheduler
+
+
+
+# Define Global Variables.
+NOW = 1792310400.0 + 1234.5  # Fixed Test Time
+
+
+
+def test_job_slot():
+    job = Job('realtime', None, 3600, 300)
+    
+    for now in (NOW, NOW + 1800, NOW + 3599, NOW + 86400):
+        slot = job.get_slot(now)
+        
+        assert slot <= now < slot + 3600
+        assert (slot + localtime(slot).tm_gmtoff - 300) % 3600 == 0  # 本地时间每小时第5分钟
+        assert job.get_slot(now) == slot
+
+
+
+def test_job_jitter():
+    job = Job('forecast', None, 86400, 0, 300)
+    slot = job.get_slot(NOW)
+    due_time = job.get_due_time(NOW)
+    
+    assert slot <= due_time <= slot + 300
+    assert job.get_due_time(NOW + 60) == due_time  # 同一周期只抽取一次随机延迟
+    
+    job.last_run = NOW  # 本周期已成功运行
+    
+    assert slot + 86400 <= job.get_due_time(NOW) <= slot + 86400 + 300
+
+
+
+def test_scheduler_covers(monkeypatch):
+    runs = []
+    monkeypatch.setattr(scheduler, 'time', lambda: NOW)
+    tasks = Scheduler()
+    forecast = Job('forecast', lambda: runs.append('forecast') or True, 86400, covers=['realtime'])
+    realtime = Job('realtime', lambda: runs.append('realtime') or True, 3600)
+    tasks.add(forecast)
+    tasks.add(realtime)
+    
+    # 两个任务同时到期时先运行先加入的任务，预报任务成功时实时天气任务视为同时完成
+    tasks.run_pending()
+    tasks.run_pending()
+    
+    assert runs == ['forecast']
+    assert realtime.last_run == NOW
+    assert realtime.get_due_time(NOW) >= realtime.get_slot(NOW) + 3600
+
+
+
+def test_scheduler_retry(monkeypatch):
+    monkeypatch.setattr(scheduler, 'time', lambda: NOW)
+    tasks = Scheduler()
+    job = Job('realtime', lambda: False, 3600)
+    tasks.add(job)
+    
+    assert tasks.run_pending() == RETRY_INTERVAL
+    assert job.retry_at == NOW + RETRY_INTERVAL
+    assert job.last_run == 0.0
+
+
+
+def test_scheduler_lock(tmp_path):
+    first = Scheduler(str(tmp_path / 'scheduler.lock'))
+    first.lock()
+    
+    with pytest.raises(Exception, match='Another Scheduler'):
+        Scheduler(str(tmp_path / 'scheduler.lock')).lock()
@@ -0,0 +1,70 @@
+#!usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+test_weather.py
+Test the Weather Classes and Weather Functions of weather.py.
+1. test_parse_number()
+2. test_real_time_weather_pickle()
+3. test_date_weather_pickle()
+"""
+
+from datetime import datetime
+from pickle import dumps, loads, HIGHEST_PROTOCOL
+
+from weather import MISSING, parse_number, RealTimeWeather, DateWeather
+
+
+
+def test_parse_number():
+    assert parse_number('23℃') == 23.0
+    assert parse_number('-5℃') == -5.0
+    assert parse_number('0.5mm') == 0.5
+    assert parse_number('65%') == 65.0
+    assert parse_number('3~4级') == 3.0
+    assert parse_number('空气质量：45') == 45.0
+    assert parse_number('优') is None
+    assert parse_number('') is None
+    assert parse_number(None) is None
+    assert parse_number('23℃') is parse_number('23℃')  # 相同的字段文本共享同一个数值对象
+
+
+
+def test_real_time_weather_pickle():
+    weather = RealTimeWeather('2026-10-18 15:00 发布', '21.0℃', '', '东北风', '3级', '31%', '20.3℃', '空气质量：45', '舒适')
+    copy = loads(dumps(weather, HIGHEST_PROTOCOL))
+    
+    assert not hasattr(weather, '__dict__')
+    assert copy.get_publish_time() == '2026-10-18 15:00 发布'
+    assert copy.get_temperature() == '21.0℃'
+    assert copy.get_precipitation() == MISSING
+    assert copy.get_wind_direction() == '东北风'
+    assert copy.get_wind_power() == '3级'
+    assert copy.get_relative_humidity() == '31%'
+    assert copy.get_sensible_temperature() == '20.3℃'
+    assert copy.get_aqi() == '空气质量：45'
+    assert copy.get_comfort() == '舒适'
+    assert copy.get_temperature_value() == 21.0
+    assert copy.get_precipitation_value() is None
+    assert copy.get_relative_humidity_value() == 31.0
+    assert copy.get_sensible_temperature_value() == 20.3
+    assert copy.get_aqi_value() == 45.0
+
+
+
+def test_date_weather_pickle():
+    weather = DateWeather(datetime(2026, 10, 18), '26℃', '-2℃', '晴', '多云', '东北风', '', '3~4级', '微风')
+    copy = loads(dumps(weather, HIGHEST_PROTOCOL))
+    
+    assert not hasattr(weather, '__dict__')
+    assert copy.get_date() == datetime(2026, 10, 18)
+    assert copy.get_highest_temperature() == '26℃'
+    assert copy.get_lowest_temperature() == '-2℃'
+    assert copy.get_weather_description1() == '晴'
+    assert copy.get_weather_description2() == '多云'
+    assert copy.get_wind_direction1() == '东北风'
+    assert copy.get_wind_direction2() == MISSING
+    assert copy.get_wind_level1() == '3~4级'
+    assert copy.get_wind_level2() == '微风'
+    assert copy.get_highest_temperature_value() == 26.0
+    assert copy.get_lowest_temperature_value() == -2.0
@@ -4,43 +4,153 @@
 """
 tools.py
 Define Some Tool Functions.
-1. print_log()
-2. print_traceback_error()
+1. get_logger()
+2. logging_initialization()
+3. get_log_queue()
+4. print_log()
+5. print_traceback_error()
 """
 
-from traceback import format_exc
-from time import strftime
-from sys import argv
+from logging import getLogger, Formatter, StreamHandler, DEBUG, INFO, WARNING
+from logging.handlers import QueueHandler, QueueListener
+from multiprocessing import Queue
+from atexit import register
+from os import getpid
+from sys import argv, stdout, _getframe
 
 
 
-def print_log(string):
+# Define Global Variables.
+LOGGER_NAME = 'raingod'  # Parent Logger Name, Module Loggers Are Named raingod.<module>
+LOG_LEVEL = INFO  # Default Log Level, Hot Paths Log at DEBUG and Emit Nothing at This Level
+LOG_FORMAT = '%(asctime)s\t%(levelname)s\t%(processName)s\t%(name)s\t%(message)s'  # Log Line Format
+LOG_DATE_FORMAT = '%Y-%m-%d %H:%M:%S'  # Log Time Format
+getLogger(LOGGER_NAME).setLevel(LOG_LEVEL)
+getLogger(LOGGER_NAME).propagate = False
+
+# 每个进程各自的日志队列与监听线程，fork后的子进程重新初始化或由进程池initializer接入父进程的队列
+_log_queue = None
+_log_listener = None
+_log_pid = None
+_loggers = {}
+
+
+
+def get_logger(name):
     """
-    打印字符串到控制台
+    获取模块的日志记录器
+    
+    :parameter name: 模块名
+    :type name: <class 'str'>
+    
+    :return: logger: 名为raingod.<模块名>的日志记录器
+    :rtype: <class 'logging.Logger'>
+    """
+    
+    logger = _loggers.get(name)
+    
+    if logger is None:
+        logger = _loggers[name] = getLogger(LOGGER_NAME + '.' + name)
+    
+    return logger
+
+
+
+def logging_initialization(level=LOG_LEVEL, queue=None):
+    """
+    初始化当前进程的日志：不指定队列时创建多进程队列，并启动QueueListener线程统一格式化写到标准输出；
+    作为进程池initializer并传入父进程的队列时，子进程只把日志记录放入该队列，由父进程的监听线程写出，
+    记录日志的线程只做一次非阻塞的入队操作
+    
+    :parameter level: 日志级别，默认为LOG_LEVEL
+    :type level: <class 'int'>
+    
+    :parameter queue: 父进程的日志队列，默认为None
+    :type queue: <class 'multiprocessing.queues.Queue'>
+    
+    :return: queue: 当前进程使用的日志队列
+    :rtype: <class 'multiprocessing.queues.Queue'>
+    """
+    
+    global _log_queue, _log_listener, _log_pid
+    
+    logger = getLogger(LOGGER_NAME)
+    logger.setLevel(level)
+    
+    for handler in logger.handlers[:]:  # fork继承的处理器指向父进程的监听线程，可能已不存在
+        logger.removeHandler(handler)
     
-    :parameter string: 将在控制台输出的字符串
+    if queue is None:
+        queue = Queue(-1)
+        handler = StreamHandler(stdout)
+        handler.setFormatter(Formatter(LOG_FORMAT, LOG_DATE_FORMAT))
+        _log_listener = QueueListener(queue, handler)
+        _log_listener.start()
+        register(_log_listener.stop)  # 退出时写出队列中剩余的日志
+    else:
+        _log_listener = None
+    
+    logger.addHandler(QueueHandler(queue))
+    _log_queue = queue
+    _log_pid = getpid()
+    
+    return queue
+
+
+
+def get_log_queue():
+    """
+    获取当前进程的日志队列，作为进程池initializer的参数传给子进程
+    
+    :return: queue: 日志队列
+    :rtype: <class 'multiprocessing.queues.Queue'>
+    """
+    
+    if _log_pid != getpid():
+        logging_initialization()
+    
+    return _log_queue
+
+
+
+def print_log(string, level=INFO):
+    """
+    以调用者所在模块的日志记录器记录日志，级别未启用时直接返回
+    
+    :parameter string: 日志内容
     :type string: <class 'str'>
+    
+    :parameter level: 日志级别，默认为INFO，每次查询、每个页面等热路径使用DEBUG
+    :type level: <class 'int'>
     """
     
-    print(strftime("%Y-%m-%d %H:%M:%S") + "\t" + string)
+    logger = get_logger(_getframe(1).f_globals.get('__name__', 'root'))
+    
+    if not logger.isEnabledFor(level):
+        return
+    
+    if _log_pid != getpid():
+        logging_initialization(getLogger(LOGGER_NAME).level)
+    
+    logger.log(level, string.rstrip('\n'), stacklevel=2)
 
 
 
 def print_traceback_error(exception, string):
     """
-    打印异常信息到控制台
+    记录异常信息与完整的异常栈
     
     :parameter exception: 捕捉到的异常
     :type exception: <class 'Exception'>
     
-    :parameter string: 将在控制台输出的异常/错误类型
+    :parameter string: 异常/错误类型
     :type string: <class 'str'>
     """
     
-    error = format_exc()
-    error_time = strftime("%Y-%m-%d %H:%M:%S")
-    command_line_entry = " ".join(argv)
+    logger = get_logger(_getframe(1).f_globals.get('__name__', 'root'))
+    
+    if _log_pid != getpid():
+        logging_initialization(getLogger(LOGGER_NAME).level)
     
-    print(error_time + "\t" + string + " ERROR! ", end="")
-    print(exception)
-    print(command_line_entry + "\n" + error)
+    logger.error('%s ERROR! %s\n%s', string, exception, ' '.join(argv),
+                 exc_info=(type(exception), exception, exception.__traceback__), stacklevel=2)
@@ -3,18 +3,53 @@
 
 """
 weather.py
-Define Some Weather Classes.
-1. RealTimeWeather
-2. DateWeather
+Define Some Weather Classes and Weather Functions.
+1. parse_number()
+2. RealTimeWeather
+3. DateWeather
 """
 
+from re import compile
+from functools import lru_cache
+
+
+
+# Define Global Variables.
+MISSING = '-'  # Placeholder of Missing Text Fields
+NUMBER_PATTERN = compile(r'-?\d+(?:\.\d+)?')  # First Number in a Field, Such as '23℃', '0.5mm', '65%'
+NUMBER_CACHE_SIZE = 4096  # Parsed Field Cache Size, Field Texts Repeat Heavily Across Cities
+
+
+
+@lru_cache(maxsize=NUMBER_CACHE_SIZE)
+def parse_number(text):
+    """
+    解析字段文本中的第一个数值，结果被缓存，相同的字段文本只解析一次且共享同一个数值对象
+    
+    :parameter text: 字段文本，如'23℃'、'-5℃'、'0.5mm'、'65%'
+    :type text: <class 'str'>
+    
+    :return: number: 数值，没有数值时为None
+    :rtype: <class 'float'>
+    """
+    
+    match = NUMBER_PATTERN.search(text) if text else None
+    
+    return float(match.group()) if match else None
+
 
 
 class RealTimeWeather:
     """
-    实时天气类
+    实时天气类，创建后只读，文本字段缺失时为MISSING，
+    气温、降水量、相对湿度、体感温度、空气质量同时解析为数值，缺失时为None
     """
     
+    # 使用__slots__不创建属性字典，减小每个对象的内存
+    __slots__ = ('__publish_time', '__temperature', '__precipitation', '__wind_direction', '__wind_power',
+                 '__relative_humidity', '__sensible_temperature', '__aqi', '__comfort', '__temperature_value',
+                 '__precipitation_value', '__relative_humidity_value', '__sensible_temperature_value', '__aqi_value')
+    
     
     
     def __init__(self, publish_time, temperature, precipitation, wind_direction, wind_power, relative_humidity,
@@ -50,50 +85,20 @@ class RealTimeWeather:
         :type comfort: <class 'str'>
         """
         
-        if publish_time == '':
-            self.__publish_time = '-'
-        else:
-            self.__publish_time = publish_time
-        
-        if temperature == '':
-            self.__temperature = '-'
-        else:
-            self.__temperature = temperature
-        
-        if precipitation == '':
-            self.__precipitation = '-'
-        else:
-            self.__precipitation = precipitation
-        
-        if wind_direction == '':
-            self.__wind_direction = '-'
-        else:
-            self.__wind_direction = wind_direction
-        
-        if wind_power == '':
-            self.__wind_power = '-'
-        else:
-            self.__wind_power = wind_power
-        
-        if relative_humidity == '':
-            self.__relative_humidity = '-'
-        else:
-            self.__relative_humidity = relative_humidity
-        
-        if sensible_temperature == '':
-            self.__sensible_temperature = '-'
-        else:
-            self.__sensible_temperature = sensible_temperature
-        
-        if aqi == '':
-            self.__aqi = '-'
-        else:
-            self.__aqi = aqi
-        
-        if comfort == '':
-            self.__comfort = '-'
-        else:
-            self.__comfort = comfort
+        self.__publish_time = publish_time or MISSING
+        self.__temperature = temperature or MISSING
+        self.__precipitation = precipitation or MISSING
+        self.__wind_direction = wind_direction or MISSING
+        self.__wind_power = wind_power or MISSING
+        self.__relative_humidity = relative_humidity or MISSING
+        self.__sensible_temperature = sensible_temperature or MISSING
+        self.__aqi = aqi or MISSING
+        self.__comfort = comfort or MISSING
+        self.__temperature_value = parse_number(temperature)
+        self.__precipitation_value = parse_number(precipitation)
+        self.__relative_humidity_value = parse_number(relative_humidity)
+        self.__sensible_temperature_value = parse_number(sensible_temperature)
+        self.__aqi_value = parse_number(aqi)
     
     
     
@@ -205,6 +210,96 @@ class RealTimeWeather:
     
     
     
+    def get_temperature_value(self):
+        """
+        获取实时气温数值
+        
+        :return: self.__temperature_value: 实时气温数值，缺失时为None
+        :rtype: <class 'float'>
+        """
+        
+        return self.__temperature_value
+    
+    
+    
+    def get_precipitation_value(self):
+        """
+        获取实时降水量数值
+        
+        :return: self.__precipitation_value: 实时降水量数值，缺失时为None
+        :rtype: <class 'float'>
+        """
+        
+        return self.__precipitation_value
+    
+    
+    
+    def get_relative_humidity_value(self):
+        """
+        获取实时相对湿度数值
+        
+        :return: self.__relative_humidity_value: 实时相对湿度数值，缺失时为None
+        :rtype: <class 'float'>
+        """
+        
+        return self.__relative_humidity_value
+    
+    
+    
+    def get_sensible_temperature_value(self):
+        """
+        获取实时体感温度数值
+        
+        :return: self.__sensible_temperature_value: 实时体感温度数值，缺失时为None
+        :rtype: <class 'float'>
+        """
+        
+        return self.__sensible_temperature_value
+    
+    
+    
+    def get_aqi_value(self):
+        """
+        获取实时空气质量数值
+        
+        :return: self.__aqi_value: 实时空气质量数值，缺失时为None
+        :rtype: <class 'float'>
+        """
+        
+        return self.__aqi_value
+    
+    
+    
+    def __getstate__(self):
+        """
+        pickle时只保存属性值元组，不保存属性名，也不重新解析数值
+        
+        :return: state: 属性值元组
+        :rtype: <class 'tuple'>
+        """
+        
+        return (self.__publish_time, self.__temperature, self.__precipitation, self.__wind_direction, self.__wind_power,
+                self.__relative_humidity, self.__sensible_temperature, self.__aqi, self.__comfort,
+                self.__temperature_value, self.__precipitation_value, self.__relative_humidity_value,
+                self.__sensible_temperature_value, self.__aqi_value)
+    
+    
+    
+    def __setstate__(self, state):
+        """
+        unpickle时从属性值元组恢复
+        
+        :parameter state: __getstate__()返回的属性值元组
+        :type state: <class 'tuple'>
+        """
+        
+        (self.__publish_time, self.__temperature, self.__precipitation, self.__wind_direction, self.__wind_power,
+         self.__relative_humidity, self.__sensible_temperature, self.__aqi, self.__comfort, self.__temperature_value,
+         self.__precipitation_value, self.__relative_humidity_value, self.__sensible_temperature_value,
+         self.__aqi_value) = state
+    
+    
+    
     def __str__(self) -> str:
         """
         重写__str__()方法
@@ -222,9 +317,14 @@ class RealTimeWeather:
 
 class DateWeather:
     """
-    日期天气类
+    日期天气类，创建后只读，文本字段缺失时为MISSING，最高、最低温度同时解析为数值，缺失时为None
     """
     
+    # 使用__slots__不创建属性字典，减小每个对象的内存
+    __slots__ = ('__date', '__highest_temperature', '__lowest_temperature', '__weather_description1',
+                 '__weather_description2', '__wind_direction1', '__wind_direction2', '__wind_level1', '__wind_level2',
+                 '__highest_temperature_value', '__lowest_temperature_value')
+    
     
     
     def __init__(self, date, highest_temperature, lowest_temperature, weather_description1, weather_description2,
@@ -261,46 +361,16 @@ class DateWeather:
         """
         
         self.__date = date
-        
-        if highest_temperature == '':
-            self.__highest_temperature = '-'
-        else:
-            self.__highest_temperature = highest_temperature
-        
-        if lowest_temperature == '':
-            self.__lowest_temperature = '-'
-        else:
-            self.__lowest_temperature = lowest_temperature
-        
-        if weather_description1 == '':
-            self.__weather_description1 = '-'
-        else:
-            self.__weather_description1 = weather_description1
-        
-        if weather_description2 == '':
-            self.__weather_description2 = '-'
-        else:
-            self.__weather_description2 = weather_description2
-        
-        if wind_direction1 == '':
-            self.__wind_direction1 = '-'
-        else:
-            self.__wind_direction1 = wind_direction1
-        
-        if wind_direction2 == '':
-            self.__wind_direction2 = '-'
-        else:
-            self.__wind_direction2 = wind_direction2
-        
-        if wind_level1 == '':
-            self.__wind_level1 = '-'
-        else:
-            self.__wind_level1 = wind_level1
-        
-        if wind_level2 == '':
-            self.__wind_level2 = '-'
-        else:
-            self.__wind_level2 = wind_level2
+        self.__highest_temperature = highest_temperature or MISSING
+        self.__lowest_temperature = lowest_temperature or MISSING
+        self.__weather_description1 = weather_description1 or MISSING
+        self.__weather_description2 = weather_description2 or MISSING
+        self.__wind_direction1 = wind_direction1 or MISSING
+        self.__wind_direction2 = wind_direction2 or MISSING
+        self.__wind_level1 = wind_level1 or MISSING
+        self.__wind_level2 = wind_level2 or MISSING
+        self.__highest_temperature_value = parse_number(highest_temperature)
+        self.__lowest_temperature_value = parse_number(lowest_temperature)
     
     
     
@@ -412,6 +482,58 @@ class DateWeather:
     
     
     
+    def get_highest_temperature_value(self):
+        """
+        获取最高温度数值
+        
+        :return: self.__highest_temperature_value: 最高温度数值，缺失时为None
+        :rtype: <class 'float'>
+        """
+        
+        return self.__highest_temperature_value
+    
+    
+    
+    def get_lowest_temperature_value(self):
+        """
+        获取最低温度数值
+        
+        :return: self.__lowest_temperature_value: 最低温度数值，缺失时为None
+        :rtype: <class 'float'>
+        """
+        
+        return self.__lowest_temperature_value
+    
+    
+    
+    def __getstate__(self):
+        """
+        pickle时只保存属性值元组，不保存属性名，也不重新解析数值
+        
+        :return: state: 属性值元组
+        :rtype: <class 'tuple'>
+        """
+        
+        return (self.__date, self.__highest_temperature, self.__lowest_temperature, self.__weather_description1,
+                self.__weather_description2, self.__wind_direction1, self.__wind_direction2, self.__wind_level1,
+                self.__wind_level2, self.__highest_temperature_value, self.__lowest_temperature_value)
+    
+    
+    
+    def __setstate__(self, state):
+        """
+        unpickle时从属性值元组恢复
+        
+        :parameter state: __getstate__()返回的属性值元组
+        :type state: <class 'tuple'>
+        """
+        
+        (self.__date, self.__highest_temperature, self.__lowest_temperature, self.__weather_description1,
+         self.__weather_description2, self.__wind_direction1, self.__wind_direction2, self.__wind_level1,
+         self.__wind_level2, self.__highest_temperature_value, self.__lowest_temperature_value) = state
+    
+    
+    
     def __str__(self) -> str:
         """
         重写__str__()方法